@@ -19,51 +19,103 @@ KEY IMPROVEMENTS:
 - Smart filtering to exclude pure text blocks
 - Precise table detection using pdfplumber's table boundaries
 - Visual element validation to ensure charts/tables contain actual visual content
+- Optional PyMuPDF-only backend that parses each PDF once for detection and screenshots
 """
 
 import os
 import sys
+import io
 import json
 import time
 import argparse
 import re
 import math
+import shutil
+import hashlib
+import tempfile
+import glob
+import signal
+import threading
+import struct
+import zlib
+import heapq
+import bisect
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple, NamedTuple
+from typing import Dict, List, Any, Iterator, Optional, Set, Tuple, NamedTuple
 import logging
-import psutil
-from dataclasses import dataclass
+import importlib
+import importlib.util
+from dataclasses import dataclass, asdict
 from enum import Enum
 
-# Import PDF processing libraries with fallback handling
-try:
-    import fitz  # PyMuPDF
-    HAS_PYMUPDF = True
-except ImportError:
-    HAS_PYMUPDF = False
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access
+
+    PyMuPDF, pdfplumber, NumPy, OpenCV, Pillow and psutil together take
+    most of a second to import. Deferring them keeps --help, input
+    validation and result-cache hits from paying for parsers they never
+    use. Availability is checked up front with find_spec, which does not
+    import anything.
+    """
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._lazy_load(), attr)
+
+    def _lazy_load(self):
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self._lazy_name)
+        return self._lazy_module
+
+    def __repr__(self) -> str:
+        state = "imported" if self._lazy_module is not None else "not imported"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+
+def module_installed(name: str) -> bool:
+    """Whether module name can be found, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# PDF processing libraries, imported when first used
+fitz = LazyModule("fitz")  # PyMuPDF
+HAS_PYMUPDF = module_installed("fitz")
+if not HAS_PYMUPDF:
     print("WARNING: PyMuPDF not available")
 
-try:
-    import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
+pdfplumber = LazyModule("pdfplumber")
+HAS_PDFPLUMBER = module_installed("pdfplumber")
+if not HAS_PDFPLUMBER:
     print("WARNING: PDFPlumber not available")
 
-try:
-    from PIL import Image, ImageDraw, ImageFilter
-    HAS_PIL = True
-except ImportError:
-    HAS_PIL = False
+Image = LazyModule("PIL.Image")
+HAS_PIL = module_installed("PIL")
+if not HAS_PIL:
     print("WARNING: PIL not available")
 
-try:
-    import cv2
-    import numpy as np
-    HAS_OPENCV = True
-except ImportError:
-    HAS_OPENCV = False
+np = LazyModule("numpy")
+HAS_NUMPY = module_installed("numpy")
+if not HAS_NUMPY:
+    print("INFO: NumPy not available (using pure-Python text density)")
+
+cv2 = LazyModule("cv2")
+HAS_OPENCV = module_installed("cv2")
+if not HAS_OPENCV:
     print("INFO: OpenCV not available (using simplified visual detection)")
+HAS_OPENCV = HAS_OPENCV and HAS_NUMPY
+
+psutil = LazyModule("psutil")
 
 
 # === UNICODE SAFE PRINTING FUNCTIONS ===
@@ -121,7 +173,274 @@ TABLE_BUFFER_ZONE = 20.0       # Table-specific buffer
 HIGH_QUALITY_SCALE = 3.0       # 3x scaling for screenshots
 VISUAL_CONFIDENCE_THRESHOLD = 0.7  # Require high visual confidence
 MAX_FILENAME_LENGTH = 50
+METADATA_VERSION = "v3.0 - Precise Visual Boundary Detection"
 TEXT_ONLY_THRESHOLD = 0.9      # If >90% text chars, exclude as figure
+SPATIAL_GRID_CELL_SIZE = 50.0  # Grid cell size (points) for per-page spatial index
+SPATIAL_GRID_MAX_CELLS = 256   # Primitives spanning more cells are checked linearly
+CLUSTER_SEARCH_RADIUS = 200    # Max gap (points) between a text reference and its figure's cluster
+CLUSTER_CELL_SIZE = 15.0       # Clustering grid cell (points); primitives in adjacent cells join one cluster
+CLUSTER_BACKDROP_RATIO = 0.5   # Primitives covering more of the page than this never join a cluster
+CLUSTER_MAX_CELLS = 10_000     # ... nor do primitives spanning more clustering cells than this
+TEXT_DENSITY_BATCH_SIZE = 1_000_000  # Max (areas x chars) mask cells per vectorized batch
+TEXT_INDEX_KEY_LENGTH = 8      # Leading chars used to look up reference text on a page
+SHARDS_PER_WORKER = 4          # Page-range shards per worker process for load balancing
+STREAM_REOPEN_PAGES = 50       # Streaming mode reopens the PDF this often to drop parser caches
+CACHE_FORMAT_VERSION = 6       # Bump when cached page entries change shape or detection output changes
+DEFAULT_CACHE_MAX_MB = 1024    # Result cache size limit before LRU eviction
+DEFAULT_PAGE_TIMEOUT = 120     # Seconds one page may spend in detection + screenshots
+PAGE_DEADLINE_REPEAT = 0.05    # Seconds between repeated SIGALRMs once a page deadline has passed
+SCREENSHOT_ENCODER_THREADS = min(4, os.cpu_count() or 1)  # Background encode/write threads (0 = inline)
+SCREENSHOT_WRITE_BUFFER_MB = 256  # Raw pixels queued for encoding before rendering waits
+DEFAULT_IMAGE_FORMAT = "png"   # Screenshot codec: png, webp (lossless), jpeg, avif or auto
+PNG_COMPRESSION_LEVEL = 6      # zlib level 0-9 for PNG screenshots (6 = PyMuPDF's own output)
+LOSSY_IMAGE_QUALITY = 90       # JPEG/AVIF quality for photographic screenshots
+AUTO_PHOTO_FORMAT = "jpeg"     # Codec auto mode uses for photographic crops
+PHOTO_AREA_RATIO = 0.5         # Share of a crop covered by raster images that makes it photographic
+EMBEDDED_IMAGE_TOLERANCE = 2.0  # Points an embedded image's placement may differ from its element box
+MIN_RENDER_SCALE = 1.0         # Adaptive rendering never goes below 72 DPI
+MAX_RENDER_SCALE = 4.0         # ... or above 288 DPI
+MIN_RENDER_LONG_SIDE = 800     # Pixels on the long side that keep small crops legible
+MAX_RENDER_PIXELS = 3_000_000  # Pixel budget per screenshot; larger crops render at a lower scale
+RENDER_SCALE_STEP = 0.5        # Vector crops use whole/half scales: hairlines stay crisp and compress well
+DEFAULT_PDF_BACKEND = "pdfplumber"  # Detection parser: pdfplumber, or pymupdf to parse each PDF only once
+SCANNED_PAGE_COVERAGE = 0.8    # Images covering this share of a page with no vector drawing make it a scan
+RASTER_DPI = 50                # Resolution of the thumbnails scanned pages are analysed at
+RASTER_BATCH_PAGES = 16        # Scanned pages rendered ahead and analysed as one batch
+RASTER_LOOKAHEAD_BATCHES = 2   # Pages searched ahead for that batch: this many batches' worth
+RASTER_THREADS = min(2, os.cpu_count() or 1)  # Threads analysing thumbnails (OpenCV releases the GIL)
+RASTER_INK_CONTRAST = 40       # Grey levels below the paper level that count as ink
+RASTER_PAPER_LEVEL = 160       # A page whose lightest tenth is darker than this shows no paper: a full-page plate
+RASTER_SOLID_SIZE = 8.0        # Ink at least this thick (points) is picture, not text or rules
+RASTER_MERGE_GAP = 10.0        # Picture areas closer than this (points) form one region
+RASTER_RULE_LENGTH = 40.0      # Shortest ink run (points) taken for a table rule
+RASTER_RULE_SPAN = 0.5         # Share of a table's width (height) a rule must cross to count as a row (column) line
+TRIAGE_TEXT_OPS = frozenset({  # Drawing-log entries that never become images, rects or curves
+    "fill-text", "stroke-text", "ignore-text", "clip-path", "clip-stroke-path", "clip-text",
+    "clip-stroke-text", "end-clip", "begin-group", "end-group", "begin-layer", "end-layer",
+})
+PROFILE_SLOWEST_PAGES = 10     # Slowest pages kept, with their stage breakdown, when profiling
+PROFILE_HISTOGRAM_BOUNDS = (0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0)  # Per-page seconds histogram buckets
+TRACE_FILE_NAME = "processing_trace_v3.json"
+BATCH_JOURNAL_NAME = "batch_journal.jsonl"
+BATCH_SUMMARY_NAME = "batch_summary.json"
+SERVE_DEFAULT_SOCKET = "art_materials_processor_v3.sock"  # Serve mode listens here unless --port is given
+SERVE_QUEUE_SIZE = 64          # Jobs admitted (running or waiting) before serve mode answers 503
+SERVE_JOB_HISTORY = 1000       # Finished jobs kept for GET /jobs/<id>
+
+# Constants that change detection or screenshot output; part of every cache key
+CACHE_KEY_CONSTANTS = (
+    "MIN_ELEMENT_AREA", "MIN_WIDTH", "MIN_HEIGHT", "MIN_VISUAL_ELEMENTS",
+    "DEFAULT_BUFFER_ZONE", "TABLE_BUFFER_ZONE", "HIGH_QUALITY_SCALE",
+    "VISUAL_CONFIDENCE_THRESHOLD", "MAX_FILENAME_LENGTH", "TEXT_ONLY_THRESHOLD",
+    "CLUSTER_SEARCH_RADIUS", "CLUSTER_CELL_SIZE", "CLUSTER_BACKDROP_RATIO", "CLUSTER_MAX_CELLS",
+    "AUTO_PHOTO_FORMAT", "PHOTO_AREA_RATIO",
+    "MIN_RENDER_SCALE", "MAX_RENDER_SCALE", "MIN_RENDER_LONG_SIDE", "MAX_RENDER_PIXELS", "RENDER_SCALE_STEP",
+    "EMBEDDED_IMAGE_TOLERANCE",
+    "SCANNED_PAGE_COVERAGE", "RASTER_DPI", "RASTER_INK_CONTRAST", "RASTER_PAPER_LEVEL", "RASTER_SOLID_SIZE", "RASTER_MERGE_GAP",
+    "RASTER_RULE_LENGTH", "RASTER_RULE_SPAN",
+)
+
+
+class ProcessingTimeout(BaseException):
+    """Raised when a page or document exceeds its time budget (not caught by `except Exception`)"""
+
+
+class PageDeadline:
+    """Context manager that raises ProcessingTimeout from SIGALRM once the deadline passes"""
+
+    def __init__(self, seconds: float):
+        self.seconds = max(seconds, 0.001)
+        self._previous_handler = None
+        self._armed = False
+
+    def __enter__(self) -> 'PageDeadline':
+        if hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGALRM, self._expired)
+            # Keep firing after the deadline: a timeout raised inside a C callback can be swallowed
+            signal.setitimer(signal.ITIMER_REAL, self.seconds, PAGE_DEADLINE_REPEAT)
+            self._armed = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            self._armed = False
+        return False
+
+    def _expired(self, signum, frame):
+        raise ProcessingTimeout(f"deadline of {self.seconds:g}s exceeded")
+
+
+@contextmanager
+def deadline_deferred():
+    """Hold SIGALRM while PyMuPDF runs a Python device (which swallows exceptions); it fires on exit"""
+    if not hasattr(signal, 'pthread_sigmask'):
+        yield
+        return
+    previous = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    try:
+        yield
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, previous)
+
+
+NULL_STAGE = nullcontext()
+
+
+class StageProfiler:
+    """Stage timers, counters and per-page breakdowns for one processing run
+
+    Disabled, which is the default, stage() hands back one shared no-op
+    context manager and count() returns at once, so instrumented code costs
+    a method call per stage. Enabled, stage(name) accumulates calls, total
+    and maximum seconds per stage. Stages nest, and a stage's time includes
+    its nested stages ("detect" includes "detect.tables"). Inside page()
+    the stages run on the page's thread are also summed per page; each
+    page then adds to per-stage histograms of page seconds, and the
+    PROFILE_SLOWEST_PAGES slowest pages are kept with their breakdown.
+
+    With trace on, every stage and page is recorded as a Trace Event Format
+    "complete" event; write_trace() saves them for chrome://tracing,
+    Perfetto or speedscope. Timestamps come from time.perf_counter, so
+    events from worker processes line up with the parent's on one machine.
+    """
+
+    def __init__(self, enabled: bool = False, trace: bool = False):
+        self.enabled = enabled or trace
+        self.trace = trace
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        self.stages: Dict[str, List[float]] = {}  # name -> [calls, seconds, max seconds]
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.histograms: Dict[str, List[int]] = {}
+        self.slowest: List[Tuple[float, int, Dict[str, float]]] = []  # Min-heap of (seconds, page, stages)
+        self.events: List[Dict[str, Any]] = []
+        self._page: Optional[Dict[str, float]] = None
+        self._page_thread: Optional[int] = None
+
+    def stage(self, name: str):
+        """Context manager timing one run of stage name"""
+        return self._timed(name) if self.enabled else NULL_STAGE
+
+    def page(self, page_num: int):
+        """Context manager timing page page_num (0-based) and collecting its stage breakdown"""
+        return self._timed_page(page_num) if self.enabled else NULL_STAGE
+
+    def count(self, name: str, n: int = 1):
+        """Add n to counter name"""
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None, page: bool = True):
+        """Record seconds spent in stage name, e.g. measured on another thread
+
+        start (a perf_counter value) places the stage in the trace; without
+        page the time is not charged to the page being processed.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                entry = self.stages[name] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            if page and self._page is not None and threading.get_ident() == self._page_thread:
+                self._page[name] = self._page.get(name, 0.0) + seconds
+            if self.trace and start is not None:
+                self._event(name, "stage", start, seconds)
+
+    @contextmanager
+    def _timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, start)
+
+    @contextmanager
+    def _timed_page(self, page_num: int):
+        self._page, self._page_thread = {}, threading.get_ident()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stages, self._page = self._page, None
+            with self._lock:
+                self._add_page(page_num + 1, seconds, stages)
+                if self.trace:
+                    self._event(f"page {page_num + 1}", "page", start, seconds)
+
+    def _add_page(self, page_number: int, seconds: float, stages: Dict[str, float]):
+        for name, value in [("page", seconds)] + [(name, value) for name, value in stages.items() if "." not in name]:
+            counts = self.histograms.get(name)
+            if counts is None:
+                counts = self.histograms[name] = [0] * (len(PROFILE_HISTOGRAM_BOUNDS) + 1)
+            counts[bisect.bisect_left(PROFILE_HISTOGRAM_BOUNDS, value)] += 1
+
+        self._keep_slowest((seconds, page_number, {name: round(value, 6) for name, value in stages.items()}))
+
+    def _keep_slowest(self, record: Tuple[float, int, Dict[str, float]]):
+        if len(self.slowest) < PROFILE_SLOWEST_PAGES:
+            heapq.heappush(self.slowest, record)
+        elif record[0] > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, record)
+
+    def _event(self, name: str, category: str, start: float, seconds: float):
+        self.events.append({"name": name, "cat": category, "ph": "X", "ts": round(start * 1e6, 3),
+                            "dur": round(seconds * 1e6, 3), "pid": os.getpid(), "tid": threading.get_ident()})
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-ready record: stages by total time, counters, page histograms and the slowest pages"""
+        labels = [f"<={bound}s" for bound in PROFILE_HISTOGRAM_BOUNDS] + [f">{PROFILE_HISTOGRAM_BOUNDS[-1]}s"]
+        with self._lock:
+            return {
+                "stages": {name: {"calls": calls, "seconds": round(seconds, 6), "max_seconds": round(longest, 6)}
+                           for name, (calls, seconds, longest)
+                           in sorted(self.stages.items(), key=lambda item: -item[1][1])},
+                "counters": dict(sorted(self.counters.items())),
+                "page_histograms": {name: dict(zip(labels, counts)) for name, counts in self.histograms.items()},
+                "slowest_pages": [{"page": page_number, "seconds": round(seconds, 6), "stages": stages}
+                                  for seconds, page_number, stages in sorted(self.slowest, reverse=True)],
+            }
+
+    def merge(self, summary: Dict[str, Any], events: Optional[List[Dict[str, Any]]] = None):
+        """Fold in another profiler's summary() and trace events, e.g. a worker's"""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, record in summary["stages"].items():
+                entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += record["calls"]
+                entry[1] += record["seconds"]
+                entry[2] = max(entry[2], record["max_seconds"])
+            for name, n in summary["counters"].items():
+                self.counters[name] += n
+            for name, buckets in summary["page_histograms"].items():
+                counts = self.histograms.setdefault(name, [0] * (len(PROFILE_HISTOGRAM_BOUNDS) + 1))
+                for i, n in enumerate(buckets.values()):
+                    counts[i] += n
+            for page in summary["slowest_pages"]:
+                self._keep_slowest((page["seconds"], page["page"], page["stages"]))
+            if self.trace and events:
+                self.events.extend(events)
+
+    def write_trace(self, path: str):
+        """Write the recorded events as a Trace Event Format JSON file"""
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+NULL_PROFILER = StageProfiler()  # Shared disabled profiler for detectors used on their own
 
 
 class ElementType(Enum):
@@ -133,9 +452,41 @@ class ElementType(Enum):
     IMAGE = "image"
 
 
+# Reference keywords in reporting order; all share the number and title syntax
+REFERENCE_KEYWORDS = (
+    (ElementType.TABLE, 'table', r'\s+'),
+    (ElementType.TABLE, 'tab.', r'\s*'),
+    (ElementType.FIGURE, 'figure', r'\s+'),
+    (ElementType.FIGURE, 'fig.', r'\s*'),
+    (ElementType.CHART, 'chart', r'\s+'),
+    (ElementType.CHART, 'diagram', r'\s+'),
+)
+REFERENCE_KEYWORD_INDEX = {word: i for i, (_, word, _) in enumerate(REFERENCE_KEYWORDS)}
+REFERENCE_ABBREVIATIONS = {'tab.': 'table', 'fig.': 'figure'}  # Spellings that name the same element
+
+# One compiled alternation finds every reference kind in a single scan. The
+# title is captured in a lookahead so it does not hide later references.
+REFERENCE_PATTERN = re.compile(
+    r"\b(?P<keyword>" + "|".join(re.escape(word) + sep for _, word, sep in REFERENCE_KEYWORDS) + r")"
+    r"(?P<number>\d+(?:\.\d+)?)"
+    r"(?:(?=\s*[:\-\.]\s*(?P<title>[^\n\r]{1,100})))?",
+    re.IGNORECASE
+)
+
+
+NO_ATTRIBUTES: Dict[str, Any] = {}  # Shared by elements detached from their PDF objects; never mutated
+
+
 @dataclass
 class VisualElement:
-    """Represents a detected visual element (line, rect, image, etc.)"""
+    """Represents a detected visual element (line, rect, image, etc.)
+
+    Slotted, since detection builds one per nearby primitive for every
+    reference. attributes is the parser's own object, never copied; elements
+    restored from the cache or a worker share NO_ATTRIBUTES.
+    """
+    __slots__ = ('element_type', 'bbox', 'confidence', 'attributes')
+
     element_type: str  # 'line', 'rect', 'image', 'curve'
     bbox: Tuple[float, float, float, float]  # x0, y0, x1, y1
     confidence: float
@@ -154,6 +505,7 @@ class BoundingBox:
     text_density: float = 0.0
     has_visual_content: bool = False
     buffer_zone: float = DEFAULT_BUFFER_ZONE
+    raster_image: bool = False  # An embedded image or a picture on a scan: complete visual content on its own
 
     @property
     def width(self) -> float:
@@ -178,7 +530,7 @@ class BoundingBox:
                   self.area >= MIN_ELEMENT_AREA)
 
         visual_ok = (self.has_visual_content and
-                    self.visual_elements_count >= MIN_VISUAL_ELEMENTS and
+                    (self.visual_elements_count >= MIN_VISUAL_ELEMENTS or self.raster_image) and
                     self.text_density < TEXT_ONLY_THRESHOLD)
 
         confidence_ok = self.confidence >= VISUAL_CONFIDENCE_THRESHOLD
@@ -215,110 +567,1039 @@ class DocumentElement:
     quality_metrics: Dict[str, float]
 
 
+@dataclass
+class ElementTotals:
+    """Running totals over emitted elements, enough for the processing summary"""
+    count: int = 0
+    with_visual_content: int = 0
+    visual_elements: int = 0
+    text_density: float = 0.0
+    visual_confidence: float = 0.0
+
+    def add(self, element: DocumentElement):
+        self.count += 1
+        self.with_visual_content += 1 if element.bbox.has_visual_content else 0
+        self.visual_elements += element.bbox.visual_elements_count
+        self.text_density += element.bbox.text_density
+        self.visual_confidence += element.quality_metrics.get("visual_confidence", 0)
+
+    @classmethod
+    def of(cls, elements: List[DocumentElement]) -> 'ElementTotals':
+        totals = cls()
+        for element in elements:
+            totals.add(element)
+        return totals
+
+
+class PageSpatialIndex:
+    """Uniform grid over a page's images, rects and curves; area queries return them in page order"""
+
+    PRIMITIVE_SOURCES = (
+        ('image', 'images', 1.0),
+        ('rect', 'rects', 0.8),
+        ('curve', 'curves', 0.7),
+    )
+
+    def __init__(self, page, cell_size: float = SPATIAL_GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.kinds = bytearray()  # Position in PRIMITIVE_SOURCES
+        self.objects: List[Dict] = []  # Raw parser objects
+        self.bboxes: List[Optional[Tuple[float, float, float, float]]] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self._oversized: List[int] = []
+
+        for kind, (_, attr, _) in enumerate(self.PRIMITIVE_SOURCES):
+            if not hasattr(page, attr):
+                continue
+            for obj in getattr(page, attr):
+                self._insert(kind, obj)
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def _insert(self, kind: int, obj: Dict):
+        idx = len(self.objects)
+        self.kinds.append(kind)
+        self.objects.append(obj)
+
+        try:
+            x0 = obj.get('x0', 0)
+            y0 = obj.get('top', obj.get('y0', 0))
+            x1 = obj.get('x1', x0)
+            y1 = obj.get('bottom', obj.get('y1', y0))
+            cx0, cy0 = self._cell(x0), self._cell(y0)
+            cx1, cy1 = self._cell(x1), self._cell(y1)
+        except Exception:
+            # Unusable coordinates never match an area query
+            self.bboxes.append(None)
+            return
+
+        self.bboxes.append((x0, y0, x1, y1))
+
+        if cx1 < cx0 or cy1 < cy0 or (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > SPATIAL_GRID_MAX_CELLS:
+            self._oversized.append(idx)
+            return
+
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self._cells[(cx, cy)].append(idx)
+
+    def _cell(self, value: float) -> int:
+        return int(math.floor(value / self.cell_size))
+
+    def query(self, area: Tuple[float, float, float, float]) -> List[int]:
+        """Indices of primitives overlapping area, in page order"""
+        try:
+            area_x0, area_y0, area_x1, area_y1 = area
+            cx0, cy0 = self._cell(area_x0), self._cell(area_y0)
+            cx1, cy1 = self._cell(area_x1), self._cell(area_y1)
+        except Exception:
+            return []
+
+        candidates = set(self._oversized)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            for (cx, cy), members in self._cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    candidates.update(members)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    members = self._cells.get((cx, cy))
+                    if members:
+                        candidates.update(members)
+
+        hits = []
+        for idx in sorted(candidates):
+            bbox = self.bboxes[idx]
+            if bbox is None:
+                continue
+            try:
+                elem_x0, elem_y0, elem_x1, elem_y1 = bbox
+                if not (elem_x1 < area_x0 or elem_x0 > area_x1 or
+                        elem_y1 < area_y0 or elem_y0 > area_y1):
+                    hits.append(idx)
+            except Exception:
+                continue
+        return hits
+
+    def count(self, area: Tuple[float, float, float, float]) -> int:
+        """Number of primitives overlapping area"""
+        return len(self.query(area))
+
+    def visual_element(self, idx: int) -> 'VisualElement':
+        """Build the VisualElement for primitive idx"""
+        element_type, _, confidence = self.PRIMITIVE_SOURCES[self.kinds[idx]]
+        obj = self.objects[idx]
+        bbox = self.bboxes[idx]
+        return VisualElement(
+            element_type=element_type,
+            bbox=bbox if bbox is not None else (obj['x0'], obj['top'], obj['x1'], obj['bottom']),
+            confidence=confidence,
+            attributes=obj
+        )
+
+    def visual_elements(self, indices=None) -> List['VisualElement']:
+        """Build VisualElements for indices (all primitives if None)"""
+        if indices is None:
+            indices = range(len(self.objects))
+        return [self.visual_element(idx) for idx in indices]
+
+    def indices_of_type(self, element_type: str) -> List[int]:
+        """Indices of all primitives of one element type, in page order"""
+        kinds = {kind for kind, (etype, _, _) in enumerate(self.PRIMITIVE_SOURCES) if etype == element_type}
+        return [idx for idx, kind in enumerate(self.kinds) if kind in kinds]
+
+
+class PageClusters:
+    """Groups of a page's primitives that lie close together, found once per page
+
+    Every primitive marks the CLUSTER_CELL_SIZE grid cells its box covers;
+    primitives sharing a cell, or marking 8-adjacent cells, are joined with
+    union-find. This is single-linkage clustering (DBSCAN with one sample
+    per core point) where boxes up to one to two cells apart connect, in
+    time linear in the cells marked. Backdrops covering more than
+    CLUSTER_BACKDROP_RATIO of the page, and primitives spanning more than
+    CLUSTER_MAX_CELLS cells, stay on their own so they cannot fuse every
+    figure on the page. A reference then only looks up the nearest cluster.
+    """
+
+    NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))  # Half the 8-neighbourhood; the other half links back
+
+    def __init__(self, index: PageSpatialIndex, page_area: Optional[float] = None,
+                 cell_size: float = CLUSTER_CELL_SIZE):
+        self.cell_size = cell_size
+        self.clusters: List[Tuple[Tuple[float, float, float, float], List[int]]] = []  # (bbox, primitive indices)
+        parent = list(range(len(index)))
+
+        def find(idx: int) -> int:
+            while parent[idx] != idx:
+                parent[idx] = parent[parent[idx]]
+                idx = parent[idx]
+            return idx
+
+        def union(a: int, b: int):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        backdrop_area = page_area * CLUSTER_BACKDROP_RATIO if page_area else None
+        cell_owners: Dict[Tuple[int, int], int] = {}
+        for idx, bbox in enumerate(index.bboxes):
+            if bbox is None:
+                continue
+            try:
+                x0, y0, x1, y1 = bbox
+                if backdrop_area is not None and (x1 - x0) * (y1 - y0) > backdrop_area:
+                    continue
+                cx0, cy0 = self._cell(x0), self._cell(y0)
+                cx1, cy1 = self._cell(x1), self._cell(y1)
+            except Exception:
+                continue
+            if cx1 < cx0 or cy1 < cy0 or (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > CLUSTER_MAX_CELLS:
+                continue
+
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    owner = cell_owners.setdefault((cx, cy), idx)
+                    if owner != idx:
+                        union(owner, idx)
+
+        for (cx, cy), owner in cell_owners.items():
+            for dx, dy in self.NEIGHBOURS:
+                neighbour = cell_owners.get((cx + dx, cy + dy))
+                if neighbour is not None:
+                    union(owner, neighbour)
+
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for idx, bbox in enumerate(index.bboxes):
+            if bbox is not None:
+                groups[find(idx)].append(idx)
+
+        # Roots are each group's lowest index, so clusters come out in page order
+        for root in sorted(groups):
+            members = groups[root]
+            boxes = [index.bboxes[idx] for idx in members]
+            bbox = (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                    max(box[2] for box in boxes), max(box[3] for box in boxes))
+            self.clusters.append((bbox, members))
+
+    def __len__(self) -> int:
+        return len(self.clusters)
+
+    def _cell(self, value: float) -> int:
+        return int(math.floor(value / self.cell_size))
+
+    def nearest(self, area: Tuple[float, float, float, float], max_distance: float,
+                min_size: int = 1) -> Optional[Tuple[Tuple[float, float, float, float], List[int]]]:
+        """The cluster of at least min_size primitives closest to area, if within max_distance
+
+        Distance is the gap between the two boxes (0 when they overlap); ties
+        go to the earlier cluster in page order.
+        """
+        area_x0, area_y0, area_x1, area_y1 = area
+        best = None
+        best_distance = float('inf')
+        for cluster in self.clusters:
+            (x0, y0, x1, y1), members = cluster
+            if len(members) < min_size:
+                continue
+            dx = max(0.0, x0 - area_x1, area_x0 - x1)
+            dy = max(0.0, y0 - area_y1, area_y0 - y1)
+            distance = math.sqrt(dx * dx + dy * dy)
+            if distance <= max_distance and distance < best_distance:
+                best, best_distance = cluster, distance
+        return best
+
+
+class PageCharBoxes:
+    """Columnar char boxes (x0, top, x1, bottom) of a page for text density
+
+    Loaded once per page. With NumPy, containment and the text area sum are
+    vectorized masks over all chars; the sum is accumulated in page order so
+    densities are bit-for-bit identical to a per-char Python loop.
+    """
+
+    def __init__(self, page):
+        self.boxes: List[Tuple[float, float, float, float]] = []
+        self.valid = True
+        self._columns = None
+        self._char_areas = None
+
+        try:
+            for char in getattr(page, 'chars', []):
+                char_x0 = char.get('x0', 0)
+                char_y0 = char.get('top', char.get('y0', 0))
+                char_x1 = char.get('x1', char_x0)
+                char_y1 = char.get('bottom', char.get('y1', char_y0))
+                self.boxes.append((char_x0, char_y0, char_x1, char_y1))
+        except Exception:
+            self.valid = False
+            return
+
+        if HAS_NUMPY and self.boxes:
+            try:
+                columns = np.array(self.boxes, dtype=np.float64).T
+                self._columns = columns
+                self._char_areas = (columns[2] - columns[0]) * (columns[3] - columns[1])
+            except (TypeError, ValueError):
+                self._columns = None
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def density(self, area: Tuple[float, float, float, float]) -> float:
+        """Text density of one area (0.0 = no text, 1.0 = all text)"""
+        return self.densities([area])[0]
+
+    def densities(self, areas: List[Tuple[float, float, float, float]]) -> List[float]:
+        """Text density for each area, scored in vectorized batches"""
+        results: List[Optional[float]] = [None] * len(areas)
+        pending = []
+
+        for i, area in enumerate(areas):
+            try:
+                x0, y0, x1, y1 = area
+                area_size = (x1 - x0) * (y1 - y0)
+                if area_size <= 0:
+                    results[i] = 0.0
+                elif not self.valid:
+                    results[i] = 0.5  # Default neutral value
+                elif not self.boxes:
+                    results[i] = min(1.0, 0.0 / area_size)
+                else:
+                    pending.append((i, (x0, y0, x1, y1), area_size))
+            except Exception:
+                results[i] = 0.5
+
+        if pending and self._columns is not None:
+            self._score_vectorized(pending, results)
+        else:
+            for i, area, area_size in pending:
+                results[i] = self._score_python(area, area_size)
+
+        return results
+
+    def _score_python(self, area: Tuple[float, float, float, float], area_size: float) -> float:
+        try:
+            x0, y0, x1, y1 = area
+            text_area = 0.0
+            for char_x0, char_y0, char_x1, char_y1 in self.boxes:
+                if (x0 <= char_x0 <= x1 and y0 <= char_y0 <= y1 and
+                    x0 <= char_x1 <= x1 and y0 <= char_y1 <= y1):
+                    text_area += (char_x1 - char_x0) * (char_y1 - char_y0)
+            return min(1.0, text_area / area_size)
+        except Exception:
+            return 0.5
+
+    def _score_vectorized(self, pending, results: List[Optional[float]]):
+        char_x0, char_y0, char_x1, char_y1 = self._columns
+        batch = max(1, TEXT_DENSITY_BATCH_SIZE // len(self.boxes))
+
+        for start in range(0, len(pending), batch):
+            chunk = pending[start:start + batch]
+            try:
+                bounds = np.array([area for _, area, _ in chunk], dtype=np.float64)
+            except (TypeError, ValueError):
+                for i, area, area_size in chunk:
+                    results[i] = self._score_python(area, area_size)
+                continue
+
+            x0, y0, x1, y1 = (bounds[:, k:k + 1] for k in range(4))
+            inside = ((x0 <= char_x0) & (char_x0 <= x1) & (y0 <= char_y0) & (char_y0 <= y1) &
+                      (x0 <= char_x1) & (char_x1 <= x1) & (y0 <= char_y1) & (char_y1 <= y1))
+
+            # cumsum accumulates left to right like the scalar loop (np.sum is
+            # pairwise and would round differently); adding 0.0 normalizes -0.0
+            text_areas = np.cumsum(np.where(inside, self._char_areas, 0.0), axis=1)[:, -1]
+
+            for (i, _, area_size), text_area in zip(chunk, text_areas):
+                results[i] = min(1.0, (0.0 + float(text_area)) / area_size)
+
+
+class PageTextIndex:
+    """Page text with an exact character-offset to char-box mapping
+
+    Built once per page in O(chars): whitespace is dropped and text is
+    lowercased, and every remaining character keeps the box of the pdfplumber
+    char it came from. Start offsets are keyed by their leading
+    TEXT_INDEX_KEY_LENGTH characters, so a lookup costs O(len(text)) per
+    candidate instead of a scan of the whole page.
+    """
+
+    def __init__(self, page):
+        parts = []
+        self.boxes: List[Tuple[float, float, float, float]] = []
+        self._starts: Optional[Dict[str, List[int]]] = None
+
+        for char in getattr(page, 'chars', []):
+            char_text = self.normalize(char.get('text', ''))
+            if not char_text:
+                continue
+            char_x0 = char.get('x0', 0)
+            char_y0 = char.get('top', char.get('y0', 0))
+            char_x1 = char.get('x1', char_x0)
+            char_y1 = char.get('bottom', char.get('y1', char_y0))
+            parts.append(char_text)
+            self.boxes.extend([(char_x0, char_y0, char_x1, char_y1)] * len(char_text))
+
+        self.text = ''.join(parts)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Whitespace-free, lowercased form used on both sides of a lookup"""
+        return ''.join(text.split()).lower()
+
+    def find(self, target: str) -> int:
+        """Offset of the first occurrence of normalized target, or -1"""
+        if len(target) < TEXT_INDEX_KEY_LENGTH:
+            return self.text.find(target)
+
+        if self._starts is None:
+            starts: Dict[str, List[int]] = defaultdict(list)
+            text = self.text
+            for offset in range(len(text) - TEXT_INDEX_KEY_LENGTH + 1):
+                starts[text[offset:offset + TEXT_INDEX_KEY_LENGTH]].append(offset)
+            self._starts = dict(starts)
+
+        for offset in self._starts.get(target[:TEXT_INDEX_KEY_LENGTH], ()):
+            if self.text.startswith(target, offset):
+                return offset
+        return -1
+
+    def locate(self, text: str) -> Optional[Tuple[float, float, float, float]]:
+        """Bounding box of the chars spelling text, or None if it is not on the page"""
+        target = self.normalize(text)
+        if not target:
+            return None
+
+        offset = self.find(target)
+        if offset < 0:
+            return None
+
+        boxes = self.boxes[offset:offset + len(target)]
+        return (
+            min(box[0] for box in boxes),
+            min(box[1] for box in boxes),
+            max(box[2] for box in boxes),
+            max(box[3] for box in boxes)
+        )
+
+
+class PageVisualModel:
+    """Everything detection needs from one page, built on first use and shared by every stage"""
+
+    def __init__(self, page, profiler: Optional[StageProfiler] = None):
+        self.page = page
+        self.page_number = getattr(page, 'page_number', 1)
+        self.profiler = profiler or NULL_PROFILER
+        self._index: Optional[PageSpatialIndex] = None
+        self._clusters: Optional[PageClusters] = None
+        self._char_boxes: Optional[PageCharBoxes] = None
+        self._text_index: Optional[PageTextIndex] = None
+        self._tables: Optional[List[Tuple[Any, List]]] = None
+        self._elements: List[Optional[VisualElement]] = []
+
+    @property
+    def index(self) -> PageSpatialIndex:
+        if self._index is None:
+            with self.profiler.stage("detect.index"):
+                self._index = PageSpatialIndex(self.page)
+            self._elements = [None] * len(self._index)
+            self.profiler.count("primitives", len(self._index))
+        return self._index
+
+    @property
+    def clusters(self) -> PageClusters:
+        if self._clusters is None:
+            width, height = getattr(self.page, 'width', None), getattr(self.page, 'height', None)
+            index = self.index
+            with self.profiler.stage("detect.clusters"):
+                self._clusters = PageClusters(index, width * height if width and height else None)
+            self.profiler.count("clusters", len(self._clusters))
+        return self._clusters
+
+    @property
+    def char_boxes(self) -> PageCharBoxes:
+        if self._char_boxes is None:
+            with self.profiler.stage("detect.char_boxes"):
+                self._char_boxes = PageCharBoxes(self.page)
+        return self._char_boxes
+
+    @property
+    def text_index(self) -> PageTextIndex:
+        if self._text_index is None:
+            with self.profiler.stage("detect.text_index"):
+                self._text_index = PageTextIndex(self.page)
+        return self._text_index
+
+    @property
+    def tables(self) -> List[Tuple[Any, List]]:
+        """(table object, extracted rows) pairs; the table finder runs once per page"""
+        if self._tables is None:
+            with self.profiler.stage("detect.find_tables"):
+                try:
+                    self._tables = [(table_obj, table_obj.extract()) for table_obj in self.page.find_tables()]
+                except Exception as e:
+                    logging.getLogger(__name__).warning(f"Table finding failed: {e}")
+                    self._tables = []
+            self.profiler.count("tables_found", len(self._tables))
+        return self._tables
+
+    def visual_elements(self, indices=None) -> List[VisualElement]:
+        """VisualElements for primitive indices (all if None); each is built once and shared"""
+        index = self.index
+        if indices is None:
+            indices = range(len(index))
+        elements = self._elements
+        result = []
+        for idx in indices:
+            element = elements[idx]
+            if element is None:
+                element = elements[idx] = index.visual_element(idx)
+            result.append(element)
+        return result
+
+
+class PageImagePlacements:
+    """What the embedded-image fast path checks on one PyMuPDF page, read once per page
+
+    Image placements, vector drawing rects and visible text boxes are each
+    fetched from PyMuPDF on first use and shared by every element on the
+    page, so pages without standalone images never fetch them.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._images: Optional[List[Dict[str, Any]]] = None
+        self._drawing_rects: Optional[List] = None
+        self._text_rects: Optional[List] = None
+
+    @property
+    def images(self) -> List[Dict[str, Any]]:
+        if self._images is None:
+            self._images = self.page.get_image_info(xrefs=True)
+        return self._images
+
+    @property
+    def drawing_rects(self) -> List:
+        if self._drawing_rects is None:
+            self._drawing_rects = [fitz.Rect(drawing['rect']) for drawing in self.page.get_drawings()]
+        return self._drawing_rects
+
+    @property
+    def text_rects(self) -> List:
+        """Boxes of visible text spans (type 3 is an invisible OCR layer)"""
+        if self._text_rects is None:
+            self._text_rects = [fitz.Rect(span['bbox']) for span in self.page.get_texttrace() if span['type'] != 3]
+        return self._text_rects
+
+
+class PyMuPDFPage:
+    """pdfplumber-style page view (chars, images, rects, curves) built with PyMuPDF alone
+
+    Chars come from one "rawdict" text extraction, images from
+    get_image_info() and vector primitives from get_drawings(), split into
+    subpaths and classified the way pdfminer does: single segments are lines
+    (not detection primitives), closed axis-aligned four-corner paths are
+    rects and everything else is a curve. Coordinates are pdfplumber's: points
+    from the top-left corner, with char boxes one font size tall above the
+    descender. Everything is extracted on first use and dropped by close().
+    """
+
+    def __init__(self, doc, page_num: int):
+        self.doc = doc
+        self.page_number = page_num + 1
+        self._page = None
+        self._textpage = None
+        self._chars: Optional[List[Dict[str, Any]]] = None
+        self._images: Optional[List[Dict[str, Any]]] = None
+        self._rects: Optional[List[Dict[str, Any]]] = None
+        self._curves: Optional[List[Dict[str, Any]]] = None
+        self._drawings: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def page(self):
+        if self._page is None:
+            self._page = self.doc[self.page_number - 1]
+        return self._page
+
+    @property
+    def width(self) -> float:
+        return self.page.rect.width
+
+    @property
+    def height(self) -> float:
+        return self.page.rect.height
+
+    def _get_textpage(self):
+        if self._textpage is None:
+            self._textpage = self.page.get_textpage()
+        return self._textpage
+
+    @property
+    def chars(self) -> List[Dict[str, Any]]:
+        if self._chars is None:
+            chars = []
+            raw = self.page.get_text("rawdict", textpage=self._get_textpage())
+            for block in raw["blocks"]:
+                for line in block.get("lines", ()):
+                    horizontal = tuple(line["dir"]) == (1.0, 0.0)
+                    for span in line["spans"]:
+                        size = span["size"]
+                        descent = span["descender"] * size
+                        for char in span["chars"]:
+                            x0, top, x1, bottom = char["bbox"]
+                            if horizontal:
+                                bottom = char["origin"][1] - descent
+                                top = bottom - size
+                            chars.append({"text": char["c"], "x0": x0, "top": top, "x1": x1, "bottom": bottom,
+                                          "size": size, "fontname": span["font"]})
+            self._chars = chars
+        return self._chars
+
+    @property
+    def images(self) -> List[Dict[str, Any]]:
+        if self._images is None:
+            images = []
+            for info in self.page.get_image_info(xrefs=True):
+                x0, top, x1, bottom = info["bbox"]
+                images.append({"object_type": "image", "x0": x0, "top": top, "x1": x1, "bottom": bottom,
+                               "width": x1 - x0, "height": bottom - top,
+                               "srcsize": (info["width"], info["height"]), "xref": info.get("xref", 0)})
+            self._images = images
+        return self._images
+
+    @property
+    def rects(self) -> List[Dict[str, Any]]:
+        if self._rects is None:
+            self._load_drawings()
+        return self._rects
+
+    @property
+    def curves(self) -> List[Dict[str, Any]]:
+        if self._curves is None:
+            self._load_drawings()
+        return self._curves
+
+    def _get_drawings(self) -> List[Dict[str, Any]]:
+        if self._drawings is None:
+            self._drawings = self.page.get_drawings()
+        return self._drawings
+
+    def _load_drawings(self):
+        rects, curves = [], []
+        for drawing in self._get_drawings():
+            attributes = {"fill": "f" in drawing["type"], "stroke": "s" in drawing["type"],
+                          "linewidth": drawing.get("width") or 0}
+            for points, closed, straight in self._subpaths(drawing):
+                if straight and len(points) == 2:
+                    continue  # A single line segment
+                if straight and closed and len(points) == 4 and self._is_axis_aligned(points):
+                    target, object_type = rects, "rect"
+                else:
+                    target, object_type = curves, "curve"
+                xs = [point[0] for point in points]
+                ys = [point[1] for point in points]
+                target.append(dict(attributes, object_type=object_type, x0=min(xs), top=min(ys), x1=max(xs),
+                                   bottom=max(ys), width=max(xs) - min(xs), height=max(ys) - min(ys)))
+        self._rects, self._curves = rects, curves
+
+    @staticmethod
+    def _subpaths(drawing: Dict[str, Any]) -> List[Tuple[List[Tuple[float, float]], bool, bool]]:
+        """(on-curve points, closed, only straight segments) for each subpath of a drawing"""
+        subpaths = []
+        chain = None
+        for item in drawing["items"]:
+            op = item[0]
+            if op in ("re", "qu"):
+                quad = item[1].quad if op == "re" else item[1]
+                subpaths.append([[tuple(quad.ul), tuple(quad.ur), tuple(quad.lr), tuple(quad.ll)], True, True])
+                chain = None
+                continue
+
+            start, end = tuple(item[1]), tuple(item[-1])
+            if chain is None or chain[0][-1] != start:
+                chain = [[start], False, True]
+                subpaths.append(chain)
+            chain[0].append(end)
+            chain[2] = chain[2] and op == "l"
+
+        if chain is not None and drawing.get("closePath"):
+            chain[1] = True  # closePath applies to the last subpath
+        for subpath in subpaths:
+            points = subpath[0]
+            if len(points) > 2 and points[0] == points[-1]:
+                subpath[0], subpath[1] = points[:-1], True
+        return [tuple(subpath) for subpath in subpaths]
+
+    @staticmethod
+    def _is_axis_aligned(points: List[Tuple[float, float]]) -> bool:
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points
+        return ((x0 == x1 and y1 == y2 and x2 == x3 and y3 == y0) or
+                (y0 == y1 and x1 == x2 and y2 == y3 and x3 == x0))
+
+    def extract_text(self) -> str:
+        """Page text in reading order, from the same extraction as the chars"""
+        return self.page.get_text("text", textpage=self._get_textpage(), sort=True)
+
+    def find_tables(self) -> List[Any]:
+        """Tables from PyMuPDF's port of pdfplumber's table finder, reusing the extracted drawings"""
+        return self.page.find_tables(paths=self._get_drawings()).tables
+
+    def close(self):
+        """Drop everything extracted from this page"""
+        self._page = self._textpage = None
+        self._chars = self._images = self._rects = self._curves = self._drawings = None
+
+
+class PdfplumberBackend:
+    """Detection on pdfplumber pages; screenshots from a separate PyMuPDF document"""
+
+    name = "pdfplumber"
+
+    @staticmethod
+    def available() -> bool:
+        return HAS_PDFPLUMBER and HAS_PYMUPDF
+
+    @contextmanager
+    def open(self, pdf_path: str, page_numbers: Optional[List[int]] = None):
+        """Yield (detection pages, PyMuPDF document); page_numbers are 1-based, None for all"""
+        with pdfplumber.open(pdf_path, pages=page_numbers) as pdf_plumber:
+            with fitz.open(pdf_path) as pdf_pymupdf:
+                yield pdf_plumber.pages, pdf_pymupdf
+
+
+class PyMuPDFBackend:
+    """Detection and screenshots from one PyMuPDF document, so each PDF is parsed once"""
+
+    name = "pymupdf"
+
+    @staticmethod
+    def available() -> bool:
+        return HAS_PYMUPDF
+
+    @contextmanager
+    def open(self, pdf_path: str, page_numbers: Optional[List[int]] = None):
+        """Yield (detection pages, PyMuPDF document); page_numbers are 1-based, None for all"""
+        with fitz.open(pdf_path) as pdf_pymupdf:
+            if page_numbers is None:
+                page_numbers = range(1, pdf_pymupdf.page_count + 1)
+            yield [PyMuPDFPage(pdf_pymupdf, number - 1) for number in page_numbers], pdf_pymupdf
+
+
+PDF_BACKENDS = {backend.name: backend for backend in (PdfplumberBackend, PyMuPDFBackend)}
+
+
+class RasterRegion(NamedTuple):
+    """A figure or table found on a scanned page's thumbnail, in page points"""
+    element_type: ElementType
+    bbox: Tuple[float, float, float, float]
+    confidence: float
+    parts: int  # Rules of a table, ink blobs of a picture
+
+
+class RasterRegionDetector:
+    """Figure and table regions of scanned pages, from low-resolution renders analysed with OpenCV
+
+    Scanned pages carry no rects or curves, only one page-sized image, so
+    the vector detector has nothing to cluster. Each scanned page is
+    rendered once in grey at RASTER_DPI; ink is whatever is
+    RASTER_INK_CONTRAST levels darker than the paper. Tables are grids of
+    long horizontal and vertical rules (morphological opening with line
+    kernels); pictures are ink that survives opening with a
+    RASTER_SOLID_SIZE square, which erases text and rules, closed over
+    RASTER_MERGE_GAP. Regions are the bounding boxes of the connected
+    components. A page with no paper showing at all is a full-page plate
+    and yields one picture.
+
+    Thumbnails are rendered RASTER_BATCH_PAGES scanned pages ahead (PyMuPDF
+    is not thread-safe) and analysed on a thread pool while the page loop
+    carries on, so a long scan costs about one render and a few
+    milliseconds of OpenCV per page.
+    """
+
+    def __init__(self, threads: int = RASTER_THREADS, batch_pages: int = RASTER_BATCH_PAGES, dpi: float = RASTER_DPI):
+        self.threads = max(0, threads)
+        self.batch_pages = max(1, batch_pages)
+        self.scale = dpi / 72
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[int, Future] = {}
+        self._ready: Optional[bool] = None
+        self.profiler = NULL_PROFILER  # The processor shares its own
+
+    @staticmethod
+    def available() -> bool:
+        return HAS_OPENCV and HAS_PYMUPDF
+
+    def ready(self) -> bool:
+        """Import OpenCV on first use; False, with one warning, when the installed build fails to load"""
+        if self._ready is None:
+            try:
+                np._lazy_load()
+                cv2._lazy_load()
+                self._ready = True
+            except ImportError as e:
+                logging.getLogger(__name__).warning(f"OpenCV failed to load; scanned pages use vector detection: {e}")
+                self._ready = False
+        return self._ready
+
+    def regions(self, pdf_pymupdf, page_num: int, ahead: Optional[Iterator[int]] = None) -> List[RasterRegion]:
+        """Regions of scanned page page_num; on a miss, also starts the next scanned pages from ahead"""
+        if page_num not in self._pending:
+            self._submit(pdf_pymupdf, page_num)
+            for next_num in ahead or ():
+                if len(self._pending) >= self.batch_pages:
+                    break
+                if next_num not in self._pending:
+                    self._submit(pdf_pymupdf, next_num)
+        return self._pending.pop(page_num).result()
+
+    def _submit(self, pdf_pymupdf, page_num: int):
+        future = Future()
+        try:
+            with self.profiler.stage("raster.render"):
+                pix = pdf_pymupdf[page_num].get_pixmap(matrix=fitz.Matrix(self.scale, self.scale),
+                                                       colorspace=fitz.csGRAY)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        except Exception as e:
+            future.set_exception(e)
+            self._pending[page_num] = future
+            return
+
+        if not self.threads:
+            try:
+                future.set_result(self.analyse(gray))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="raster")
+            future = self._executor.submit(self.analyse, gray)
+        self._pending[page_num] = future
+
+    def analyse(self, gray) -> List[RasterRegion]:
+        """Table and picture regions of one grey thumbnail"""
+        with self.profiler.stage("raster.analyse"):
+            return self._analyse(gray)
+
+    def _analyse(self, gray) -> List[RasterRegion]:
+        points = lambda length: max(1, int(round(length * self.scale)))
+        histogram = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().cumsum()
+        paper = int(np.searchsorted(histogram, 0.9 * histogram[-1]))
+        min_width, min_height = points(MIN_WIDTH), points(MIN_HEIGHT)
+        to_points = lambda x, y, w, h: (x / self.scale, y / self.scale, (x + w) / self.scale, (y + h) / self.scale)
+        regions = []
+
+        if paper < RASTER_PAPER_LEVEL:
+            # No paper showing: the picture is the page, less any white border
+            content = cv2.findNonZero((gray < 255 - RASTER_INK_CONTRAST).astype(np.uint8))
+            if content is not None:
+                x, y, w, h = cv2.boundingRect(content)
+                if w >= min_width and h >= min_height:
+                    regions.append(RasterRegion(ElementType.FIGURE, to_points(x, y, w, h), 1.0, 1))
+            return regions
+
+        ink = (gray < paper - RASTER_INK_CONTRAST).astype(np.uint8)
+
+        rule = points(RASTER_RULE_LENGTH)
+        horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (rule, 1)))
+        vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, rule)))
+        grid = cv2.dilate(horizontal | vertical, np.ones((3, 3), np.uint8))
+        tables = np.zeros_like(ink)
+        for contour in cv2.findContours(grid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < min_width or h < min_height:
+                continue
+            rows = self._count_runs(horizontal[y:y + h, x:x + w].sum(axis=1) >= RASTER_RULE_SPAN * w)
+            cols = self._count_runs(vertical[y:y + h, x:x + w].sum(axis=0) >= RASTER_RULE_SPAN * h)
+            if min(rows, cols) >= 2 and max(rows, cols) >= 3:  # More than a frame
+                regions.append(RasterRegion(ElementType.TABLE, to_points(x, y, w, h),
+                                            min(1.0, 0.6 + 0.05 * (rows + cols)), rows + cols))
+                tables[y:y + h, x:x + w] = 1
+
+        solid = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                 cv2.getStructuringElement(cv2.MORPH_RECT, (points(RASTER_SOLID_SIZE),) * 2))
+        solid = cv2.morphologyEx(solid, cv2.MORPH_CLOSE,
+                                 cv2.getStructuringElement(cv2.MORPH_RECT, (points(RASTER_MERGE_GAP),) * 2))
+        solid[tables > 0] = 0
+        for contour in cv2.findContours(solid, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < min_width or h < min_height:
+                continue
+            fill = cv2.countNonZero(solid[y:y + h, x:x + w]) / (w * h)
+            blobs = len(cv2.findContours(ink[y:y + h, x:x + w], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0])
+            regions.append(RasterRegion(ElementType.FIGURE, to_points(x, y, w, h), min(1.0, 0.5 + fill / 2), blobs))
+
+        regions.sort(key=lambda region: (region.bbox[1], region.bbox[0]))
+        return regions
+
+    @staticmethod
+    def _count_runs(mask) -> int:
+        """Number of runs of True in a 1-D mask"""
+        return int(np.count_nonzero(mask[1:] & ~mask[:-1]) + bool(mask[0])) if len(mask) else 0
+
+    def close(self):
+        """Drop pending results and stop the analysis threads"""
+        self._pending = {}
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
 class PreciseVisualDetector:
     """v3.0 Precise Visual Boundary Detection System"""
 
     def __init__(self, verbose: bool = False):
         self.verbose = verbose
         self.logger = logging.getLogger(__name__)
+        self._model: Optional[PageVisualModel] = None
+        self.deadline: Optional[float] = None  # time.monotonic() value, set per page by the processor
+        self.profiler = NULL_PROFILER  # The processor shares its own
+
+    def check_deadline(self):
+        """Cooperative deadline check between detection steps"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ProcessingTimeout("page deadline exceeded")
+
+    def page_model(self, page) -> PageVisualModel:
+        """Return the visual model for page, building it on first use"""
+        if self._model is None or self._model.page is not page:
+            self._model = PageVisualModel(page, self.profiler)
+        return self._model
+
+    def release_page(self):
+        """Drop the current page's model so it can be freed"""
+        self._model = None
 
     def detect_elements(self, page, page_text: str) -> List[DocumentElement]:
         """Main detection pipeline using precise visual detection"""
         elements = []
-
-        # Step 1: Find text references to tables/figures
-        text_references = self._find_text_references(page_text)
-
-        # Step 2: For each reference, find actual visual content
-        for ref in text_references:
-            visual_element = self._detect_visual_content_for_reference(page, ref)
-            if visual_element and visual_element.bbox.is_valid_visual_element():
-                elements.append(visual_element)
+        model = self.page_model(page)
+        profiler = self.profiler
+
+        # Step 1: Find text references to tables/figures, one per element
+        with profiler.stage("detect.references"):
+            references = self._find_text_references(page_text)
+        profiler.count("referenced_elements", len(references))
+
+        # Step 2: For each referenced element, find actual visual content once,
+        # from the first of its mentions that locates it
+        for reference in references:
+            mentions = reference['mentions']
+            stage = "detect.tables" if reference['element_type'] == ElementType.TABLE else "detect.figures"
+            with profiler.stage(stage):
+                for ref in mentions:
+                    self.check_deadline()
+                    profiler.count("reference_attempts")
+                    visual_element = self._detect_visual_content_for_reference(model, ref)
+                    if visual_element and visual_element.bbox.is_valid_visual_element():
+                        visual_element.text_references = [mention['text_match'] for mention in mentions]
+                        elements.append(visual_element)
+                        break
 
         # Step 3: Find standalone visual elements (no text reference)
-        standalone_elements = self._find_standalone_visual_elements(page, elements)
+        self.check_deadline()
+        with profiler.stage("detect.standalone"):
+            standalone_elements = self._find_standalone_visual_elements(model, elements)
         elements.extend(standalone_elements)
+        profiler.count("elements", len(elements))
 
         return elements
 
     def _find_text_references(self, page_text: str) -> List[Dict[str, Any]]:
-        """Find text references to tables, figures, charts"""
+        """Find text references to tables, figures, charts in one pass over the page text
+
+        Returns one reference per element named, (keyword, number as written),
+        in order of first mention: "see Figure 3", "Fig. 3" and the caption
+        "Figure 3: ..." are one element; "Figure 3.1" and "Figure 3.2", or
+        "Chart 2" and "Diagram 2", are two. The first mention gives the
+        reference's title and text_match; 'mentions' lists every distinct
+        mention (the first included), tried in turn to locate the element and
+        kept for its text_references.
+        """
         references = []
 
-        patterns = {
-            ElementType.TABLE: [
-                r'(?i)\btable\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?',
-                r'(?i)\btab\.\s*(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?',
-            ],
-            ElementType.FIGURE: [
-                r'(?i)\bfigure\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?',
-                r'(?i)\bfig\.\s*(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?',
-            ],
-            ElementType.CHART: [
-                r'(?i)\bchart\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?',
-                r'(?i)\bdiagram\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?',
-            ]
-        }
-
-        for element_type, type_patterns in patterns.items():
-            for pattern in type_patterns:
-                matches = re.finditer(pattern, page_text)
-                for match in matches:
-                    try:
-                        number_str = match.group(1)
-                        number = int(float(number_str))
-                        title = match.group(2) if match.lastindex > 1 and match.group(2) else f"{element_type.value.title()} {number_str}"
-
-                        references.append({
-                            'element_type': element_type,
-                            'number': number,
-                            'title': title.strip(),
-                            'text_match': match.group(0),
-                            'position': match.start()
-                        })
-
-                    except (ValueError, AttributeError) as e:
-                        self.logger.warning(f"Reference parsing failed: {e}")
-                        continue
+        # A reference's title runs to the end of the line, so each original
+        # per-pattern scan skipped mentions inside an earlier title of the same
+        # pattern; track where each alternative's scan would have resumed.
+        resume_at = [0] * len(REFERENCE_KEYWORDS)
 
-        return references
+        for match in REFERENCE_PATTERN.finditer(page_text):
+            try:
+                pattern_index = REFERENCE_KEYWORD_INDEX[match.group("keyword").rstrip().lower()]
+                start = match.start()
+                if start < resume_at[pattern_index]:
+                    continue
 
-    def _detect_visual_content_for_reference(self, page, reference: Dict[str, Any]) -> Optional[DocumentElement]:
+                element_type, keyword, _ = REFERENCE_KEYWORDS[pattern_index]
+                number_str = match.group("number")
+                number = int(float(number_str))
+
+                raw_title = match.group("title")
+                end = match.end("title") if raw_title else match.end()
+                resume_at[pattern_index] = end
+
+                text_match = page_text[start:end]
+                title = raw_title if raw_title else f"{element_type.value.title()} {number_str}"
+                references.append((pattern_index, (REFERENCE_ABBREVIATIONS.get(keyword, keyword), number_str), {
+                    'element_type': element_type,
+                    'number': number,
+                    'title': title.strip(),
+                    'text_match': text_match,
+                    'position': start
+                }))
+
+            except (ValueError, KeyError) as e:
+                self.logger.warning(f"Reference parsing failed: {e}")
+                continue
+
+        # Keep the historical ordering: by pattern, then by position
+        references.sort(key=lambda item: item[0])
+        elements: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for _, element_key, ref in references:
+            element = elements.get(element_key)
+            if element is None:
+                elements[element_key] = dict(ref, mentions=[ref])
+            elif all(mention['text_match'] != ref['text_match'] for mention in element['mentions']):
+                element['mentions'].append(ref)
+        return list(elements.values())
+
+    def _detect_visual_content_for_reference(self, model: PageVisualModel, reference: Dict[str, Any]) -> Optional[DocumentElement]:
         """Detect actual visual content for a text reference using precise visual detection"""
         try:
             element_type = reference['element_type']
 
             if element_type == ElementType.TABLE:
-                return self._detect_precise_table(page, reference)
+                return self._detect_precise_table(model, reference)
             else:
-                return self._detect_precise_figure(page, reference)
+                return self._detect_precise_figure(model, reference)
 
         except Exception as e:
             self.logger.warning(f"Visual detection failed for {reference['title']}: {e}")
             return None
 
-    def _detect_precise_table(self, page, reference: Dict[str, Any]) -> Optional[DocumentElement]:
+    def _detect_precise_table(self, model: PageVisualModel, reference: Dict[str, Any]) -> Optional[DocumentElement]:
         """Detect table using pdfplumber's precise table boundaries"""
         try:
             # Use pdfplumber's table detection for precise boundaries
-            tables = page.extract_tables()
+            tables = model.tables
             if not tables:
                 return None
 
             # Find table closest to text reference
-            text_position = self._find_text_position(page, reference['text_match'])
+            text_position = self._find_text_position(model, reference['text_match'])
             if not text_position:
                 return None
 
             best_table = None
             min_distance = float('inf')
 
-            for table in tables:
+            for table_obj, table in tables:
                 if not table or not table[0]:  # Skip empty tables
                     continue
 
                 # Get precise table boundaries using pdfplumber's internal table object
-                table_bbox = self._get_precise_table_boundaries(page, table)
+                table_bbox = self._get_precise_table_boundaries(model, table_obj)
                 if not table_bbox:
                     continue
 
@@ -326,18 +1607,18 @@ class PreciseVisualDetector:
                 distance = self._calculate_distance(text_position, table_bbox)
 
                 # Validate this is actually a table with visual structure
-                if self._validate_table_visual_content(page, table_bbox) and distance < min_distance:
+                if self._validate_table_visual_content(model, table_bbox) and distance < min_distance:
                     min_distance = distance
                     best_table = table_bbox
 
             if best_table and best_table.is_valid_visual_element():
-                visual_elements = self._extract_visual_elements_in_area(page, best_table)
+                visual_elements = self._extract_visual_elements_in_area(model, best_table)
                 return DocumentElement(
                     element_type=reference['element_type'],
                     number=reference['number'],
                     title=reference['title'],
                     bbox=best_table,
-                    page_number=getattr(page, 'page_number', 1),
+                    page_number=model.page_number,
                     text_references=[reference['text_match']],
                     detection_method="precise_table_detection",
                     visual_elements=visual_elements,
@@ -349,65 +1630,35 @@ class PreciseVisualDetector:
 
         return None
 
-    def _detect_precise_figure(self, page, reference: Dict[str, Any]) -> Optional[DocumentElement]:
+    def _detect_precise_figure(self, model: PageVisualModel, reference: Dict[str, Any]) -> Optional[DocumentElement]:
         """Detect figure using actual visual elements (images, rects, curves)"""
         try:
             # Get all visual elements from the page
-            visual_elements = []
-
-            # Add images
-            if hasattr(page, 'images'):
-                for img in page.images:
-                    visual_elements.append(VisualElement(
-                        element_type='image',
-                        bbox=(img['x0'], img['top'], img['x1'], img['bottom']),
-                        confidence=1.0,
-                        attributes=img
-                    ))
-
-            # Add rectangles/shapes
-            if hasattr(page, 'rects'):
-                for rect in page.rects:
-                    visual_elements.append(VisualElement(
-                        element_type='rect',
-                        bbox=(rect['x0'], rect['top'], rect['x1'], rect['bottom']),
-                        confidence=0.8,
-                        attributes=rect
-                    ))
-
-            # Add curves/lines
-            if hasattr(page, 'curves'):
-                for curve in page.curves:
-                    visual_elements.append(VisualElement(
-                        element_type='curve',
-                        bbox=(curve['x0'], curve['top'], curve['x1'], curve['bottom']),
-                        confidence=0.7,
-                        attributes=curve
-                    ))
-
-            if not visual_elements:
+            index = model.index
+            if not len(index):
                 return None
 
             # Find text reference position
-            text_position = self._find_text_position(page, reference['text_match'])
+            text_position = self._find_text_position(model, reference['text_match'])
             if not text_position:
                 return None
 
-            # Find visual elements cluster near text reference
-            figure_bbox = self._find_visual_cluster_near_text(visual_elements, text_position)
+            # Find the page's visual cluster nearest the text reference
+            figure_bbox = self._find_visual_cluster_near_text(model, text_position)
 
             if figure_bbox and figure_bbox.is_valid_visual_element():
                 # Validate this contains actual visual content, not just text
-                if self._validate_figure_visual_content(page, figure_bbox):
-                    relevant_elements = [ve for ve in visual_elements
-                                       if self._bbox_overlaps(ve.bbox, (figure_bbox.x0, figure_bbox.y0, figure_bbox.x1, figure_bbox.y1))]
+                if self._validate_figure_visual_content(model, figure_bbox):
+                    relevant_elements = model.visual_elements(
+                        index.query((figure_bbox.x0, figure_bbox.y0, figure_bbox.x1, figure_bbox.y1))
+                    )
 
                     return DocumentElement(
                         element_type=reference['element_type'],
                         number=reference['number'],
                         title=reference['title'],
                         bbox=figure_bbox,
-                        page_number=getattr(page, 'page_number', 1),
+                        page_number=model.page_number,
                         text_references=[reference['text_match']],
                         detection_method="precise_visual_detection",
                         visual_elements=relevant_elements,
@@ -419,74 +1670,44 @@ class PreciseVisualDetector:
 
         return None
 
-    def _get_precise_table_boundaries(self, page, table_data) -> Optional[BoundingBox]:
-        """Get precise table boundaries using pdfplumber's table detection"""
+    def _get_precise_table_boundaries(self, model: PageVisualModel, table_obj) -> Optional[BoundingBox]:
+        """Get precise table boundaries from a table found by pdfplumber's find_tables"""
         try:
-            if not table_data or not table_data[0]:
-                return None
-
-            # Use pdfplumber's find_tables to get exact boundaries
-            tables_with_metadata = page.find_tables()
-
-            for table_obj in tables_with_metadata:
-                # Get the actual table boundary box
-                bbox = table_obj.bbox
-                if bbox:
-                    x0, y0, x1, y1 = bbox
-
-                    # Validate dimensions
-                    width, height = x1 - x0, y1 - y0
-                    if width >= MIN_WIDTH and height >= MIN_HEIGHT:
-
-                        # Count visual elements in table area
-                        visual_count = self._count_visual_elements_in_area(page, (x0, y0, x1, y1))
-                        text_density = self._calculate_text_density(page, (x0, y0, x1, y1))
-
-                        return BoundingBox(
-                            x0=x0, y0=y0, x1=x1, y1=y1,
-                            confidence=0.95,
-                            visual_elements_count=visual_count,
-                            text_density=text_density,
-                            has_visual_content=(visual_count >= MIN_VISUAL_ELEMENTS and text_density < TEXT_ONLY_THRESHOLD),
-                            buffer_zone=TABLE_BUFFER_ZONE
-                        )
+            # Get the actual table boundary box
+            bbox = table_obj.bbox
+            if bbox:
+                x0, y0, x1, y1 = bbox
+
+                # Validate dimensions
+                width, height = x1 - x0, y1 - y0
+                if width >= MIN_WIDTH and height >= MIN_HEIGHT:
+
+                    # Count visual elements in table area
+                    visual_count = self._count_visual_elements_in_area(model, (x0, y0, x1, y1))
+                    text_density = self._calculate_text_density(model, (x0, y0, x1, y1))
+
+                    return BoundingBox(
+                        x0=x0, y0=y0, x1=x1, y1=y1,
+                        confidence=0.95,
+                        visual_elements_count=visual_count,
+                        text_density=text_density,
+                        has_visual_content=(visual_count >= MIN_VISUAL_ELEMENTS and text_density < TEXT_ONLY_THRESHOLD),
+                        buffer_zone=TABLE_BUFFER_ZONE
+                    )
 
         except Exception as e:
             self.logger.warning(f"Precise table boundaries failed: {e}")
 
         return None
 
-    def _find_visual_cluster_near_text(self, visual_elements: List[VisualElement], text_bbox: Tuple[float, float, float, float]) -> Optional[BoundingBox]:
+    def _find_visual_cluster_near_text(self, model: PageVisualModel, text_bbox: Tuple[float, float, float, float]) -> Optional[BoundingBox]:
         """Find cluster of visual elements near text reference"""
         try:
-            text_x0, text_y0, text_x1, text_y1 = text_bbox
-            text_center_x = (text_x0 + text_x1) / 2
-            text_center_y = (text_y0 + text_y1) / 2
-
-            # Find visual elements within reasonable distance of text
-            nearby_elements = []
-            max_distance = 200  # Points
-
-            for ve in visual_elements:
-                ve_x0, ve_y0, ve_x1, ve_y1 = ve.bbox
-                ve_center_x = (ve_x0 + ve_x1) / 2
-                ve_center_y = (ve_y0 + ve_y1) / 2
-
-                distance = math.sqrt((ve_center_x - text_center_x)**2 + (ve_center_y - text_center_y)**2)
-                if distance <= max_distance:
-                    nearby_elements.append(ve)
-
-            if len(nearby_elements) < MIN_VISUAL_ELEMENTS:
+            cluster = model.clusters.nearest(text_bbox, CLUSTER_SEARCH_RADIUS, MIN_VISUAL_ELEMENTS)
+            if cluster is None:
                 return None
 
-            # Calculate bounding box of visual elements cluster
-            all_x0 = [ve.bbox[0] for ve in nearby_elements]
-            all_y0 = [ve.bbox[1] for ve in nearby_elements]
-            all_x1 = [ve.bbox[2] for ve in nearby_elements]
-            all_y1 = [ve.bbox[3] for ve in nearby_elements]
-
-            cluster_x0, cluster_y0 = min(all_x0), min(all_y0)
-            cluster_x1, cluster_y1 = max(all_x1), max(all_y1)
+            (cluster_x0, cluster_y0, cluster_x1, cluster_y1), members = cluster
 
             # Validate cluster size
             width, height = cluster_x1 - cluster_x0, cluster_y1 - cluster_y0
@@ -495,13 +1716,13 @@ class PreciseVisualDetector:
 
             # Calculate confidence based on visual element density
             cluster_area = width * height
-            visual_density = len(nearby_elements) / (cluster_area / 1000)  # Elements per 1000 sq pts
+            visual_density = len(members) / (cluster_area / 1000)  # Elements per 1000 sq pts
             confidence = min(1.0, visual_density * 0.1)
 
             return BoundingBox(
                 x0=cluster_x0, y0=cluster_y0, x1=cluster_x1, y1=cluster_y1,
                 confidence=confidence,
-                visual_elements_count=len(nearby_elements),
+                visual_elements_count=len(members),
                 text_density=0.0,  # Will be calculated later
                 has_visual_content=True,
                 buffer_zone=DEFAULT_BUFFER_ZONE
@@ -511,14 +1732,14 @@ class PreciseVisualDetector:
             self.logger.warning(f"Visual cluster detection failed: {e}")
             return None
 
-    def _validate_table_visual_content(self, page, bbox: BoundingBox) -> bool:
+    def _validate_table_visual_content(self, model: PageVisualModel, bbox: BoundingBox) -> bool:
         """Validate that table area contains actual table structure, not just text"""
         try:
             # Check for table-like visual elements (lines, borders)
-            visual_count = self._count_visual_elements_in_area(page, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
+            visual_count = self._count_visual_elements_in_area(model, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
 
             # Check text density - tables should have structured text, not paragraphs
-            text_density = self._calculate_text_density(page, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
+            text_density = self._calculate_text_density(model, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
 
             # Tables should have some visual structure and not be pure text
             has_structure = visual_count >= 2  # At least some lines/borders
@@ -529,14 +1750,14 @@ class PreciseVisualDetector:
         except Exception:
             return False
 
-    def _validate_figure_visual_content(self, page, bbox: BoundingBox) -> bool:
+    def _validate_figure_visual_content(self, model: PageVisualModel, bbox: BoundingBox) -> bool:
         """Validate that figure area contains actual visual content, not just text"""
         try:
             # Count actual visual elements
-            visual_count = self._count_visual_elements_in_area(page, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
+            visual_count = self._count_visual_elements_in_area(model, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
 
             # Calculate text density
-            text_density = self._calculate_text_density(page, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
+            text_density = self._calculate_text_density(model, (bbox.x0, bbox.y0, bbox.x1, bbox.y1))
 
             # Figures must have significant visual content and low text density
             has_visual_content = visual_count >= MIN_VISUAL_ELEMENTS
@@ -547,120 +1768,29 @@ class PreciseVisualDetector:
         except Exception:
             return False
 
-    def _count_visual_elements_in_area(self, page, area: Tuple[float, float, float, float]) -> int:
+    def _count_visual_elements_in_area(self, model: PageVisualModel, area: Tuple[float, float, float, float]) -> int:
         """Count visual elements (images, rects, curves) in specified area"""
-        count = 0
-        x0, y0, x1, y1 = area
-
         try:
-            # Count images
-            if hasattr(page, 'images'):
-                for img in page.images:
-                    if self._element_in_area(img, area):
-                        count += 1
-
-            # Count rectangles
-            if hasattr(page, 'rects'):
-                for rect in page.rects:
-                    if self._element_in_area(rect, area):
-                        count += 1
-
-            # Count curves/lines
-            if hasattr(page, 'curves'):
-                for curve in page.curves:
-                    if self._element_in_area(curve, area):
-                        count += 1
-
+            return model.index.count(area)
         except Exception as e:
             self.logger.warning(f"Visual element counting failed: {e}")
+            return 0
 
-        return count
-
-    def _calculate_text_density(self, page, area: Tuple[float, float, float, float]) -> float:
+    def _calculate_text_density(self, model: PageVisualModel, area: Tuple[float, float, float, float]) -> float:
         """Calculate text density in specified area (0.0 = no text, 1.0 = all text)"""
-        try:
-            x0, y0, x1, y1 = area
-            area_size = (x1 - x0) * (y1 - y0)
-
-            if area_size <= 0:
-                return 0.0
-
-            text_area = 0.0
-            chars = getattr(page, 'chars', [])
-
-            for char in chars:
-                char_x0 = char.get('x0', 0)
-                char_y0 = char.get('top', char.get('y0', 0))
-                char_x1 = char.get('x1', char_x0)
-                char_y1 = char.get('bottom', char.get('y1', char_y0))
-
-                # Check if character is in area
-                if (x0 <= char_x0 <= x1 and y0 <= char_y0 <= y1 and
-                    x0 <= char_x1 <= x1 and y0 <= char_y1 <= y1):
-                    char_area = (char_x1 - char_x0) * (char_y1 - char_y0)
-                    text_area += char_area
+        return self._calculate_text_densities(model, [area])[0]
 
-            return min(1.0, text_area / area_size)
-
-        except Exception:
-            return 0.5  # Default neutral value
-
-    def _element_in_area(self, element: Dict, area: Tuple[float, float, float, float]) -> bool:
-        """Check if element overlaps with specified area"""
+    def _calculate_text_densities(self, model: PageVisualModel, areas: List[Tuple[float, float, float, float]]) -> List[float]:
+        """Calculate text density for many candidate areas in one call"""
         try:
-            area_x0, area_y0, area_x1, area_y1 = area
-            elem_x0 = element.get('x0', 0)
-            elem_y0 = element.get('top', element.get('y0', 0))
-            elem_x1 = element.get('x1', elem_x0)
-            elem_y1 = element.get('bottom', element.get('y1', elem_y0))
-
-            # Check for overlap
-            return not (elem_x1 < area_x0 or elem_x0 > area_x1 or
-                       elem_y1 < area_y0 or elem_y0 > area_y1)
-
+            return model.char_boxes.densities(areas)
         except Exception:
-            return False
+            return [0.5] * len(areas)  # Default neutral value
 
-    def _find_text_position(self, page, text: str) -> Optional[Tuple[float, float, float, float]]:
+    def _find_text_position(self, model: PageVisualModel, text: str) -> Optional[Tuple[float, float, float, float]]:
         """Find position of text on page"""
         try:
-            chars = getattr(page, 'chars', [])
-            if not chars:
-                return None
-
-            text_words = text.lower().split()
-            if not text_words:
-                return None
-
-            # Simple text search for now
-            page_text = ""
-            char_positions = []
-
-            for char in chars:
-                char_text = char.get('text', '').strip()
-                if char_text:
-                    page_text += char_text.lower() + " "
-                    char_positions.append(char)
-
-            target_text = ' '.join(text_words)
-            match_pos = page_text.find(target_text)
-
-            if match_pos >= 0 and char_positions:
-                # Approximate position based on character index
-                word_count = len(page_text[:match_pos].split())
-
-                if word_count < len(char_positions):
-                    start_char = char_positions[word_count]
-                    end_idx = min(word_count + len(text_words), len(char_positions) - 1)
-                    end_char = char_positions[end_idx]
-
-                    return (
-                        start_char.get('x0', 0),
-                        start_char.get('top', start_char.get('y0', 0)),
-                        end_char.get('x1', start_char.get('x1', 100)),
-                        end_char.get('bottom', end_char.get('y1', start_char.get('y1', 20)))
-                    )
-
+            return model.text_index.locate(text)
         except Exception as e:
             self.logger.warning(f"Text position finding failed: {e}")
 
@@ -675,6 +1805,13 @@ class PreciseVisualDetector:
 
         return math.sqrt((x2_center - x1_center)**2 + (y2_center - y1_center)**2)
 
+    @staticmethod
+    def _box_gap(bbox1: Tuple[float, float, float, float], bbox2: Tuple[float, float, float, float]) -> float:
+        """Distance between the edges of two bounding boxes (0 when they overlap)"""
+        dx = max(bbox2[0] - bbox1[2], bbox1[0] - bbox2[2], 0.0)
+        dy = max(bbox2[1] - bbox1[3], bbox1[1] - bbox2[3], 0.0)
+        return math.hypot(dx, dy)
+
     def _bbox_overlaps(self, bbox1: Tuple[float, float, float, float], bbox2: Tuple[float, float, float, float]) -> bool:
         """Check if two bounding boxes overlap"""
         x1_0, y1_0, x1_1, y1_1 = bbox1
@@ -682,23 +1819,14 @@ class PreciseVisualDetector:
 
         return not (x1_1 < x2_0 or x1_0 > x2_1 or y1_1 < y2_0 or y1_0 > y2_1)
 
-    def _find_standalone_visual_elements(self, page, existing_elements: List[DocumentElement]) -> List[DocumentElement]:
+    def _find_standalone_visual_elements(self, model: PageVisualModel, existing_elements: List[DocumentElement]) -> List[DocumentElement]:
         """Find visual elements that don't have text references"""
         standalone = []
 
         try:
             # Get all significant visual clusters
-            visual_elements = []
-
-            # Collect all visual elements
-            if hasattr(page, 'images'):
-                for img in page.images:
-                    visual_elements.append(VisualElement(
-                        element_type='image',
-                        bbox=(img['x0'], img['top'], img['x1'], img['bottom']),
-                        confidence=1.0,
-                        attributes=img
-                    ))
+            index = model.index
+            visual_elements = model.visual_elements(index.indices_of_type('image'))
 
             # Find clusters that aren't already covered by existing elements
             used_areas = [(e.bbox.x0, e.bbox.y0, e.bbox.x1, e.bbox.y1) for e in existing_elements]
@@ -718,7 +1846,8 @@ class PreciseVisualDetector:
                             confidence=ve.confidence,
                             visual_elements_count=1,
                             text_density=0.0,
-                            has_visual_content=True
+                            has_visual_content=True,
+                            raster_image=True
                         )
 
                         if bbox.is_valid_visual_element():
@@ -727,7 +1856,7 @@ class PreciseVisualDetector:
                                 number=len(existing_elements) + len(standalone) + 1,
                                 title=f"Figure {len(existing_elements) + len(standalone) + 1}",
                                 bbox=bbox,
-                                page_number=getattr(page, 'page_number', 1),
+                                page_number=model.page_number,
                                 text_references=[],
                                 detection_method="standalone_visual_detection",
                                 visual_elements=[ve],
@@ -740,60 +1869,537 @@ class PreciseVisualDetector:
 
         return standalone
 
-    def _extract_visual_elements_in_area(self, page, bbox: BoundingBox) -> List[VisualElement]:
-        """Extract all visual elements within specified area"""
+    def detect_raster_elements(self, page, page_text: str, regions: List[RasterRegion]) -> List[DocumentElement]:
+        """Elements of a scanned page from its raster regions
+
+        Each referenced element (grouped as in detect_elements) takes the
+        unclaimed region of its kind nearest a mention in the page's text
+        layer, if the gap is at most CLUSTER_SEARCH_RADIUS; regions left
+        over become standalone elements.
+        """
         elements = []
+        model = self.page_model(page)
+        unclaimed = list(regions)
+        with self.profiler.stage("detect.references"):
+            references = self._find_text_references(page_text)
+        self.profiler.count("referenced_elements", len(references))
+
+        for reference in references:
+            mentions = reference['mentions']
+            wants_table = reference['element_type'] == ElementType.TABLE
+            for ref in mentions:
+                self.check_deadline()
+                text_position = self._find_text_position(model, ref['text_match'])
+                if not text_position:
+                    continue
+                distance, best = min(((self._box_gap(text_position, region.bbox), region) for region in unclaimed
+                                      if (region.element_type == ElementType.TABLE) == wants_table),
+                                     key=lambda item: item[0], default=(None, None))
+                if best is None or distance > CLUSTER_SEARCH_RADIUS:
+                    continue
+
+                element = self._raster_element(model, best, ref['element_type'], ref['number'], ref['title'],
+                                               [mention['text_match'] for mention in mentions])
+                if element.bbox.is_valid_visual_element():
+                    unclaimed.remove(best)
+                    elements.append(element)
+                    break
+
+        for region in unclaimed:
+            number = len(elements) + 1
+            element = self._raster_element(model, region, region.element_type, number,
+                                           f"{region.element_type.value.title()} {number}", [])
+            if element.bbox.is_valid_visual_element():
+                elements.append(element)
+        self.profiler.count("elements", len(elements))
+
+        return elements
+
+    def _raster_element(self, model: PageVisualModel, region: RasterRegion, element_type: ElementType, number: int,
+                        title: str, text_references: List[str]) -> DocumentElement:
+        """DocumentElement for a raster region; its visual elements are the scan images under it"""
+        is_table = region.element_type == ElementType.TABLE
+        bbox = BoundingBox(
+            *region.bbox,
+            confidence=region.confidence,
+            visual_elements_count=region.parts,
+            text_density=self._calculate_text_density(model, region.bbox),
+            has_visual_content=True,
+            buffer_zone=TABLE_BUFFER_ZONE if is_table else DEFAULT_BUFFER_ZONE,
+            raster_image=not is_table
+        )
+        return DocumentElement(
+            element_type=element_type,
+            number=number,
+            title=title,
+            bbox=bbox,
+            page_number=model.page_number,
+            text_references=text_references,
+            detection_method="raster_region_detection",
+            visual_elements=model.visual_elements(model.index.query(region.bbox)),
+            quality_metrics={"visual_confidence": region.confidence}
+        )
+
+    def _extract_visual_elements_in_area(self, model: PageVisualModel, bbox: BoundingBox) -> List[VisualElement]:
+        """Extract all visual elements within specified area"""
         area = (bbox.x0, bbox.y0, bbox.x1, bbox.y1)
 
         try:
-            # Extract images
-            if hasattr(page, 'images'):
-                for img in page.images:
-                    if self._element_in_area(img, area):
-                        elements.append(VisualElement(
-                            element_type='image',
-                            bbox=(img['x0'], img['top'], img['x1'], img['bottom']),
-                            confidence=1.0,
-                            attributes=img
-                        ))
-
-            # Extract rectangles
-            if hasattr(page, 'rects'):
-                for rect in page.rects:
-                    if self._element_in_area(rect, area):
-                        elements.append(VisualElement(
-                            element_type='rect',
-                            bbox=(rect['x0'], rect['top'], rect['x1'], rect['bottom']),
-                            confidence=0.8,
-                            attributes=rect
-                        ))
-
-            # Extract curves
-            if hasattr(page, 'curves'):
-                for curve in page.curves:
-                    if self._element_in_area(curve, area):
-                        elements.append(VisualElement(
-                            element_type='curve',
-                            bbox=(curve['x0'], curve['top'], curve['x1'], curve['bottom']),
-                            confidence=0.7,
-                            attributes=curve
-                        ))
-
+            index = model.index
+            return model.visual_elements(index.query(area))
         except Exception as e:
             self.logger.warning(f"Visual element extraction failed: {e}")
+            return []
 
-        return elements
+
+class ScreenshotWriter:
+    """Bounded background stage that encodes rendered pixmaps and writes them
+
+    The page loop hands over raw pixel buffers and continues; a thread pool
+    encodes them (zlib and Pillow's codecs release the GIL) and writes the
+    files. Submitting blocks while more than SCREENSHOT_WRITE_BUFFER_MB of
+    pixels are queued. Writes to the same path complete in submission order.
+
+    PNGs at PNG_COMPRESSION_LEVEL are the same bytes as PyMuPDF's
+    Pixmap.save: unfiltered rows, one IDAT chunk and a pHYs chunk for the
+    resolution. WebP is written lossless, JPEG and AVIF at the given quality.
+    Each write's future resolves to (format, bytes written, encode seconds).
+    """
+
+    PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    COLOR_TYPES = {1: 0, 3: 2}  # Components (no alpha) -> PNG colour type
+    PIL_MODES = {(1, 0): "L", (2, 1): "LA", (3, 0): "RGB", (4, 0): "CMYK", (4, 1): "RGBA"}
+    FORMATS = ("png", "webp", "jpeg", "avif")
+    EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg", "avif": ".avif"}
+
+    def __init__(self, threads: int = SCREENSHOT_ENCODER_THREADS, buffer_mb: float = SCREENSHOT_WRITE_BUFFER_MB,
+                 png_compression: int = PNG_COMPRESSION_LEVEL, quality: int = LOSSY_IMAGE_QUALITY):
+        self.threads = max(0, threads)
+        self.max_bytes = int(buffer_mb * 1024 * 1024)
+        self.png_compression = png_compression
+        self.quality = quality
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queued_bytes = 0
+        self._space = threading.Condition()
+        self._last_write: Dict[str, Future] = {}
+
+    @staticmethod
+    def available(image_format: str) -> bool:
+        """Whether this build can write image_format (Pillow codecs are optional)"""
+        if image_format == "png":
+            return True
+        if not HAS_PIL or image_format not in ScreenshotWriter.FORMATS:
+            return False
+        try:
+            from PIL import features
+            return bool(features.check({"jpeg": "jpg"}.get(image_format, image_format)))
+        except Exception:
+            return False
+
+    def submit(self, pix, path: str, image_format: str = "png") -> Future:
+        """Queue pix to be written to path in image_format"""
+        return self._submit(path, self._prepare(pix, image_format))
+
+    def submit_encoded(self, data: bytes, path: str, image_format: str) -> Future:
+        """Queue already encoded image bytes to be written to path as they are"""
+        return self._submit(path, (image_format, data, 0.0))
+
+    def _submit(self, path: str, job: tuple) -> Future:
+        if not self.threads:
+            future = Future()
+            try:
+                future.set_result(self._write(path, job))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        size = len(job[1])
+        reservation = []  # Released once: when the write is done or cancelled, or on a page timeout here
+
+        def release(_=None):
+            with self._space:
+                if reservation:
+                    self._queued_bytes -= reservation.pop()
+                    self._space.notify_all()
+
+        try:
+            # Backpressure: wait for queued pixels to drain (one oversized job may always run)
+            with self._space:
+                while self._queued_bytes and self._queued_bytes + size > self.max_bytes:
+                    self._space.wait()
+                self._queued_bytes += size
+                reservation.append(size)
+
+            previous = self._last_write.get(path)
+            if previous is not None and not previous.done():
+                previous.exception()  # Keep same-path writes in submission order
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="screenshot-writer")
+            future = self._executor.submit(self._write, path, job)
+            future.add_done_callback(release)
+        except BaseException:
+            release()
+            raise
+        self._last_write[path] = future
+        return future
+
+    def _prepare(self, pix, image_format: str) -> tuple:
+        """Copy what the encoder needs out of pix, which stays on this thread"""
+        if image_format != "png":
+            return (image_format, pix.samples, pix.width, pix.height, pix.n, pix.alpha, pix.stride)
+        if pix.alpha or pix.n not in self.COLOR_TYPES or not (pix.xres and pix.yres):
+            start = time.thread_time()
+            data = pix.tobytes("png")  # PyMuPDF encodes these; only the write runs in the background
+            return ("png", data, time.thread_time() - start)
+        return ("png", pix.samples, pix.width, pix.height, pix.n, pix.stride, pix.xres, pix.yres)
+
+    def _write(self, path: str, job: tuple) -> Tuple[str, int, float]:
+        image_format = job[0]
+        if len(job) == 3:
+            data, encode_seconds = job[1], job[2]
+        else:
+            start = time.thread_time()
+            data = self.encode_png(*job[1:]) if image_format == "png" else self._encode_pil(*job)
+            encode_seconds = time.thread_time() - start
+        with open(path, 'wb') as f:
+            f.write(data)
+        return image_format, len(data), encode_seconds
+
+    def encode_png(self, samples: bytes, width: int, height: int, n: int, stride: int,
+                   xres: int, yres: int) -> bytes:
+        """PNG-encode 8-bit gray or RGB samples"""
+        row_bytes = width * n
+        raw = b''.join(b'\x00' + samples[row * stride:row * stride + row_bytes] for row in range(height))
+
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        return b''.join((
+            self.PNG_SIGNATURE,
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, self.COLOR_TYPES[n], 0, 0, 0)),
+            chunk(b'pHYs', struct.pack('>IIB', int(xres * 100 / 2.54 + 0.5), int(yres * 100 / 2.54 + 0.5), 1)),
+            chunk(b'IDAT', zlib.compress(raw, self.png_compression)),
+            chunk(b'IEND', b'')
+        ))
+
+    def _encode_pil(self, image_format: str, samples: bytes, width: int, height: int, n: int,
+                    alpha: int, stride: int) -> bytes:
+        """Encode samples with Pillow as lossless WebP, JPEG or AVIF"""
+        mode = self.PIL_MODES[(n, int(bool(alpha)))]
+        image = Image.frombytes(mode, (width, height), samples, "raw", mode, stride)
+        if image_format == "jpeg" and mode not in ("L", "RGB", "CMYK"):
+            image = image.convert("RGB")
+        elif image_format != "jpeg" and mode == "CMYK":
+            image = image.convert("RGB")
+
+        options = {"lossless": True} if image_format == "webp" else {"quality": self.quality}
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format.upper(), **options)
+        return buffer.getvalue()
+
+    def close(self):
+        """Wait for queued writes and stop the encoder threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._last_write = {}
+
+
+class ResultCache:
+    """Persistent content-addressed cache of per-page detection results and PNGs
+
+    Keys combine the PDF's content hash, the page index and the detection
+    constants, so unchanged PDFs are served from disk on re-runs. Entries
+    are evicted least-recently-used once the cache exceeds max_mb.
+
+    Layout:
+        <root>/documents/<doc_key>.json      page count of a fully cached PDF
+        <root>/pages/<xx>/<page_key>/        page.json + screenshot PNGs
+    """
+
+    def __init__(self, root: str, max_mb: float = DEFAULT_CACHE_MAX_MB, settings: Optional[Dict[str, Any]] = None):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.settings = settings or {}
+        self.logger = logging.getLogger(__name__)
+        self._total_bytes: Optional[int] = None  # Size of pages/, measured at the first eviction check
+        for subdir in ("documents", "pages", "tmp"):
+            os.makedirs(os.path.join(root, subdir), exist_ok=True)
+
+    def config_fingerprint(self) -> str:
+        config = {name: globals()[name] for name in CACHE_KEY_CONSTANTS}
+        config.update(self.settings)
+        config["format"] = CACHE_FORMAT_VERSION
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    def document_key(self, pdf_path: str) -> str:
+        """Key for a PDF: hash of its content and the detection config"""
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return hashlib.sha256(f"{digest.hexdigest()}:{self.config_fingerprint()}".encode()).hexdigest()
+
+    def _page_dir(self, doc_key: str, page_num: int) -> str:
+        page_key = hashlib.sha256(f"{doc_key}:{page_num}".encode()).hexdigest()
+        return os.path.join(self.root, "pages", page_key[:2], page_key)
+
+    def _document_path(self, doc_key: str) -> str:
+        return os.path.join(self.root, "documents", f"{doc_key}.json")
+
+    def load_document(self, doc_key: str) -> Optional[int]:
+        """Page count if every page of the document is cached, else None"""
+        try:
+            with open(self._document_path(doc_key), 'r', encoding='utf-8') as f:
+                page_count = json.load(f)["page_count"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        for page_num in range(page_count):
+            if not os.path.exists(os.path.join(self._page_dir(doc_key, page_num), "page.json")):
+                return None
+        return page_count
+
+    def store_document(self, doc_key: str, page_count: int):
+        self._write_json_atomic(self._document_path(doc_key), {"page_count": page_count})
+
+    def load_page(self, doc_key: str, page_num: int) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Return (entry, entry_dir) for a cached page and mark it recently used"""
+        entry_dir = self._page_dir(doc_key, page_num)
+        try:
+            with open(os.path.join(entry_dir, "page.json"), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(entry_dir)
+            return entry, entry_dir
+        except (OSError, ValueError):
+            return None
+
+    def store_page(self, doc_key: str, page_num: int, entry: Dict[str, Any], png_paths: List[str]) -> int:
+        """Store a page entry and copies of its screenshots; returns the bytes added to the cache"""
+        entry_dir = self._page_dir(doc_key, page_num)
+        if os.path.exists(entry_dir):
+            return 0
+
+        tmp_dir = tempfile.mkdtemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            for png_path in png_paths:
+                shutil.copyfile(png_path, os.path.join(tmp_dir, os.path.basename(png_path)))
+            with open(os.path.join(tmp_dir, "page.json"), 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            size = sum(item.stat().st_size for item in os.scandir(tmp_dir))
+
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.replace(tmp_dir, entry_dir)
+            return size
+        except OSError as e:
+            # Another process stored the same page first, or the disk is full
+            self.logger.warning(f"Result cache store failed for page {page_num + 1}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return 0
+
+    def evict(self, added_bytes: int):
+        """Delete least-recently-used page entries once the cache exceeds max_bytes
+
+        added_bytes is what the caller stored since its last call. The cache
+        is walked once per instance to measure it, then only when the running
+        total passes max_bytes, so a document that stores nothing (a full
+        cache hit) costs nothing. Growth from other processes sharing the
+        cache is picked up at the next walk.
+        """
+        if not added_bytes:
+            return
+        if self._total_bytes is not None:
+            self._total_bytes += added_bytes
+            if self._total_bytes <= self.max_bytes:
+                return
+
+        entries, total = self._scan_pages()
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+        self._total_bytes = total
+
+    def _scan_pages(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """(mtime, bytes, path) of every page entry and their total size
+
+        Entries (or whole prefix directories) removed meanwhile by another
+        process evicting from the same cache are skipped.
+        """
+        entries = []
+        total = 0
+        try:
+            prefixes = list(os.scandir(os.path.join(self.root, "pages")))
+        except OSError:
+            return entries, total
+
+        for prefix in prefixes:
+            try:
+                page_dirs = list(os.scandir(prefix.path))
+            except OSError:
+                continue
+            for entry_dir in page_dirs:
+                try:
+                    size = sum(item.stat().st_size for item in os.scandir(entry_dir.path))
+                    entries.append((entry_dir.stat().st_mtime, size, entry_dir.path))
+                    total += size
+                except OSError:
+                    continue
+        return entries, total
+
+    def _write_json_atomic(self, path: str, data: Dict[str, Any]):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
 
 
 class PreciseScreenshotProcessorV3:
     """v3.0 Processor with Precise Visual Boundary Detection"""
 
-    def __init__(self, timeout_minutes: int = 30, verbose: bool = False):
+    def __init__(self, timeout_minutes: int = 30, verbose: bool = False, workers: int = 1, stream: bool = False,
+                 cache_dir: Optional[str] = None, cache_max_mb: float = DEFAULT_CACHE_MAX_MB,
+                 page_timeout_seconds: float = DEFAULT_PAGE_TIMEOUT, encoder_threads: int = SCREENSHOT_ENCODER_THREADS,
+                 image_format: str = DEFAULT_IMAGE_FORMAT, png_compression: int = PNG_COMPRESSION_LEVEL,
+                 image_quality: int = LOSSY_IMAGE_QUALITY, adaptive_scale: bool = True, embedded_images: bool = True,
+                 backend: str = DEFAULT_PDF_BACKEND, triage: bool = False,
+                 raster: bool = True, profile: bool = False, trace: bool = False):
         self.timeout_seconds = timeout_minutes * 60
+        self.page_timeout_seconds = page_timeout_seconds
+        self._document_deadline: Optional[float] = None
+        self._document_timed_out = False
         self.verbose = verbose
-        self.visual_detector = PreciseVisualDetector(verbose)
+        self.workers = max(1, workers)
+        self.stream = stream
         self.setup_logging()
+        self.image_format = self._resolve_image_format(image_format)
+        self.adaptive_scale = adaptive_scale
+        self.embedded_images = embedded_images
+        self.backend = self._resolve_backend(backend)
+        self.triage = triage
+        self.profiler = StageProfiler(profile, trace)
+        self.raster_detector = RasterRegionDetector() if raster and RasterRegionDetector.available() else None
+        if self.raster_detector:
+            self.raster_detector.profiler = self.profiler
+        self._page_kinds: Dict[int, str] = {}
+        self._range_stop = 0
+        self.screenshot_writer = ScreenshotWriter(encoder_threads, png_compression=png_compression,
+                                                  quality=image_quality)
+        self._screenshot_writes: Dict[int, List[Tuple[Future, DocumentElement, str]]] = {}
+        self._screenshot_page_texts: Dict[int, str] = {}  # Text of pages with writes pending, to re-render on failure
+        self.result_cache = (ResultCache(cache_dir, cache_max_mb, settings=self._output_settings(encoder=False))
+                             if cache_dir else None)
+        self._cache_doc_key: Optional[str] = None
+        self.visual_detector = PreciseVisualDetector(verbose)
+        self.visual_detector.profiler = self.profiler
+        self.reset_stats()
+
+    def _resolve_image_format(self, image_format: str) -> str:
+        """Validate the screenshot codec, falling back to PNG when Pillow lacks it"""
+        if image_format not in ScreenshotWriter.FORMATS + ("auto",):
+            raise ValueError(f"Unknown image format: {image_format}")
+
+        wanted = AUTO_PHOTO_FORMAT if image_format == "auto" else image_format
+        if not ScreenshotWriter.available(wanted):
+            self.logger.warning(f"{wanted.upper()} encoding not available; writing PNG screenshots")
+            return "png"
+        return image_format
+
+    def _resolve_backend(self, backend: str):
+        """Validate the PDF backend, falling back to PyMuPDF alone when pdfplumber is missing"""
+        if backend not in PDF_BACKENDS:
+            raise ValueError(f"Unknown PDF backend: {backend}")
+
+        if not PDF_BACKENDS[backend].available() and PyMuPDFBackend.available():
+            self.logger.warning(f"{backend} backend not available; parsing with PyMuPDF only")
+            backend = PyMuPDFBackend.name
+        return PDF_BACKENDS[backend]()
+
+    def _output_settings(self, encoder: bool = True) -> Dict[str, Any]:
+        """Detection and screenshot output settings as processor keyword arguments
+
+        Without encoder, only the settings that change output files (used in
+        result cache keys).
+        """
+        settings = {
+            "image_format": self.image_format,
+            "png_compression": self.screenshot_writer.png_compression,
+            "image_quality": self.screenshot_writer.quality,
+            "adaptive_scale": self.adaptive_scale,
+            "embedded_images": self.embedded_images,
+            "backend": self.backend.name,
+            "triage": self.triage,
+            "raster": self.raster_detector is not None,
+        }
+        if encoder:
+            settings["encoder_threads"] = self.screenshot_writer.threads
+            settings["profile"] = self.profiler.enabled
+            settings["trace"] = self.profiler.trace
+        return settings
+
+    def _choose_image_format(self, element: DocumentElement) -> str:
+        """Codec for one screenshot; auto mode keeps tables and vector art lossless"""
+        if self.image_format != "auto":
+            return self.image_format
+        if element.element_type == ElementType.TABLE:
+            return "png"
+        return AUTO_PHOTO_FORMAT if self._raster_coverage(element) >= PHOTO_AREA_RATIO else "png"
+
+    @staticmethod
+    def _raster_coverage(element: DocumentElement) -> float:
+        """Share of the element's box covered by embedded raster images"""
+        bbox = element.bbox
+        if bbox.area <= 0:
+            return 0.0
+
+        photo_area = 0.0
+        for visual in element.visual_elements:
+            if visual.element_type != 'image':
+                continue
+            x0, y0, x1, y1 = visual.bbox
+            photo_area += max(0.0, min(x1, bbox.x1) - max(x0, bbox.x0)) * max(0.0, min(y1, bbox.y1) - max(y0, bbox.y0))
+        return min(1.0, photo_area / bbox.area)
+
+    def _choose_render_scale(self, element: DocumentElement) -> float:
+        """Rasterization scale for one screenshot
+
+        Small crops are enlarged until their long side reaches
+        MIN_RENDER_LONG_SIDE pixels, large ones are reduced to fit
+        MAX_RENDER_PIXELS (both in RENDER_SCALE_STEP steps), and crops that
+        are mostly embedded raster images are not rendered above the images'
+        own resolution.
+        """
+        if not self.adaptive_scale:
+            return HIGH_QUALITY_SCALE
+
+        width, height = element.bbox.width, element.bbox.height
+        if width <= 0 or height <= 0:
+            return HIGH_QUALITY_SCALE
+
+        scale = HIGH_QUALITY_SCALE
+        legible_scale = MIN_RENDER_LONG_SIDE / max(width, height)
+        if legible_scale > scale:
+            scale = math.ceil(legible_scale / RENDER_SCALE_STEP) * RENDER_SCALE_STEP
+        budget_scale = math.sqrt(MAX_RENDER_PIXELS / (width * height))
+        if budget_scale < scale:
+            scale = math.floor(budget_scale / RENDER_SCALE_STEP) * RENDER_SCALE_STEP
+
+        if element.element_type != ElementType.TABLE and self._raster_coverage(element) >= PHOTO_AREA_RATIO:
+            native_scales = [
+                visual.attributes['srcsize'][0] / (visual.bbox[2] - visual.bbox[0])
+                for visual in element.visual_elements
+                if visual.element_type == 'image' and visual.attributes.get('srcsize')
+                and visual.bbox[2] > visual.bbox[0]
+            ]
+            if native_scales:
+                scale = min(scale, max(native_scales))
+
+        return max(MIN_RENDER_SCALE, min(MAX_RENDER_SCALE, scale))
 
+    def reset_stats(self):
+        """Start a fresh stats record, e.g. before reusing the processor for another PDF"""
         self.stats = {
             "start_time": time.time(),
             "pages_processed": 0,
@@ -804,6 +2410,7 @@ class PreciseScreenshotProcessorV3:
             "method_used": "Precise Visual Boundary Detection v3.0",
             "errors": [],
             "warnings": [],
+            "timed_out_pages": [],
             "peak_memory_mb": 0.0,
             "v3_improvements": [
                 "Actual visual element detection using page.images, page.rects, page.curves",
@@ -816,6 +2423,17 @@ class PreciseScreenshotProcessorV3:
             ]
         }
 
+        self.stats["image_output"] = {"format": self.image_format, "files": 0, "bytes_written": 0,
+                                      "encode_seconds": 0.0, "embedded_images": 0, "formats": {}}
+        self.stats["triage"] = {"enabled": self.triage, "pages_skipped": 0, "pages_detected": 0,
+                                "pages_raster": 0,
+                                "scan_seconds": 0.0, "text_seconds": 0.0, "parse_seconds": 0.0,
+                                "detect_seconds": 0.0}
+
+        if self.result_cache:
+            self.stats["cache"] = {"document_hit": False, "page_hits": 0, "page_misses": 0, "bytes_stored": 0}
+        self.profiler.reset()
+
     def setup_logging(self):
         """Setup logging configuration with Unicode-safe handlers"""
         # Configure logging to handle Unicode properly
@@ -823,7 +2441,7 @@ class PreciseScreenshotProcessorV3:
             level=logging.INFO if self.verbose else logging.WARNING,
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler('art_materials_processor_v3.log', encoding='utf-8'),
+                logging.FileHandler('art_materials_processor_v3.log', encoding='utf-8', delay=True),
                 logging.StreamHandler(sys.stdout)
             ]
         )
@@ -840,6 +2458,10 @@ class PreciseScreenshotProcessorV3:
 
             self._log_memory_usage()
 
+            self._document_deadline = (self.stats["start_time"] + self.timeout_seconds
+                                       if self.timeout_seconds else None)
+            self._document_timed_out = False
+
             pdf_path = str(Path(pdf_path)).replace('\\', '/')
             output_dir = str(Path(output_dir)).replace('\\', '/')
 
@@ -853,51 +2475,56 @@ class PreciseScreenshotProcessorV3:
             # Use safe logging for path with potential Unicode characters
             safe_log_path(self.logger, 'info', "Processing PDF with v3.0 Precise Visual Detection: {}", pdf_path)
 
-            all_elements = []
-            markdown_content = [f"# {pdf_name}\n\n"]
-            markdown_content.append("*Extracted using Precise Visual Boundary Detection v3.0*\n\n")
+            header = [f"# {pdf_name}\n\n", "*Extracted using Precise Visual Boundary Detection v3.0*\n\n"]
 
-            with pdfplumber.open(pdf_path) as pdf_plumber:
-                pdf_pymupdf = fitz.open(pdf_path)
+            cached_page_count = None
+            if self.result_cache:
+                self._cache_doc_key = self.result_cache.document_key(pdf_path)
+                cached_page_count = self.result_cache.load_document(self._cache_doc_key)
 
-                for page_num, page in enumerate(pdf_plumber.pages):
-                    self.logger.info(f"Processing page {page_num + 1} with precise visual detection")
-
-                    page_text = page.extract_text() or ""
-
-                    # Apply precise visual detection
-                    elements = self.visual_detector.detect_elements(page, page_text)
+            if cached_page_count is not None:
+                # Every page is cached: rebuild outputs without opening the PDF
+                self.stats["cache"]["document_hit"] = True
+                page_results = self._iter_cached_pages(pdf_path, images_dir, cached_page_count)
+            elif self.workers > 1:
+                page_results = self._process_pages_parallel(pdf_path, images_dir)
+            else:
+                page_results = self._iter_page_results(pdf_path, images_dir)
 
-                    # Generate screenshots for visually validated elements
-                    page_elements = self._generate_precise_screenshots(
-                        pdf_pymupdf, page_num, elements, images_dir
-                    )
+            if self.stream:
+                totals = self._write_output_streaming(pdf_output_dir, header, page_results)
+            else:
+                all_elements = []
+                markdown_content = list(header)
 
+                for page_content, page_elements in page_results:
                     all_elements.extend(page_elements)
-
-                    # Generate page content
-                    page_content = self._generate_page_content(page_text, page_elements, page_num + 1)
                     markdown_content.append(page_content)
+                self._record_profile()
 
-                    self.stats["pages_processed"] += 1
-                    self._log_memory_usage()
+                # Generate final document
+                final_markdown = self._finalize_markdown(markdown_content, all_elements)
 
-                pdf_pymupdf.close()
+                doc_path = os.path.join(pdf_output_dir, "document.md")
+                with open(doc_path, 'w', encoding='utf-8') as f:
+                    f.write(final_markdown)
 
-            # Generate final document
-            final_markdown = self._finalize_markdown(markdown_content, all_elements)
+                self._save_metadata(pdf_output_dir, all_elements)
+                totals = ElementTotals.of(all_elements)
 
-            doc_path = os.path.join(pdf_output_dir, "document.md")
-            with open(doc_path, 'w', encoding='utf-8') as f:
-                f.write(final_markdown)
+            if self.result_cache:
+                if cached_page_count is None:
+                    self.result_cache.store_document(self._cache_doc_key, self.stats["pages_processed"])
+                self.result_cache.evict(self.stats["cache"]["bytes_stored"])
 
-            self._save_metadata(pdf_output_dir, all_elements)
+            if self.profiler.trace:
+                self.profiler.write_trace(os.path.join(pdf_output_dir, TRACE_FILE_NAME))
 
-            self.stats["elements_detected"] = len(all_elements)
+            self.stats["elements_detected"] = totals.count
             self.stats["processing_time"] = time.time() - self.stats["start_time"]
 
-            if all_elements:
-                avg_visual_confidence = sum(e.quality_metrics.get("visual_confidence", 0) for e in all_elements) / len(all_elements)
+            if totals.count:
+                avg_visual_confidence = totals.visual_confidence / totals.count
                 self.stats["visual_accuracy"] = avg_visual_confidence
 
             self.logger.info(f"SUCCESS: v3.0 Precise Detection completed")
@@ -912,11 +2539,501 @@ class PreciseScreenshotProcessorV3:
             self.logger.error(f"v3.0 Processing failed: {e}")
             return False
 
-    def _generate_precise_screenshots(self, pdf_pymupdf, page_num: int, elements: List[DocumentElement], images_dir: str) -> List[DocumentElement]:
-        """Generate screenshots with precise visual boundaries"""
+        finally:
+            self._screenshot_writes = {}
+            self._screenshot_page_texts = {}
+            self._page_kinds = {}
+            self.screenshot_writer.close()
+            if self.raster_detector:
+                self.raster_detector.close()
+
+    def _process_page_range(self, pdf_path: str, images_dir: str, start: int = 0, stop: Optional[int] = None,
+                            staging_dir: Optional[str] = None) -> List[Tuple[str, List[DocumentElement]]]:
+        """Process pages [start, stop) with this process's own PDF handles"""
+        return list(self._iter_page_results(pdf_path, images_dir, start, stop, staging_dir))
+
+    def _iter_page_results(self, pdf_path: str, images_dir: str, start: int = 0, stop: Optional[int] = None,
+                           staging_dir: Optional[str] = None) -> Iterator[Tuple[str, List[DocumentElement]]]:
+        """Yield (page_content, page_elements) for pages [start, stop) in page order
+
+        Each page is yielded once its screenshots are on disk, one page behind
+        detection, so its PNGs encode while the next page is being detected.
+        """
+        pending = None
+        for page_num, page_result in self._iter_processed_pages(pdf_path, images_dir, start, stop, staging_dir):
+            if pending is not None:
+                yield self._finish_screenshot_writes(*pending)
+            pending = (page_num, page_result)
+
+        if pending is not None:
+            yield self._finish_screenshot_writes(*pending)
+
+    def _iter_processed_pages(self, pdf_path: str, images_dir: str, start: int = 0, stop: Optional[int] = None,
+                              staging_dir: Optional[str] = None) -> Iterator[Tuple[int, Tuple[str, List[DocumentElement]]]]:
+        """Yield (page_num, page result) as pages are processed; screenshots may still be writing
+
+        In streaming mode each page's parsed layout is flushed once the page is
+        done, and the PDF is reopened every STREAM_REOPEN_PAGES pages so the
+        parsers' object caches do not grow with the page count.
+        """
+        if self.stream:
+            with fitz.open(pdf_path) as doc:
+                page_count = doc.page_count
+            stop = page_count if stop is None else min(stop, page_count)
+            self._range_stop = stop
+
+            for batch_start in range(start, stop, STREAM_REOPEN_PAGES):
+                batch_stop = min(batch_start + STREAM_REOPEN_PAGES, stop)
+                page_numbers = [page_num + 1 for page_num in range(batch_start, batch_stop)]
+
+                with self.backend.open(pdf_path, page_numbers) as (pages, pdf_pymupdf):
+                    for page_num, page in zip(range(batch_start, batch_stop), pages):
+                        with self.profiler.page(page_num):
+                            page_result = self._process_page_cached(page, pdf_pymupdf, page_num, images_dir,
+                                                                    staging_dir)
+                            self.visual_detector.release_page()
+                            page.close()
+                        yield page_num, page_result
+            return
+
+        with self.backend.open(pdf_path) as (pages, pdf_pymupdf):
+            stop = len(pages) if stop is None else min(stop, len(pages))
+            self._range_stop = stop
+
+            for page_num in range(start, stop):
+                with self.profiler.page(page_num):
+                    page_result = self._process_page_cached(pages[page_num], pdf_pymupdf, page_num,
+                                                            images_dir, staging_dir)
+                yield page_num, page_result
+
+    def _finish_screenshot_writes(self, page_num: int, page_result: Tuple[str, List[DocumentElement]],
+                                  page_output: Optional[Dict[str, Any]] = None) -> Tuple[str, List[DocumentElement]]:
+        """Wait for a page's background screenshot writes, recording sizes and failures
+
+        Returns the page result; the written files are also added to
+        page_output when given. Elements whose screenshot could not be
+        written are dropped, as an element whose save failed always was, and
+        the page's markdown is rendered again without their image links.
+        """
+        output = self.stats["image_output"]
+        page_text = self._screenshot_page_texts.pop(page_num, "")
+        failed = []
+        for future, element, _ in self._screenshot_writes.pop(page_num, []):
+            with self.profiler.stage("screenshots.wait"):
+                error = future.exception()
+            if error is not None:
+                self.logger.error(f"Screenshot failed for {element.title}: {error}")
+                self.stats["errors"].append(f"Screenshot failed: {element.title}")
+                self.stats["screenshots_created"] -= 1
+                if element.quality_metrics.get("screenshot_source") == "embedded_image":
+                    output["embedded_images"] -= 1
+                failed.append(element)
+                continue
+
+            image_format, size, encode_seconds = future.result()
+            self.profiler.add("encode", encode_seconds, page=False)
+            written = {"files": 1, "bytes_written": size, "encode_seconds": encode_seconds,
+                       "formats": {image_format: {"files": 1, "bytes_written": size}}}
+            self._add_image_output(output, written)
+            if page_output is not None:
+                self._add_image_output(page_output, written)
+
+        if not failed:
+            return page_result
+        page_elements = [element for element in page_result[1] if all(element is not bad for bad in failed)]
+        return self._generate_page_content(page_text, page_elements, page_num + 1), page_elements
+
+    def _discard_screenshot_writes(self, page_num: int):
+        """Drop an abandoned page's screenshots: cancel queued writes, wait for running ones, delete their files"""
+        self._screenshot_page_texts.pop(page_num, None)
+        for future, _, target in self._screenshot_writes.pop(page_num, []):
+            if not future.cancel():
+                future.exception()
+            try:
+                os.remove(target)
+            except OSError:
+                pass  # Cancelled before it was written, or the write failed
+
+    @staticmethod
+    def _add_image_output(total: Dict[str, Any], part: Dict[str, Any]):
+        """Accumulate one screenshot-output record into another"""
+        total["files"] += part["files"]
+        total["bytes_written"] += part["bytes_written"]
+        total["encode_seconds"] += part["encode_seconds"]
+        total["embedded_images"] += part.get("embedded_images", 0)
+        for image_format, counts in part["formats"].items():
+            entry = total["formats"].setdefault(image_format, {"files": 0, "bytes_written": 0})
+            entry["files"] += counts["files"]
+            entry["bytes_written"] += counts["bytes_written"]
+
+    def _process_page(self, page, pdf_pymupdf, page_num: int, images_dir: str,
+                      staging_dir: Optional[str] = None) -> Tuple[str, List[DocumentElement]]:
+        """Detect, screenshot and render markdown for a single page"""
+        self.logger.info(f"Processing page {page_num + 1} with precise visual detection")
+
+        triage = self.stats["triage"]
+        profiler = self.profiler
+        page_kind = self._page_kind(pdf_pymupdf, page_num) if self.triage or self.raster_detector else "vector"
+        profiler.count(f"pages_{page_kind}")
+        self.visual_detector.check_deadline()
+        start = time.perf_counter()
+        if page_kind == "text" and self.triage:
+            # Nothing to detect: the parser is skipped and the text taken from PyMuPDF
+            with profiler.stage("text"):
+                page_text = self._pymupdf_page_text(pdf_pymupdf, page_num)
+            elements = []
+            triage["text_seconds"] += time.perf_counter() - start
+            triage["pages_skipped"] += 1
+        else:
+            with profiler.stage("parse"):
+                page_text = page.extract_text() or ""
+            self.visual_detector.check_deadline()
+            parsed = time.perf_counter()
+            triage["parse_seconds"] += parsed - start
+
+            # A scan has no vector primitives: find its figures and tables on a thumbnail
+            regions = self._raster_regions(pdf_pymupdf, page_num) if page_kind == "scanned" else None
+            if regions is not None:
+                with profiler.stage("detect"):
+                    elements = self.visual_detector.detect_raster_elements(page, page_text, regions)
+                triage["pages_raster"] += 1
+            else:
+                # Apply precise visual detection
+                with profiler.stage("detect"):
+                    elements = self.visual_detector.detect_elements(page, page_text)
+            triage["detect_seconds"] += time.perf_counter() - parsed
+            triage["pages_detected"] += 1
+
+        # Generate screenshots for visually validated elements
+        with profiler.stage("screenshots"):
+            page_elements = self._generate_precise_screenshots(
+                pdf_pymupdf, page_num, elements, images_dir, staging_dir
+            )
+
+        # Generate page content
+        with profiler.stage("markdown"):
+            page_content = self._generate_page_content(page_text, page_elements, page_num + 1)
+        if page_num in self._screenshot_writes:
+            self._screenshot_page_texts[page_num] = page_text
+
+        self.stats["pages_processed"] += 1
+        self._log_memory_usage()
+
+        return page_content, page_elements
+
+    def _page_kind(self, pdf_pymupdf, page_num: int) -> str:
+        """Classify a page as "text", "scanned" or "vector" from PyMuPDF's drawing log"""
+        kind = self._page_kinds.get(page_num)
+        if kind is not None:
+            return kind
+
+        triage = self.stats["triage"]
+        start = time.perf_counter()
+        try:
+            page = pdf_pymupdf[page_num]
+            image_area = 0.0
+            kind = "text"
+            with deadline_deferred():
+                bboxlog = page.get_bboxlog()
+            for op, rect in bboxlog:
+                if op == "fill-image":
+                    image_area += (fitz.Rect(rect) & page.rect).get_area()
+                elif op not in TRIAGE_TEXT_OPS:
+                    kind = "vector"
+                    break
+            if kind == "text" and image_area:
+                kind = "scanned" if image_area >= SCANNED_PAGE_COVERAGE * page.rect.get_area() else "vector"
+        except Exception:
+            kind = "vector"
+        elapsed = time.perf_counter() - start
+        triage["scan_seconds"] += elapsed
+        self.profiler.add("triage", elapsed, start)
+
+        self._page_kinds[page_num] = kind
+        return kind
+
+    def _raster_regions(self, pdf_pymupdf, page_num: int) -> Optional[List[RasterRegion]]:
+        """Raster regions of a scanned page, or None for vector detection
+
+        None when raster detection is off or OpenCV cannot load, and when
+        rendering or analysing this page's thumbnail fails (e.g. a corrupt
+        image stream); that page then goes through detect_elements.
+        """
+        if not self.raster_detector or not self.raster_detector.ready():
+            return None
+        try:
+            with self.profiler.stage("raster"):
+                return self.raster_detector.regions(pdf_pymupdf, page_num,
+                                                    self._scanned_pages_after(pdf_pymupdf, page_num))
+        except Exception as e:
+            self.logger.warning(f"Page {page_num + 1}: raster analysis failed ({e}); using vector detection")
+            self.stats["warnings"].append(f"Page {page_num + 1}: raster analysis failed; used vector detection")
+            return None
+
+    def _scanned_pages_after(self, pdf_pymupdf, page_num: int) -> Iterator[int]:
+        """Scanned pages in a bounded window after page_num in the range being processed, in order"""
+        stop = min(self._range_stop, page_num + 1 + RASTER_LOOKAHEAD_BATCHES * self.raster_detector.batch_pages)
+        for next_num in range(page_num + 1, stop):
+            if self._page_kind(pdf_pymupdf, next_num) == "scanned":
+                yield next_num
+
+    def _record_profile(self):
+        """Put the profiler's summary in stats, where the metadata file picks it up"""
+        if self.profiler.enabled:
+            self.stats["profile"] = self.profiler.summary()
+
+    def _process_page_cached(self, page, pdf_pymupdf, page_num: int, images_dir: str,
+                             staging_dir: Optional[str] = None) -> Tuple[str, List[DocumentElement]]:
+        """Serve a page from the result cache, or process it and store the result"""
+        if not self.result_cache:
+            return self._process_page_guarded(page, pdf_pymupdf, page_num, images_dir, staging_dir)[0]
+
+        with self.profiler.stage("cache.load"):
+            cached = self._load_cached_page(page_num, images_dir, staging_dir)
+        if cached is not None:
+            return cached
+
+        self.stats["cache"]["page_misses"] += 1
+        screenshots_before = self.stats["screenshots_created"]
+        embedded_before = self.stats["image_output"]["embedded_images"]
+        errors_before = len(self.stats["errors"])
+        warnings_before = len(self.stats["warnings"])
+
+        (page_content, page_elements), completed = self._process_page_guarded(
+            page, pdf_pymupdf, page_num, images_dir, staging_dir
+        )
+        if not completed:
+            return page_content, page_elements  # Text-only fallback is never cached
+
+        image_output = {"files": 0, "bytes_written": 0, "encode_seconds": 0.0,
+                        "embedded_images": self.stats["image_output"]["embedded_images"] - embedded_before,
+                        "formats": {}}
+        written = self._finish_screenshot_writes(page_num, (page_content, page_elements), image_output)
+        if len(written[1]) != len(page_elements):
+            return written  # A failed screenshot write may be transient; do not cache the page without it
+        entry = {
+            "page_content": page_content,
+            "elements": [self._element_to_cache(element) for element in page_elements],
+            "screenshots_created": self.stats["screenshots_created"] - screenshots_before,
+            "image_output": dict(image_output, encode_seconds=0.0),  # A hit copies the files; nothing is encoded
+            "errors": self.stats["errors"][errors_before:],
+            "warnings": self.stats["warnings"][warnings_before:],
+        }
+        png_paths = [os.path.join(staging_dir or images_dir, element.quality_metrics["screenshot_filename"])
+                     for element in page_elements if element.quality_metrics.get("screenshot_filename")]
+        with self.profiler.stage("cache.store"):
+            self.stats["cache"]["bytes_stored"] += self.result_cache.store_page(self._cache_doc_key, page_num,
+                                                                                 entry, png_paths)
+
+        return page_content, page_elements
+
+    def _process_page_guarded(self, page, pdf_pymupdf, page_num: int, images_dir: str,
+                              staging_dir: Optional[str] = None) -> Tuple[Tuple[str, List[DocumentElement]], bool]:
+        """Process a page within the page and document budgets; returns (page result, completed)"""
+        budget = self.page_timeout_seconds
+        if self._document_deadline is not None:
+            remaining = self._document_deadline - time.time()
+            if remaining <= 0:
+                if not self._document_timed_out:
+                    self._document_timed_out = True
+                    self.stats["warnings"].append(
+                        f"Document timeout of {self.timeout_seconds}s reached at page {page_num + 1}; "
+                        f"remaining pages emitted as text only"
+                    )
+                return self._text_only_page(pdf_pymupdf, page_num), False
+            budget = min(budget, remaining) if budget else remaining
+
+        if not budget:
+            return self._process_page(page, pdf_pymupdf, page_num, images_dir, staging_dir), True
+
+        screenshots_before = self.stats["screenshots_created"]
+        embedded_before = self.stats["image_output"]["embedded_images"]
+        self.visual_detector.deadline = time.monotonic() + budget
+        try:
+            with PageDeadline(budget):
+                return self._process_page(page, pdf_pymupdf, page_num, images_dir, staging_dir), True
+        except ProcessingTimeout:
+            self.stats["screenshots_created"] = screenshots_before
+            self.stats["image_output"]["embedded_images"] = embedded_before
+            self._discard_screenshot_writes(page_num)
+            self.stats["warnings"].append(
+                f"Page {page_num + 1}: exceeded {budget:g}s time budget; abandoned and emitted as text only"
+            )
+            self.logger.warning(f"Page {page_num + 1} timed out after {budget:g}s; using text-only output")
+            self.visual_detector.release_page()
+            if hasattr(page, 'close'):
+                page.close()
+            return self._text_only_page(pdf_pymupdf, page_num), False
+        finally:
+            self.visual_detector.deadline = None
+
+    def _text_only_page(self, pdf_pymupdf, page_num: int) -> Tuple[str, List[DocumentElement]]:
+        """Text-only page output for pages abandoned on timeout"""
+        page_text = self._pymupdf_page_text(pdf_pymupdf, page_num)
+
+        self.stats["timed_out_pages"].append(page_num + 1)
+        self.stats["pages_processed"] += 1
+        return self._generate_page_content(page_text, [], page_num + 1), []
+
+    @staticmethod
+    def _pymupdf_page_text(pdf_pymupdf, page_num: int) -> str:
+        """Page text from PyMuPDF in content-stream order, without a layout pass"""
+        try:
+            return pdf_pymupdf[page_num].get_text()
+        except Exception:
+            return ""
+
+    def _iter_cached_pages(self, pdf_path: str, images_dir: str,
+                           page_count: int) -> Iterator[Tuple[str, List[DocumentElement]]]:
+        """Yield every page from the result cache, processing any entry evicted since the lookup"""
+        for page_num in range(page_count):
+            with self.profiler.page(page_num), self.profiler.stage("cache.load"):
+                cached = self._load_cached_page(page_num, images_dir)
+            if cached is None:
+                self.stats["cache"]["document_hit"] = False
+                yield from self._iter_page_results(pdf_path, images_dir, page_num, page_num + 1)
+            else:
+                yield cached
+
+    def _load_cached_page(self, page_num: int, images_dir: str,
+                          staging_dir: Optional[str] = None) -> Optional[Tuple[str, List[DocumentElement]]]:
+        """Restore a cached page: copy its PNGs into place and rebuild its elements"""
+        cached = self.result_cache.load_page(self._cache_doc_key, page_num)
+        if cached is None:
+            return None
+        entry, entry_dir = cached
+
+        try:
+            page_elements = [self._element_from_cache(record, images_dir) for record in entry["elements"]]
+            for element in page_elements:
+                filename = element.quality_metrics.get("screenshot_filename")
+                if filename:
+                    shutil.copyfile(os.path.join(entry_dir, filename),
+                                    os.path.join(staging_dir or images_dir, filename))
+        except (OSError, KeyError, ValueError, TypeError) as e:
+            self.logger.warning(f"Result cache entry for page {page_num + 1} unusable: {e}")
+            return None
+
+        self.stats["cache"]["page_hits"] += 1
+        self.stats["pages_processed"] += 1
+        self.stats["screenshots_created"] += entry["screenshots_created"]
+        self._add_image_output(self.stats["image_output"], entry["image_output"])
+        self.stats["errors"].extend(entry["errors"])
+        self.stats["warnings"].extend(entry["warnings"])
+
+        return entry["page_content"], page_elements
+
+    def _element_to_cache(self, element: DocumentElement) -> Dict[str, Any]:
+        """Serialize an element for the result cache (raw PDF attributes are dropped)"""
+        return {
+            "element_type": element.element_type.value,
+            "number": element.number,
+            "title": element.title,
+            "bbox": asdict(element.bbox),
+            "page_number": element.page_number,
+            "text_references": element.text_references,
+            "detection_method": element.detection_method,
+            "visual_elements": [[ve.element_type, ve.bbox, ve.confidence] for ve in element.visual_elements],
+            "quality_metrics": element.quality_metrics,
+        }
+
+    def _element_from_cache(self, record: Dict[str, Any], images_dir: str) -> DocumentElement:
+        """Rebuild an element from the result cache, pointing screenshots at images_dir"""
+        quality_metrics = dict(record["quality_metrics"])
+        if quality_metrics.get("screenshot_filename"):
+            quality_metrics["screenshot_path"] = os.path.join(images_dir, quality_metrics["screenshot_filename"])
+
+        return DocumentElement(
+            element_type=ElementType(record["element_type"]),
+            number=record["number"],
+            title=record["title"],
+            bbox=BoundingBox(**record["bbox"]),
+            page_number=record["page_number"],
+            text_references=record["text_references"],
+            detection_method=record["detection_method"],
+            visual_elements=[
+                VisualElement(element_type=element_type, bbox=tuple(bbox), confidence=confidence,
+                              attributes=NO_ATTRIBUTES)
+                for element_type, bbox, confidence in record["visual_elements"]
+            ],
+            quality_metrics=quality_metrics
+        )
+
+    def _plan_page_shards(self, page_count: int) -> List[Tuple[int, int]]:
+        """Split pages into contiguous ranges, several per worker for load balancing"""
+        shard_count = max(1, min(page_count, self.workers * SHARDS_PER_WORKER))
+        shard_size = math.ceil(page_count / shard_count) if page_count else 1
+        return [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+    def _process_pages_parallel(self, pdf_path: str, images_dir: str) -> Iterator[Tuple[str, List[DocumentElement]]]:
+        """Process page-range shards on a process pool and yield results in page order"""
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+
+        shards = self._plan_page_shards(page_count)
+        staging_root = os.path.join(images_dir, ".v3_shards")
+
+        self.logger.info(f"Processing {page_count} pages in {len(shards)} shards on {self.workers} workers")
+
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(shards))) as pool:
+                futures = [
+                    pool.submit(_process_page_shard, pdf_path, images_dir,
+                                os.path.join(staging_root, f"{shard_num:05d}"), start, stop,
+                                self.verbose, self.stream, self._cache_settings(),
+                                (self.page_timeout_seconds, self._document_deadline, self.timeout_seconds),
+                                self._output_settings())
+                    for shard_num, (start, stop) in enumerate(shards)
+                ]
+
+                # Merge strictly in shard order so screenshots that share a filename
+                # end up with the later page's image, exactly as in a serial run
+                for shard_num, future in enumerate(futures):
+                    shard_pages, shard_stats = future.result()
+                    staging_dir = os.path.join(staging_root, f"{shard_num:05d}")
+
+                    for filename in sorted(os.listdir(staging_dir)):
+                        os.replace(os.path.join(staging_dir, filename), os.path.join(images_dir, filename))
+
+                    self.stats["pages_processed"] += shard_stats["pages_processed"]
+                    self.stats["screenshots_created"] += shard_stats["screenshots_created"]
+                    self.stats["errors"].extend(shard_stats["errors"])
+                    self.stats["warnings"].extend(shard_stats["warnings"])
+                    self.stats["timed_out_pages"].extend(shard_stats["timed_out_pages"])
+                    self.stats["peak_memory_mb"] = max(self.stats["peak_memory_mb"], shard_stats["peak_memory_mb"])
+                    self._add_image_output(self.stats["image_output"], shard_stats["image_output"])
+                    for key in ("pages_skipped", "pages_detected", "pages_raster", "scan_seconds", "text_seconds",
+                                "parse_seconds", "detect_seconds"):
+                        self.stats["triage"][key] += shard_stats["triage"][key]
+                    if "cache" in shard_stats:
+                        self.stats["cache"]["page_hits"] += shard_stats["cache"]["page_hits"]
+                        self.stats["cache"]["page_misses"] += shard_stats["cache"]["page_misses"]
+                        self.stats["cache"]["bytes_stored"] += shard_stats["cache"]["bytes_stored"]
+                    if "profile" in shard_stats:
+                        self.profiler.merge(shard_stats["profile"], shard_stats.get("trace_events"))
+                    self._log_memory_usage()
+                    yield from shard_pages
+        finally:
+            shutil.rmtree(staging_root, ignore_errors=True)
+
+    def _cache_settings(self) -> Optional[Tuple[str, float, str]]:
+        """(cache root, size limit in MB, document key) for worker processes"""
+        if not self.result_cache:
+            return None
+        return self.result_cache.root, self.result_cache.max_bytes / (1024 * 1024), self._cache_doc_key
+
+    def _generate_precise_screenshots(self, pdf_pymupdf, page_num: int, elements: List[DocumentElement], images_dir: str,
+                                      staging_dir: Optional[str] = None) -> List[DocumentElement]:
+        """Generate screenshots with precise visual boundaries
+
+        When staging_dir is given, PNGs are written there but recorded under
+        images_dir, where the parallel merge step moves them.
+        """
         screenshot_elements = []
+        placements = None
 
         for element in elements:
+            self.visual_detector.check_deadline()
             try:
                 page = pdf_pymupdf[page_num]
 
@@ -934,31 +3051,55 @@ class PreciseScreenshotProcessorV3:
                     element.bbox.y1
                 )
 
-                # High quality screenshot
-                mat = fitz.Matrix(HIGH_QUALITY_SCALE, HIGH_QUALITY_SCALE)
-                pix = page.get_pixmap(matrix=mat, clip=bbox_fitz)
-
-                # Validate screenshot quality
-                if pix.width < MIN_WIDTH * HIGH_QUALITY_SCALE or pix.height < MIN_HEIGHT * HIGH_QUALITY_SCALE:
-                    if self.verbose:
-                        self.logger.warning(f"Skipping {element.title}: screenshot quality insufficient")
-                    continue
+                image_format = self._choose_image_format(element)
+
+                # A lone embedded image is written from its own stream; anything
+                # else gets a high quality screenshot at a scale suited to the crop
+                with self.profiler.stage("screenshots.embedded"):
+                    if placements is None:
+                        placements = PageImagePlacements(page)
+                    embedded = self._embedded_image_source(placements, element, image_format)
+                if embedded is not None:
+                    source, width, height, scale = embedded
+                else:
+                    scale = self._choose_render_scale(element)
+                    mat = fitz.Matrix(scale, scale)
+                    with self.profiler.stage("screenshots.render"):
+                        source = page.get_pixmap(matrix=mat, clip=bbox_fitz)
+                    width, height = source.width, source.height
+                    self.profiler.count("rendered_pixels", width * height)
+
+                    # Validate screenshot quality
+                    if width < math.floor(MIN_WIDTH * scale) or height < math.floor(MIN_HEIGHT * scale):
+                        if self.verbose:
+                            self.logger.warning(f"Skipping {element.title}: screenshot quality insufficient")
+                        continue
 
                 # Generate filename
                 element_type_short = element.element_type.value.title()
                 safe_title = self._sanitize_filename(element.title)
-                filename = f"v3_{element_type_short}_{element.number:02d}_{safe_title}.png"
+                extension = ScreenshotWriter.EXTENSIONS[image_format]
+                filename = f"v3_{element_type_short}_{element.number:02d}_{safe_title}{extension}"
                 filepath = os.path.join(images_dir, filename)
+                target = os.path.join(staging_dir, filename) if staging_dir else filepath
 
-                pix.save(filepath)
+                with self.profiler.stage("screenshots.queue"):
+                    if isinstance(source, bytes):
+                        future = self.screenshot_writer.submit_encoded(source, target, image_format)
+                    else:
+                        future = self.screenshot_writer.submit(source, target, image_format)
+                self._screenshot_writes.setdefault(page_num, []).append((future, element, target))
 
                 # Update metrics
                 element.quality_metrics.update({
                     "screenshot_created": True,
                     "screenshot_path": filepath,
                     "screenshot_filename": filename,
-                    "screenshot_width": pix.width,
-                    "screenshot_height": pix.height,
+                    "screenshot_format": image_format,
+                    "screenshot_source": "embedded_image" if embedded is not None else "rendered",
+                    "render_scale": round(scale, 3),
+                    "screenshot_width": width,
+                    "screenshot_height": height,
                     "visual_elements_detected": element.bbox.visual_elements_count,
                     "text_density": element.bbox.text_density,
                     "detection_method": element.detection_method
@@ -966,9 +3107,11 @@ class PreciseScreenshotProcessorV3:
 
                 screenshot_elements.append(element)
                 self.stats["screenshots_created"] += 1
+                if embedded is not None:
+                    self.stats["image_output"]["embedded_images"] += 1
 
                 if self.verbose:
-                    self.logger.info(f"v3.0 screenshot: {filename} ({pix.width}x{pix.height}) - {element.bbox.visual_elements_count} visual elements")
+                    self.logger.info(f"v3.0 screenshot: {filename} ({width}x{height}) - {element.bbox.visual_elements_count} visual elements")
 
             except Exception as e:
                 self.logger.error(f"Screenshot failed for {element.title}: {e}")
@@ -976,6 +3119,65 @@ class PreciseScreenshotProcessorV3:
 
         return screenshot_elements
 
+    def _embedded_image_source(self, placements: PageImagePlacements, element: DocumentElement, image_format: str):
+        """(source, width, height, scale) to write a standalone image without rasterizing, or None
+
+        Applies to standalone elements placed upright from one embedded image
+        with no mask, decode array, visible text or vector drawings over it.
+        A JPEG stream going to JPEG output is copied byte for byte (source is
+        bytes); otherwise the image is decoded once at its native resolution
+        (source is a Pixmap), provided that fits MAX_RENDER_PIXELS. Either way
+        the image keeps its native resolution, whatever the scale mode.
+        """
+        if not self.embedded_images or not element.bbox.raster_image:
+            return None
+
+        page = placements.page
+        bbox = fitz.Rect(element.bbox.x0, element.bbox.y0, element.bbox.x1, element.bbox.y1)
+        try:
+            overlapping = [info for info in placements.images if fitz.Rect(info['bbox']).intersects(bbox)]
+            if len(overlapping) != 1 or not overlapping[0].get('xref'):
+                return None
+            info = overlapping[0]
+
+            placed = fitz.Rect(info['bbox'])
+            a, b, c, d = info['transform'][:4]
+            if (b or c or a <= 0 or d <= 0 or info.get('has-mask') or not page.rect.contains(placed)
+                    or max(abs(p - q) for p, q in zip(placed, bbox)) > EMBEDDED_IMAGE_TOLERANCE):
+                return None
+
+            if any(rect.intersects(placed) for rect in placements.drawing_rects):
+                return None
+            if any(rect.intersects(placed) for rect in placements.text_rects):
+                return None  # Visible text drawn over the image
+
+            doc = page.parent
+            xref = info['xref']
+            if doc.xref_get_key(xref, "Decode")[0] != "null" or doc.xref_get_key(xref, "ImageMask")[0] == "true":
+                return None
+
+            width, height = info['width'], info['height']
+            scale = width / placed.width
+
+            if image_format == "jpeg":
+                extracted = doc.extract_image(xref)
+                if extracted.get('ext') == "jpeg" and extracted.get('colorspace') in (1, 3) and not extracted.get('smask'):
+                    return extracted['image'], width, height, scale
+
+            if width * height > MAX_RENDER_PIXELS:
+                return None
+
+            pix = fitz.Pixmap(doc, xref)
+            if pix.alpha:
+                pix = fitz.Pixmap(pix, 0)
+            if pix.n not in (1, 3):
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+            return pix, pix.width, pix.height, scale
+
+        except Exception as e:
+            self.logger.debug(f"Embedded image fast path unavailable for {element.title}: {e}")
+            return None
+
     def _validate_input(self, pdf_path: str) -> bool:
         """Input validation"""
         try:
@@ -991,7 +3193,7 @@ class PreciseScreenshotProcessorV3:
         missing = []
         if not HAS_PYMUPDF:
             missing.append("PyMuPDF")
-        if not HAS_PDFPLUMBER:
+        if self.backend.name == PdfplumberBackend.name and not HAS_PDFPLUMBER:
             missing.append("pdfplumber")
         if not HAS_PIL:
             missing.append("PIL")
@@ -1054,23 +3256,28 @@ class PreciseScreenshotProcessorV3:
         """Finalize markdown with v3.0 summary"""
         final_content = []
         final_content.extend(content_lines)
+        final_content.append(self._summary_markdown(ElementTotals.of(elements)))
+        return "".join(final_content)
+
+    def _summary_markdown(self, totals: ElementTotals) -> str:
+        """Render the v3.0 processing summary from element totals"""
+        final_content = []
 
         final_content.append("\n\n---\n\n## v3.0 Processing Summary\n")
         final_content.append(f"- **Method**: Precise Visual Boundary Detection v3.0\n")
         final_content.append(f"- **Pages**: {self.stats['pages_processed']}\n")
-        final_content.append(f"- **Elements**: {len(elements)}\n")
+        final_content.append(f"- **Elements**: {totals.count}\n")
         final_content.append(f"- **Screenshots**: {self.stats['screenshots_created']}\n")
         final_content.append(f"- **Visual Accuracy**: {self.stats.get('visual_accuracy', 0):.1%}\n")
 
-        if elements:
+        if totals.count:
             # Visual validation stats
-            with_visual = sum(1 for e in elements if e.bbox.has_visual_content)
-            final_content.append(f"- **Elements with Visual Content**: {with_visual}/{len(elements)}\n")
+            final_content.append(f"- **Elements with Visual Content**: {totals.with_visual_content}/{totals.count}\n")
 
-            avg_visual_elements = sum(e.bbox.visual_elements_count for e in elements) / len(elements)
+            avg_visual_elements = totals.visual_elements / totals.count
             final_content.append(f"- **Avg Visual Elements per Element**: {avg_visual_elements:.1f}\n")
 
-            avg_text_density = sum(e.bbox.text_density for e in elements) / len(elements)
+            avg_text_density = totals.text_density / totals.count
             final_content.append(f"- **Avg Text Density**: {avg_text_density:.1%}\n")
 
         final_content.append("\n### v3.0 Key Improvements:\n")
@@ -1079,59 +3286,763 @@ class PreciseScreenshotProcessorV3:
 
         return "".join(final_content)
 
+    def _element_metadata(self, element: DocumentElement) -> Dict[str, Any]:
+        """Compact metadata record for one element"""
+        return {
+            "type": element.element_type.value,
+            "number": element.number,
+            "title": element.title,
+            "page": element.page_number,
+            "bbox": {
+                "x0": element.bbox.x0, "y0": element.bbox.y0,
+                "x1": element.bbox.x1, "y1": element.bbox.y1,
+                "width": element.bbox.width, "height": element.bbox.height,
+                "visual_elements_count": element.bbox.visual_elements_count,
+                "text_density": element.bbox.text_density,
+                "has_visual_content": element.bbox.has_visual_content
+            },
+            "visual_elements": [
+                {
+                    "type": ve.element_type,
+                    "bbox": ve.bbox,
+                    "confidence": ve.confidence
+                } for ve in element.visual_elements
+            ],
+            "quality_metrics": element.quality_metrics,
+            "detection_method": element.detection_method
+        }
+
     def _save_metadata(self, output_dir: str, elements: List[DocumentElement]):
         """Save v3.0 metadata"""
         metadata = {
             "processing_stats": self.stats,
-            "detected_elements": [
-                {
-                    "type": element.element_type.value,
-                    "number": element.number,
-                    "title": element.title,
-                    "page": element.page_number,
-                    "bbox": {
-                        "x0": element.bbox.x0, "y0": element.bbox.y0,
-                        "x1": element.bbox.x1, "y1": element.bbox.y1,
-                        "width": element.bbox.width, "height": element.bbox.height,
-                        "visual_elements_count": element.bbox.visual_elements_count,
-                        "text_density": element.bbox.text_density,
-                        "has_visual_content": element.bbox.has_visual_content
-                    },
-                    "visual_elements": [
-                        {
-                            "type": ve.element_type,
-                            "bbox": ve.bbox,
-                            "confidence": ve.confidence
-                        } for ve in element.visual_elements
-                    ],
-                    "quality_metrics": element.quality_metrics,
-                    "detection_method": element.detection_method
-                }
-                for element in elements
-            ],
-            "version": "v3.0 - Precise Visual Boundary Detection"
+            "detected_elements": [self._element_metadata(element) for element in elements],
+            "version": METADATA_VERSION
         }
 
         metadata_path = os.path.join(output_dir, "processing_metadata_v3.json")
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2)
 
+    def _write_output_streaming(self, output_dir: str, header: List[str],
+                                page_results: Iterator[Tuple[str, List[DocumentElement]]]) -> ElementTotals:
+        """Write document.md and metadata incrementally, keeping only element totals in memory
+
+        Element records are spooled to disk as JSON lines while pages are
+        processed, then assembled into the same processing_metadata_v3.json
+        that _save_metadata writes.
+        """
+        doc_path = os.path.join(output_dir, "document.md")
+        metadata_path = os.path.join(output_dir, "processing_metadata_v3.json")
+        spool_path = metadata_path + ".part"
+        totals = ElementTotals()
+
+        try:
+            with open(doc_path, 'w', encoding='utf-8') as doc_file, \
+                    open(spool_path, 'w', encoding='utf-8') as spool_file:
+                doc_file.write("".join(header))
+
+                for page_content, page_elements in page_results:
+                    doc_file.write(page_content)
+                    for element in page_elements:
+                        totals.add(element)
+                        spool_file.write(json.dumps(self._element_metadata(element)) + "\n")
+
+                doc_file.write(self._summary_markdown(totals))
+            self._record_profile()
+
+            # Same layout as json.dump(metadata, f, indent=2)
+            with open(metadata_path, 'w', encoding='utf-8') as f, \
+                    open(spool_path, 'r', encoding='utf-8') as spool_file:
+                stats_json = json.dumps({"processing_stats": self.stats}, indent=2)
+                f.write(stats_json[:-2] + ',\n  "detected_elements": [')
+
+                first = True
+                for line in spool_file:
+                    record_json = json.dumps(json.loads(line), indent=2).replace("\n", "\n    ")
+                    f.write(("\n    " if first else ",\n    ") + record_json)
+                    first = False
+
+                f.write(("]" if first else "\n  ]") + f',\n  "version": {json.dumps(METADATA_VERSION)}\n}}')
+        finally:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+
+        return totals
+
+
+def _process_page_shard(pdf_path: str, images_dir: str, staging_dir: str, start: int, stop: int,
+                        verbose: bool, stream: bool = False,
+                        cache_settings: Optional[Tuple[str, float, str]] = None,
+                        deadline_settings: Tuple[float, Optional[float], float] = (DEFAULT_PAGE_TIMEOUT, None, 0),
+                        output_settings: Optional[Dict[str, Any]] = None
+                        ) -> Tuple[List[Tuple[str, List[DocumentElement]]], Dict[str, Any]]:
+    """Worker entry point: process pages [start, stop) with fresh PDF handles
+
+    Raw pdfplumber objects are dropped from VisualElement.attributes before the
+    results are pickled back; the markdown and metadata never use them.
+    """
+    cache_dir, cache_max_mb, cache_doc_key = cache_settings or (None, DEFAULT_CACHE_MAX_MB, None)
+    page_timeout, document_deadline, timeout_seconds = deadline_settings
+    processor = PreciseScreenshotProcessorV3(verbose=verbose, stream=stream,
+                                             cache_dir=cache_dir, cache_max_mb=cache_max_mb,
+                                             page_timeout_seconds=page_timeout, **(output_settings or {}))
+    processor._cache_doc_key = cache_doc_key
+    processor._document_deadline = document_deadline
+    processor.timeout_seconds = timeout_seconds
+    os.makedirs(staging_dir, exist_ok=True)
+
+    try:
+        page_results = processor._process_page_range(pdf_path, images_dir, start, stop, staging_dir)
+    finally:
+        processor.screenshot_writer.close()
+        if processor.raster_detector:
+            processor.raster_detector.close()
+
+    for _, page_elements in page_results:
+        for element in page_elements:
+            for ve in element.visual_elements:
+                ve.attributes = NO_ATTRIBUTES
+
+    shard_stats = {key: processor.stats[key] for key in
+                   ("pages_processed", "screenshots_created", "errors", "warnings", "timed_out_pages",
+                    "peak_memory_mb", "image_output", "triage", "cache")
+                   if key in processor.stats}
+    if processor.profiler.enabled:
+        shard_stats["profile"] = processor.profiler.summary()
+        shard_stats["trace_events"] = processor.profiler.events
+    return page_results, shard_stats
+
+
+def collect_batch_pdfs(inputs: List[str], output_dir: str) -> List[Dict[str, Any]]:
+    """Expand directories, glob patterns and PDF paths into batch jobs, largest first
+
+    PDFs found under a directory keep their relative folder in the output
+    tree so documents with the same name in different folders do not collide.
+    """
+    jobs = {}
+
+    def add(pdf_path: Path, relative_dir: str = ""):
+        if not pdf_path.is_file() or pdf_path.suffix.lower() != '.pdf':
+            return
+        key = str(pdf_path.resolve())
+        if key not in jobs:
+            stat = pdf_path.stat()
+            jobs[key] = {
+                "pdf_path": key,
+                "output_dir": os.path.join(output_dir, relative_dir),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+            }
+
+    for pattern in inputs:
+        path = Path(pattern)
+        if path.is_dir():
+            for pdf_path in sorted(path.rglob("*")):
+                add(pdf_path, str(pdf_path.parent.relative_to(path)))
+        elif any(ch in pattern for ch in "*?["):
+            for match in sorted(glob.glob(pattern, recursive=True)):
+                add(Path(match))
+        else:
+            add(path)
+
+    # Two PDFs with the same name would write to the same output folder
+    seen = {}
+    for job in jobs.values():
+        target = os.path.normpath(os.path.join(job["output_dir"], Path(job["pdf_path"]).stem))
+        if target in seen:
+            seen[target] += 1
+            job["output_dir"] = os.path.join(job["output_dir"], f"_duplicate_{seen[target]}")
+        else:
+            seen[target] = 0
+
+    return sorted(jobs.values(), key=lambda job: job["size"], reverse=True)
+
+
+def read_batch_journal(journal_path: str) -> Dict[str, Dict[str, Any]]:
+    """Latest journal record per PDF path"""
+    records = {}
+    if not os.path.exists(journal_path):
+        return records
+
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                records[record["pdf_path"]] = record
+            except (ValueError, KeyError):
+                continue  # Truncated line from an interrupted run
+    return records
+
+
+_batch_processor: Optional['PreciseScreenshotProcessorV3'] = None
+
+
+def _init_batch_worker(processor_kwargs: Dict[str, Any]):
+    """Create the warm processor reused for every job this worker runs"""
+    global _batch_processor
+    _batch_processor = PreciseScreenshotProcessorV3(**processor_kwargs)
+
+
+def _run_batch_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Process one batch job on this worker's warm processor"""
+    processor = _batch_processor
+    processor.reset_stats()
+    started = time.time()
+
+    try:
+        success = processor.process_pdf(job["pdf_path"], job["output_dir"])
+    except Exception as e:
+        success = False
+        processor.stats["errors"].append(f"Processing failed: {e}")
+
+    return {
+        "pdf_path": job["pdf_path"],
+        "output_dir": job["output_dir"],
+        "size": job["size"],
+        "mtime": job["mtime"],
+        "status": "ok" if success else "failed",
+        "pages": processor.stats["pages_processed"],
+        "elements": processor.stats["elements_detected"],
+        "screenshots": processor.stats["screenshots_created"],
+        "image_bytes": processor.stats["image_output"]["bytes_written"],
+        "seconds": time.time() - started,
+        "peak_memory_mb": processor.stats["peak_memory_mb"],
+        "errors": processor.stats["errors"],
+        "warnings": len(processor.stats["warnings"]),
+        "finished_at": time.time(),
+    }
+
+
+def run_batch(inputs: List[str], output_dir: str, workers: int = 1, journal_path: Optional[str] = None,
+              summary_path: Optional[str] = None, resume: bool = True,
+              processor_kwargs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Process a corpus of PDFs on a pool of warm workers, largest files first
+
+    Each finished file is appended to a JSON-lines journal; with resume,
+    files already journaled as ok (same size and mtime) are skipped.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    journal_path = journal_path or os.path.join(output_dir, BATCH_JOURNAL_NAME)
+    summary_path = summary_path or os.path.join(output_dir, BATCH_SUMMARY_NAME)
+    processor_kwargs = dict(processor_kwargs or {})
+    processor_kwargs["workers"] = 1  # Parallelism is across files in batch mode
+
+    jobs = collect_batch_pdfs(inputs, output_dir)
+    done = read_batch_journal(journal_path) if resume else {}
+
+    pending, skipped = [], []
+    for job in jobs:
+        record = done.get(job["pdf_path"])
+        if (record and record.get("status") == "ok" and
+                record.get("size") == job["size"] and record.get("mtime") == job["mtime"]):
+            skipped.append(record)
+        else:
+            pending.append(job)
+
+    safe_print(f"Batch: {len(jobs)} PDFs found, {len(skipped)} already done, {len(pending)} to process "
+               f"on {workers} worker(s)")
+
+    records = []
+    started = time.time()
+
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        def finish(record: Dict[str, Any]):
+            records.append(record)
+            journal.write(json.dumps(record) + "\n")
+            journal.flush()
+            safe_print(f"[{len(records)}/{len(pending)}] {record['status'].upper()}: "
+                       f"{safe_format_path(record['pdf_path'])} ({record['pages']} pages, {record['seconds']:.1f}s)")
+
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_batch_worker,
+                                     initargs=(processor_kwargs,)) as pool:
+                # Jobs are queued largest first, so big files start early and
+                # small ones fill in the gaps at the end (LPT scheduling)
+                futures = {pool.submit(_run_batch_job, job): job for job in pending}
+                for future in as_completed(futures):
+                    try:
+                        finish(future.result())
+                    except Exception as e:
+                        job = futures[future]
+                        finish(dict(job, status="failed", pages=0, elements=0, screenshots=0, seconds=0.0,
+                                    peak_memory_mb=0.0, errors=[f"Worker failed: {e}"], warnings=0,
+                                    finished_at=time.time()))
+        else:
+            _init_batch_worker(processor_kwargs)
+            for job in pending:
+                finish(_run_batch_job(job))
+
+    wall_time = time.time() - started
+    ok = [r for r in records if r["status"] == "ok"]
+    pages = sum(r["pages"] for r in ok)
+    elements = sum(r["elements"] for r in ok)
+
+    summary = {
+        "files_found": len(jobs),
+        "files_processed": len(records),
+        "files_ok": len(ok),
+        "files_failed": len(records) - len(ok),
+        "files_skipped": len(skipped),
+        "workers": workers,
+        "wall_time": wall_time,
+        "pages": pages,
+        "elements": elements,
+        "screenshots": sum(r["screenshots"] for r in ok),
+        "pages_per_second": pages / wall_time if wall_time > 0 else 0.0,
+        "elements_per_second": elements / wall_time if wall_time > 0 else 0.0,
+        "journal": journal_path,
+        "files": [
+            {key: r[key] for key in ("pdf_path", "status", "pages", "elements", "seconds", "errors")}
+            for r in records
+        ],
+    }
+
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+    return summary
+
+
+def add_processor_arguments(parser: argparse.ArgumentParser):
+    """Options shared by single-PDF, batch and serve mode that configure PreciseScreenshotProcessorV3"""
+    parser.add_argument("--timeout", type=int, default=30, help="Timeout in minutes per PDF")
+    parser.add_argument("--verbose", action="store_true", help="Verbose logging")
+    parser.add_argument("--page-timeout", type=float, default=DEFAULT_PAGE_TIMEOUT,
+                        help="Per-page time budget in seconds (0 disables); slow pages fall back to text only")
+    parser.add_argument("--stream", action="store_true",
+                        help="Bounded-memory mode: flush page caches and write output incrementally")
+    parser.add_argument("--cache-dir", help="Persistent result cache directory (reuses unchanged PDFs/pages)")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help="Result cache size limit in MB (least recently used entries are evicted)")
+    parser.add_argument("--encoder-threads", type=int, default=SCREENSHOT_ENCODER_THREADS,
+                        help="Background threads encoding and writing screenshots (0 = write inline)")
+    parser.add_argument("--image-format", choices=ScreenshotWriter.FORMATS + ("auto",), default=DEFAULT_IMAGE_FORMAT,
+                        help="Screenshot codec; auto keeps tables/vector art PNG and uses "
+                             f"{AUTO_PHOTO_FORMAT.upper()} for photographic crops")
+    parser.add_argument("--png-compression", type=int, choices=range(10), default=PNG_COMPRESSION_LEVEL,
+                        metavar="0-9", help="PNG zlib compression level")
+    parser.add_argument("--image-quality", type=int, default=LOSSY_IMAGE_QUALITY,
+                        help="JPEG/AVIF quality (1-100)")
+    parser.add_argument("--fixed-scale", action="store_true",
+                        help=f"Render every screenshot at {HIGH_QUALITY_SCALE}x instead of an adaptive scale")
+    parser.add_argument("--render-embedded", action="store_true",
+                        help="Render standalone embedded images through the page instead of writing them "
+                             "from their own streams")
+    parser.add_argument("--backend", choices=tuple(PDF_BACKENDS), default=DEFAULT_PDF_BACKEND,
+                        help="PDF parser for detection; pymupdf parses each PDF once instead of twice")
+    parser.add_argument("--triage", action="store_true",
+                        help="Skip parsing and detection on pages that draw only text and take their text from "
+                             "PyMuPDF (faster; reading order and line breaks may differ)")
+    parser.add_argument("--no-raster", action="store_true",
+                        help="Detect scanned pages from their embedded images instead of OpenCV raster analysis")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-stage timers, counters and the slowest pages in the metadata")
+    parser.add_argument("--trace", action="store_true",
+                        help=f"Profile and also write a Chrome trace ({TRACE_FILE_NAME}) for chrome://tracing, "
+                             "Perfetto or speedscope")
+
+
+def processor_kwargs_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    """PreciseScreenshotProcessorV3 keyword arguments for options added by add_processor_arguments"""
+    return {
+        "timeout_minutes": args.timeout, "verbose": args.verbose, "stream": args.stream,
+        "cache_dir": args.cache_dir, "cache_max_mb": args.cache_max_mb,
+        "page_timeout_seconds": args.page_timeout, "encoder_threads": args.encoder_threads,
+        "image_format": args.image_format, "png_compression": args.png_compression,
+        "image_quality": args.image_quality, "adaptive_scale": not args.fixed_scale,
+        "embedded_images": not args.render_embedded,
+        "backend": args.backend, "triage": args.triage,
+        "raster": not args.no_raster,
+        "profile": args.profile, "trace": args.trace,
+    }
+
+
+def batch_main(argv: List[str]) -> int:
+    """Batch corpus entry point: art-materials-processor-v3.py batch INPUT... -o OUTPUT_DIR"""
+    parser = argparse.ArgumentParser(prog="art-materials-processor-v3.py batch",
+                                     description="Art Materials Processor v3.0 - batch corpus mode")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories (searched recursively) or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (one PDF each)")
+    parser.add_argument("--journal", help=f"Progress journal (default: OUTPUT_DIR/{BATCH_JOURNAL_NAME})")
+    parser.add_argument("--summary", help=f"Corpus summary JSON (default: OUTPUT_DIR/{BATCH_SUMMARY_NAME})")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess files already journaled as done")
+    add_processor_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.inputs, args.output_dir, workers=max(1, args.workers), journal_path=args.journal,
+        summary_path=args.summary, resume=not args.no_resume,
+        processor_kwargs=processor_kwargs_from_args(args)
+    )
+
+    safe_print("=" * 80)
+    safe_print(f"Batch complete: {summary['files_ok']} ok, {summary['files_failed']} failed, "
+               f"{summary['files_skipped']} skipped")
+    safe_print(f"Throughput: {summary['pages_per_second']:.2f} pages/s, "
+               f"{summary['elements_per_second']:.2f} elements/s ({summary['wall_time']:.1f}s wall)")
+    return 0 if summary["files_failed"] == 0 else 1
+
+
+def _init_serve_worker(processor_kwargs: Dict[str, Any]):
+    """Create the warm processor and import the parsing stack before the first job arrives"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the daemon drains jobs itself
+    _init_batch_worker(processor_kwargs)
+    for module, installed in ((fitz, HAS_PYMUPDF), (pdfplumber, HAS_PDFPLUMBER), (Image, HAS_PIL)):
+        if installed:
+            module._lazy_load()
+    if _batch_processor.raster_detector:
+        _batch_processor.raster_detector.ready()
+
+
+def _serve_worker_ready() -> int:
+    """No-op job that makes the pool start (and initialize) a worker"""
+    return os.getpid()
+
+
+class ProcessingDaemon:
+    """Warm worker pool behind serve mode: admits jobs up to a bounded queue and keeps their results
+
+    Each worker process holds one PreciseScreenshotProcessorV3 for its whole
+    life, so a job pays neither interpreter start-up, imports nor logging
+    setup. Jobs beyond queue_size are refused rather than buffered. Admitted
+    jobs wait in a FIFO queue and are handed to the pool one per free
+    worker; jobs that write the same output folder (same PDF stem and
+    output_dir) run one after another instead of overwriting each other.
+    With roots set, PDFs and output directories must lie under one of them.
+    """
+
+    def __init__(self, workers: int = 1, queue_size: int = SERVE_QUEUE_SIZE, output_dir: Optional[str] = None,
+                 processor_kwargs: Optional[Dict[str, Any]] = None, roots: Optional[List[str]] = None):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.output_dir = output_dir
+        self.roots = [os.path.realpath(root) for root in roots or []]
+        self.processor_kwargs = dict(processor_kwargs or {})
+        self.processor_kwargs["workers"] = 1  # Parallelism is across jobs in serve mode
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+        self.counts = {"accepted": 0, "rejected": 0, "ok": 0, "failed": 0}
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._restarting = False
+        self._waiting: List[Dict[str, Any]] = []  # Admitted jobs not yet handed to the pool, oldest first
+        self._running = 0
+        self._busy_dirs: Set[str] = set()  # Output folders of the running jobs
+        self.pool = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_serve_worker,
+                                   initargs=(self.processor_kwargs,))
+        # Start every worker now so the first jobs do not pay for imports
+        for future in [pool.submit(_serve_worker_ready) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    def _check_path(self, path: str) -> str:
+        """Resolved path, or PermissionError when roots are configured and it lies outside all of them"""
+        resolved = os.path.realpath(path)
+        if self.roots and not any(os.path.commonpath([root, resolved]) == root for root in self.roots):
+            raise PermissionError(f"Outside the allowed roots: {safe_format_path(path)}")
+        return resolved
+
+    def submit(self, pdf_path: str, output_dir: Optional[str] = None) -> Dict[str, Any]:
+        """Queue one PDF and return its job record; the record's "_done" event is set once it has finished
+
+        Raises ValueError for a request that cannot be processed,
+        PermissionError for paths outside the allowed roots and OverflowError
+        when queue_size jobs are already admitted.
+        """
+        output_dir = output_dir or self.output_dir
+        if not output_dir:
+            raise ValueError("output_dir is required (the daemon was started without --output-dir)")
+        pdf_path, output_dir = self._check_path(pdf_path), self._check_path(output_dir)
+        if not os.path.isfile(pdf_path) or not pdf_path.lower().endswith('.pdf'):
+            raise ValueError(f"Invalid PDF file: {safe_format_path(pdf_path)}")
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counts["rejected"] += 1
+            raise OverflowError(f"Queue full ({self.queue_size} jobs running or waiting)")
+
+        stat = os.stat(pdf_path)
+        pdf_output_dir = os.path.join(output_dir, Path(pdf_path).stem)
+        with self._lock:
+            self._next_id += 1
+            job = {
+                "id": f"{self._next_id:06d}",
+                "pdf_path": pdf_path,
+                "output_dir": output_dir,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "status": "queued",
+                "document": os.path.join(pdf_output_dir, "document.md"),
+                "metadata": os.path.join(pdf_output_dir, "processing_metadata_v3.json"),
+                "submitted_at": time.time(),
+                "_pdf_output_dir": pdf_output_dir,
+                "_done": threading.Event(),
+            }
+            self.jobs[job["id"]] = job
+            self.counts["accepted"] += 1
+            self._waiting.append(job)
+        self._dispatch()
+        return job
+
+    def _dispatch(self):
+        """Hand waiting jobs to the pool while workers are free, skipping jobs whose output folder is busy"""
+        with self._lock:
+            if self._restarting:
+                return  # The restart thread dispatches once the new pool is up
+            started = []
+            for job in list(self._waiting):
+                if self._running >= self.workers:
+                    break
+                if job["_pdf_output_dir"] in self._busy_dirs:
+                    continue
+                self._waiting.remove(job)
+                self._busy_dirs.add(job["_pdf_output_dir"])
+                self._running += 1
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                started.append(job)
+            pool = self.pool
+
+        for job in started:
+            try:
+                future = pool.submit(_run_batch_job,
+                                     {key: job[key] for key in ("pdf_path", "output_dir", "size", "mtime")})
+            except (BrokenProcessPool, RuntimeError) as e:  # Pool broken or shut down since it was read
+                future = Future()
+                future.set_exception(e)
+            future.add_done_callback(lambda done, job=job: self._finish(job, pool, done))
+
+    def _finish(self, job: Dict[str, Any], pool: ProcessPoolExecutor, future: Future):
+        try:
+            record = future.result()
+        except Exception as e:
+            record = {"status": "failed", "pages": 0, "elements": 0, "screenshots": 0, "seconds": 0.0,
+                      "errors": [f"Worker failed: {e}"]}
+            if isinstance(e, BrokenProcessPool):
+                with self._lock:
+                    restart = self.pool is pool and not self._restarting
+                    self._restarting = self._restarting or restart
+                if restart:  # Every job of the broken pool fails at once; restart only for the first
+                    # Runs in the pool's callback thread: starting the new pool here would block it
+                    threading.Thread(target=self._restart_pool, args=(pool,), daemon=True).start()
+
+        job.update({key: record[key] for key in ("status", "pages", "elements", "screenshots", "seconds", "errors")})
+        job["latency"] = time.time() - job["submitted_at"]
+        with self._lock:
+            self._running -= 1
+            self._busy_dirs.discard(job["_pdf_output_dir"])
+            self.counts["ok" if job["status"] == "ok" else "failed"] += 1
+            finished = [job_id for job_id, other in self.jobs.items() if other["status"] in ("ok", "failed")]
+            for job_id in finished[:max(0, len(finished) - SERVE_JOB_HISTORY)]:
+                del self.jobs[job_id]
+        job["_done"].set()
+        self._slots.release()
+        self._dispatch()
+
+    def _restart_pool(self, broken: ProcessPoolExecutor):
+        """Replace a pool whose worker died (e.g. killed by the OOM killer) so later jobs still run"""
+        try:
+            pool = self._start_pool()
+            with self._lock:
+                self.pool = pool
+        finally:
+            with self._lock:
+                self._restarting = False
+        broken.shutdown(wait=False)
+        safe_print("WARNING: a worker process died; worker pool restarted")
+        self._dispatch()
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            queued, running = len(self._waiting), self._running
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued_jobs": queued,
+            "running_jobs": running,
+            "active_jobs": queued + running,
+            "uptime": time.time() - self.started_at,
+            **self.counts,
+        }
+
+    def shutdown(self):
+        """Let admitted jobs finish, then stop the workers"""
+        for job in list(self.jobs.values()):
+            job["_done"].wait()
+        self.pool.shutdown(wait=True)
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """A job record as returned to clients"""
+    return {key: value for key, value in job.items() if not key.startswith("_")}
+
+
+def make_daemon_server(daemon: ProcessingDaemon, socket_path: Optional[str] = None,
+                       host: str = "127.0.0.1", port: int = 0):
+    """HTTP server for the daemon on a Unix domain socket (owner-only), or on host:port
 
-def main():
+    POST /jobs {"pdf_path", "output_dir"?, "wait"?: true} runs a PDF and
+    returns its job record with the document.md and metadata paths (202 and
+    the record right away with "wait": false); GET /jobs/<id> polls a job;
+    GET /health reports the pool and queue. Paths outside the daemon's roots
+    are refused with 403.
+    """
+    # Imported here: http.server costs more start-up time than the rest of the CLI
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class DaemonRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive: clients can reuse one connection for many jobs
+
+        def _reply(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, daemon.status())
+            elif self.path.startswith("/jobs/"):
+                job = daemon.job(self.path[len("/jobs/"):])
+                if job:
+                    self._reply(200, public_job(job))
+                else:
+                    self._reply(404, {"error": "Unknown job"})
+            else:
+                self._reply(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                self._reply(404, {"error": "Not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                job = daemon.submit(str(request["pdf_path"]), request.get("output_dir"))
+            except OverflowError as e:
+                self._reply(503, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            except PermissionError as e:
+                self._reply(403, {"error": str(e)})
+                return
+            except KeyError:
+                self._reply(400, {"error": "pdf_path is required"})
+                return
+            except (ValueError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+
+            if not request.get("wait", True):
+                self._reply(202, public_job(job), {"Location": f"/jobs/{job['id']}"})
+                return
+            job["_done"].wait()
+            self._reply(200 if job["status"] == "ok" else 500, public_job(job))
+
+        def address_string(self):
+            # Unix socket peers have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else socket_path
+
+        def log_message(self, format, *args):
+            logging.getLogger(__name__).info("%s - %s", self.address_string(), format % args)
+
+    if socket_path:
+        class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+            def server_bind(self):
+                socketserver.UnixStreamServer.server_bind(self)
+                os.chmod(self.server_address, 0o600)  # Only the daemon's user may submit jobs
+                self.server_name, self.server_port = "localhost", 0  # Read by BaseHTTPRequestHandler
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Stale socket from a daemon that did not exit cleanly
+        return ThreadingUnixHTTPServer(socket_path, DaemonRequestHandler)
+    return ThreadingHTTPServer((host, port), DaemonRequestHandler)
+
+
+def serve_main(argv: List[str]) -> int:
+    """Daemon entry point: art-materials-processor-v3.py serve [--socket PATH | --port PORT --root DIR]"""
+    parser = argparse.ArgumentParser(prog="art-materials-processor-v3.py serve",
+                                     description="Art Materials Processor v3.0 - processing daemon with a warm "
+                                                 "worker pool")
+    parser.add_argument("--socket", default=SERVE_DEFAULT_SOCKET,
+                        help=f"Unix domain socket to listen on (default: {SERVE_DEFAULT_SOCKET})")
+    parser.add_argument("--port", type=int, help="Listen on local HTTP at this port instead (requires --root)")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP listen address")
+    parser.add_argument("--root", action="append", default=[],
+                        help="Only accept PDFs and output directories under this directory (repeatable)")
+    parser.add_argument("-o", "--output-dir", help="Output directory for jobs that do not name one")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (one PDF each)")
+    parser.add_argument("--queue-size", type=int, default=SERVE_QUEUE_SIZE,
+                        help="Jobs running or waiting before new ones are refused with 503")
+    add_processor_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.port is not None and not args.root:
+        # Any local user can reach a TCP port; do not let them read and write anywhere we can
+        parser.error("--port requires at least one --root")
+    socket_path = None if args.port is not None else args.socket
+
+    daemon = ProcessingDaemon(workers=args.workers, queue_size=args.queue_size, output_dir=args.output_dir,
+                              processor_kwargs=processor_kwargs_from_args(args), roots=args.root)
+    server = make_daemon_server(daemon, socket_path, args.host, args.port)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    address = socket_path or f"http://{args.host}:{server.server_address[1]}"
+    safe_print(f"Serving on {address} with {daemon.workers} worker(s), queue size {daemon.queue_size}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        daemon.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+    safe_print(f"Stopped: {daemon.counts['ok']} ok, {daemon.counts['failed']} failed, "
+               f"{daemon.counts['rejected']} rejected")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None):
     """Main execution"""
-    parser = argparse.ArgumentParser(description="Art Materials Processor v3.0 - Precise Visual Detection")
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "batch":
+        return batch_main(argv[1:])
+    if argv and argv[0] == "serve":
+        return serve_main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Art Materials Processor v3.0 - Precise Visual Detection",
+                                     epilog="Batch mode: %(prog)s batch INPUT [INPUT ...] -o OUTPUT_DIR; "
+                                            "daemon: %(prog)s serve [--socket PATH | --port PORT --root DIR]")
     parser.add_argument("pdf_path", help="Path to PDF file")
     parser.add_argument("output_dir", help="Output directory")
-    parser.add_argument("--timeout", type=int, default=30, help="Timeout in minutes")
-    parser.add_argument("--verbose", action="store_true", help="Verbose logging")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for page-parallel processing")
+    add_processor_arguments(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if not os.path.exists(args.pdf_path) or not args.pdf_path.lower().endswith('.pdf'):
         safe_print(f"ERROR: Invalid PDF file: {safe_format_path(args.pdf_path)}")
         return 1
 
-    processor = PreciseScreenshotProcessorV3(timeout_minutes=args.timeout, verbose=args.verbose)
+    processor = PreciseScreenshotProcessorV3(workers=args.workers, **processor_kwargs_from_args(args))
 
     safe_print("=" * 80)
     safe_print("Art Materials Processor v3.0 - PRECISE VISUAL BOUNDARY DETECTION")
@@ -1154,6 +4065,24 @@ def main():
         safe_print("SUCCESS: v3.0 Precise Visual Detection completed")
         safe_print(f"Elements detected: {processor.stats['elements_detected']}")
         safe_print(f"Screenshots created: {processor.stats['screenshots_created']}")
+        image_output = processor.stats["image_output"]
+        safe_print(f"Screenshot output: {image_output['bytes_written'] / (1024 * 1024):.1f} MB "
+                   f"({image_output['format']}, {image_output['encode_seconds']:.1f}s encoding)")
+        triage = processor.stats["triage"]
+        if triage["pages_skipped"]:
+            safe_print(f"Triage: {triage['pages_skipped']} text-only pages skipped parsing and detection "
+                       f"({triage['text_seconds']:.1f}s on their text, {triage['scan_seconds']:.1f}s scanning pages)")
+        profile = processor.stats.get("profile")
+        if profile:
+            top_stages = [(name, stage) for name, stage in profile["stages"].items() if "." not in name][:5]
+            if top_stages:
+                safe_print("Slowest stages: " + ", ".join(f"{name} {stage['seconds']:.2f}s ({stage['calls']} calls)"
+                                                         for name, stage in top_stages))
+            if profile["slowest_pages"]:
+                safe_print("Slowest pages: " + ", ".join(f"{page['page']} ({page['seconds']:.2f}s)"
+                                                        for page in profile["slowest_pages"][:5]))
+        if args.trace:
+            safe_print(f"Trace: {safe_format_path(os.path.join(args.output_dir, Path(args.pdf_path).stem, TRACE_FILE_NAME))}")
         safe_print(f"Visual accuracy: {processor.stats.get('visual_accuracy', 0):.1%}")
         safe_print(f"Processing time: {processor.stats['processing_time']:.1f}s")
         return 0
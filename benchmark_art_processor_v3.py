@@ -0,0 +1,1657 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for art-materials-processor-v3.py
+
+Runs micro-benchmarks of the PreciseVisualDetector hot paths on synthetic
+pages and checks the optimized code paths against straightforward reference
+implementations, so a speedup never comes with a change in detector output.
+
+The end-to-end suite generates synthetic PDFs of a given shape (pages,
+prose density, figures and their curves, tables, mentions), runs them
+through PreciseVisualDetector and the full processor in fresh processes,
+and reports per-stage time, pages/s and peak RSS. Results can be saved as
+JSON and later runs checked against them for regressions.
+
+Usage:
+    python benchmark_art_processor_v3.py [--curves 20000] [--queries 200]
+    python benchmark_art_processor_v3.py --suite-only --json before.json
+    python benchmark_art_processor_v3.py --suite-only --baseline before.json
+"""
+
+import os
+import sys
+import json
+import time
+import re
+import math
+import random
+import argparse
+import importlib.util
+import multiprocessing
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+PROCESSOR_PATH = Path(__file__).resolve().parent / "art-materials-processor-v3.py"
+MIN_TABLE_HEIGHT = 130
+BACKEND_BBOX_TOLERANCE = 2.0  # Points the two parsers' element boxes may differ by
+RASTER_BBOX_TOLERANCE = 6.0  # Points a region found on a 50 dpi thumbnail may miss the true box by
+
+
+def load_processor():
+    """Import art-materials-processor-v3.py as a module"""
+    spec = importlib.util.spec_from_file_location("art_materials_processor_v3", PROCESSOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class SyntheticPage:
+    """Minimal stand-in for a pdfplumber page with dict-based primitives"""
+
+    def __init__(self, page_number: int = 1, width: float = 612, height: float = 792):
+        self.page_number = page_number
+        self.width = width
+        self.height = height
+        self.images: List[Dict[str, Any]] = []
+        self.rects: List[Dict[str, Any]] = []
+        self.curves: List[Dict[str, Any]] = []
+        self.chars: List[Dict[str, Any]] = []
+        self.tables: List['SyntheticTable'] = []
+        self.table_finder_calls = 0
+
+    def find_tables(self, table_settings=None) -> List['SyntheticTable']:
+        self.table_finder_calls += 1
+        return list(self.tables)
+
+    def extract_tables(self, table_settings=None) -> List[List[List[str]]]:
+        return [table.extract() for table in self.find_tables(table_settings)]
+
+
+class SyntheticTable:
+    """Stand-in for a pdfplumber Table with a bbox and fixed cell text"""
+
+    def __init__(self, bbox: Tuple[float, float, float, float], rows: int = 4, cols: int = 3):
+        self.bbox = bbox
+        self.rows = [[f"r{r}c{c}" for c in range(cols)] for r in range(rows)]
+
+    def extract(self, **kwargs) -> List[List[str]]:
+        return self.rows
+
+
+def _box(rng: random.Random, page: SyntheticPage, max_w: float, max_h: float) -> Dict[str, float]:
+    x0 = rng.uniform(0, page.width - max_w)
+    top = rng.uniform(0, page.height - max_h)
+    return {"x0": x0, "top": top, "x1": x0 + rng.uniform(0.5, max_w), "bottom": top + rng.uniform(0.5, max_h)}
+
+
+def make_curve_dense_page(curves: int, rects: int = 500, images: int = 5, seed: int = 7) -> SyntheticPage:
+    """Build a synthetic vector-heavy page (CAD-drawing style)"""
+    rng = random.Random(seed)
+    page = SyntheticPage()
+    page.images = [_box(rng, page, 300, 200) for _ in range(images)]
+    page.rects = [_box(rng, page, 60, 40) for _ in range(rects)]
+    page.curves = [_box(rng, page, 15, 15) for _ in range(curves)]
+    return page
+
+
+def make_text_dense_page(chars: int, seed: int = 13) -> SyntheticPage:
+    """Build a synthetic prose page with chars laid out in lines"""
+    rng = random.Random(seed)
+    page = SyntheticPage()
+    per_line = 90
+    for i in range(chars):
+        line, col = divmod(i, per_line)
+        x0 = 36 + col * 6 + rng.uniform(-0.2, 0.2)
+        top = 36 + (line % 60) * 12 + rng.uniform(-0.2, 0.2)
+        page.chars.append({"text": "x", "x0": x0, "top": top,
+                           "x1": x0 + rng.uniform(4.0, 6.0), "bottom": top + rng.uniform(9.0, 11.0)})
+    return page
+
+
+def make_table_page(tables: int, seed: int = 17) -> SyntheticPage:
+    """Build a synthetic page with ruled tables stacked down the page"""
+    rng = random.Random(seed)
+    page = SyntheticPage()
+    band = (page.height - 72) / max(1, tables)
+    for t in range(tables):
+        top = 36 + t * band
+        bottom = top + max(MIN_TABLE_HEIGHT, band - 20)
+        page.tables.append(SyntheticTable((40, top, 560, bottom)))
+        for r in range(5):
+            y = top + r * (bottom - top) / 4
+            page.rects.append({"x0": 40, "top": y, "x1": 560, "bottom": y + 0.5})
+        for c in range(4):
+            x = 40 + c * 520 / 3 + rng.uniform(-0.1, 0.1)
+            page.rects.append({"x0": x, "top": top, "x1": x + 0.5, "bottom": bottom})
+    return page
+
+
+def random_areas(count: int, seed: int = 11) -> List[Tuple[float, float, float, float]]:
+    rng = random.Random(seed)
+    areas = []
+    for _ in range(count):
+        x0, y0 = rng.uniform(0, 500), rng.uniform(0, 650)
+        areas.append((x0, y0, x0 + rng.uniform(50, 300), y0 + rng.uniform(50, 300)))
+    return areas
+
+
+def reference_in_area(obj: Dict[str, Any], area: Tuple[float, float, float, float]) -> bool:
+    """Per-primitive overlap test of the linear scan"""
+    area_x0, area_y0, area_x1, area_y1 = area
+    x0 = obj.get('x0', 0)
+    y0 = obj.get('top', obj.get('y0', 0))
+    x1 = obj.get('x1', x0)
+    y1 = obj.get('bottom', obj.get('y1', y0))
+    return not (x1 < area_x0 or x0 > area_x1 or y1 < area_y0 or y0 > area_y1)
+
+
+def reference_count(page, area) -> int:
+    """Linear scan over every primitive (pre-index behaviour)"""
+    count = 0
+    for attr in ('images', 'rects', 'curves'):
+        for obj in getattr(page, attr, []):
+            if reference_in_area(obj, area):
+                count += 1
+    return count
+
+
+def reference_text_density(page, area) -> float:
+    """Per-char Python loop (pre-vectorization behaviour)"""
+    x0, y0, x1, y1 = area
+    area_size = (x1 - x0) * (y1 - y0)
+    if area_size <= 0:
+        return 0.0
+    text_area = 0.0
+    for char in page.chars:
+        char_x0 = char.get('x0', 0)
+        char_y0 = char.get('top', char.get('y0', 0))
+        char_x1 = char.get('x1', char_x0)
+        char_y1 = char.get('bottom', char.get('y1', char_y0))
+        if (x0 <= char_x0 <= x1 and y0 <= char_y0 <= y1 and
+            x0 <= char_x1 <= x1 and y0 <= char_y1 <= y1):
+            text_area += (char_x1 - char_x0) * (char_y1 - char_y0)
+    return min(1.0, text_area / area_size)
+
+
+def bench_text_density(module, chars: int, queries: int) -> Dict[str, Any]:
+    """Text density: per-char loop vs. columnar batch scoring"""
+    page = make_text_dense_page(chars)
+    areas = random_areas(queries)
+    detector = module.PreciseVisualDetector()
+
+    start = time.perf_counter()
+    expected = [reference_text_density(page, area) for area in areas]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = detector._calculate_text_densities(detector.page_model(page), areas)
+    batch_time = time.perf_counter() - start
+
+    return {
+        "chars": len(page.chars),
+        "queries": queries,
+        "numpy": module.HAS_NUMPY,
+        "loop_s": loop_time,
+        "batch_s": batch_time,
+        "speedup": loop_time / batch_time if batch_time > 0 else float('inf'),
+        "identical": [x.hex() for x in expected] == [float(x).hex() for x in actual],
+    }
+
+
+def bench_table_finder(module, tables: int, mentions: int) -> Dict[str, Any]:
+    """Table finder invocations for one page with repeated "Table N" mentions"""
+    page = make_table_page(tables)
+    page_text = "\n".join(f"See Table {i % tables + 1}: results." for i in range(mentions))
+    detector = module.PreciseVisualDetector()
+
+    # Resolve every reference to the top of the page so each one reaches table matching
+    detector._find_text_position = lambda model, text: (40.0, 30.0, 120.0, 40.0)
+
+    start = time.perf_counter()
+    elements = detector.detect_elements(page, page_text)
+    elapsed = time.perf_counter() - start
+
+    references = sum(len(ref['mentions']) for ref in detector._find_text_references(page_text))
+    return {
+        "tables": tables,
+        "references": references,
+        "legacy_finder_calls": references * (1 + tables),
+        "finder_calls": page.table_finder_calls,
+        "elements": len(elements),
+        "detect_s": elapsed,
+        "identical": page.table_finder_calls == 1,
+    }
+
+
+LEGACY_REFERENCE_PATTERNS = [
+    ('table', r'(?i)\btable\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?'),
+    ('table', r'(?i)\btab\.\s*(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?'),
+    ('figure', r'(?i)\bfigure\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?'),
+    ('figure', r'(?i)\bfig\.\s*(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?'),
+    ('chart', r'(?i)\bchart\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?'),
+    ('chart', r'(?i)\bdiagram\s+(\d+(?:\.\d+)?)(?:\s*[:\-\.]\s*([^\n\r]{1,100}))?'),
+]
+
+
+def reference_find_references(page_text: str) -> List[Dict[str, Any]]:
+    """Six separate scans, one per pattern (pre-alternation behaviour)"""
+    references = []
+    for element_type, pattern in LEGACY_REFERENCE_PATTERNS:
+        for match in re.finditer(pattern, page_text):
+            number_str = match.group(1)
+            title = match.group(2) if match.lastindex > 1 and match.group(2) else f"{element_type.title()} {number_str}"
+            references.append({'element_type': element_type, 'number': int(float(number_str)),
+                               'title': title.strip(), 'text_match': match.group(0)})
+    return references
+
+
+def make_reference_text(lines: int, seed: int = 19) -> str:
+    """Long page text with prose, captions and cross-references"""
+    rng = random.Random(seed)
+    words = ["the", "results", "in", "of", "sample", "shown", "data", "analysis", "tablet", "figurehead"]
+    kinds = ["Table", "table", "Tab.", "Figure", "fig.", "Fig.", "Chart", "Diagram"]
+    out = []
+    for _ in range(lines):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(6, 14)))
+        for _ in range(rng.randint(0, 3)):
+            ref = f"{rng.choice(kinds)} {rng.randint(1, 12)}{rng.choice(['', '.1', '.25'])}"
+            sep = rng.choice(["", ": ", " - ", ". ", " "])
+            line += f" {ref}{sep}" + " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+        out.append(line)
+    return "\n".join(out)
+
+
+def bench_reference_finder(module, lines: int, repeat: int = 20) -> Dict[str, Any]:
+    """Reference finding: six regex scans vs. one compiled alternation"""
+    page_text = make_reference_text(lines)
+    detector = module.PreciseVisualDetector()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = reference_find_references(page_text)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        actual = detector._find_text_references(page_text)
+    single_time = time.perf_counter() - start
+
+    def element_key(ref):
+        """(keyword with abbreviations spelled out, number as written), from the mention itself"""
+        match = module.REFERENCE_PATTERN.match(ref['text_match'])
+        keyword = match.group("keyword").rstrip().lower()
+        return module.REFERENCE_ABBREVIATIONS.get(keyword, keyword), match.group("number")
+
+    key = lambda ref: element_key(ref) + (ref['title'], ref['text_match'])
+    mentions = [mention for ref in actual for mention in ref['mentions']]
+
+    # Every spelling of one element merges into a single reference, first mention first; numbers
+    # are compared as written and charts and diagrams stay apart
+    mixed = detector._find_text_references("As Fig. 3 shows, and see fig.3 again.\nFigure 3: Pigment chart\n"
+                                           "Table 2 lists tab. 2 values\nTable 2: Binders\nChart 2 and Diagram 2\n"
+                                           "Figure 3.1: Pigment map\nFigure 3.2: Binder map\nsee Fig. 3.1 again")
+    mixed_merged = [(element_key(ref), ref['title'], [mention['text_match'] for mention in ref['mentions']])
+                    for ref in mixed] == [
+        (('table', '2'), "Table 2", ["Table 2", "Table 2: Binders", "tab. 2"]),
+        (('figure', '3'), "Pigment chart", ["Figure 3: Pigment chart", "Fig. 3", "fig.3"]),
+        (('figure', '3.1'), "Pigment map", ["Figure 3.1: Pigment map", "Fig. 3.1"]),
+        (('figure', '3.2'), "Binder map", ["Figure 3.2: Binder map"]),
+        (('chart', '2'), "Chart 2", ["Chart 2"]),
+        (('diagram', '2'), "Chart 2", ["Diagram 2"]),
+    ]
+    return {
+        "chars": len(page_text),
+        "legacy_references": len(expected),
+        "references": len(actual),
+        "mentions": len(mentions),
+        "legacy_s": legacy_time / repeat,
+        "single_pass_s": single_time / repeat,
+        "speedup": legacy_time / single_time if single_time > 0 else float('inf'),
+        # Same mentions as the six scans, and exactly one reference per (keyword, number)
+        "identical": (set(map(key, expected)) == set(map(key, mentions))
+                      and [element_key(ref) for ref in actual] == list(dict.fromkeys(map(element_key, expected)))
+                      and mixed_merged),
+    }
+
+
+def bench_spatial_index(module, curves: int, queries: int) -> Dict[str, Any]:
+    """Area queries: linear scan vs. per-page spatial index"""
+    page = make_curve_dense_page(curves)
+    areas = random_areas(queries)
+    detector = module.PreciseVisualDetector()
+
+    start = time.perf_counter()
+    expected = [reference_count(page, area) for area in areas]
+    linear_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = detector.page_model(page)
+    actual = [detector._count_visual_elements_in_area(model, area) for area in areas]
+    indexed_time = time.perf_counter() - start
+
+    return {
+        "primitives": len(page.images) + len(page.rects) + len(page.curves),
+        "queries": queries,
+        "linear_s": linear_time,
+        "indexed_s": indexed_time,
+        "speedup": linear_time / indexed_time if indexed_time > 0 else float('inf'),
+        "identical": expected == actual,
+    }
+
+
+@dataclass
+class ReferenceVisualElement:
+    """Dict-backed VisualElement with its own bbox tuple (pre-slots behaviour)"""
+    element_type: str
+    bbox: Tuple[float, float, float, float]
+    confidence: float
+    attributes: Dict[str, Any]
+
+
+def reference_visual_elements(page) -> List[ReferenceVisualElement]:
+    """One element per primitive, built straight from the raw objects"""
+    elements = []
+    for element_type, attr, confidence in (("image", "images", 1.0), ("rect", "rects", 0.8), ("curve", "curves", 0.7)):
+        for obj in getattr(page, attr):
+            elements.append(ReferenceVisualElement(element_type, (obj['x0'], obj['top'], obj['x1'], obj['bottom']),
+                                                   confidence, obj))
+    return elements
+
+
+def traced_bytes(build) -> Tuple[Any, int]:
+    """Result of build() and the bytes it left allocated, per tracemalloc"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bench_visual_elements(module, curves: int, references: int = 5) -> Dict[str, Any]:
+    """VisualElements for every primitive, once per reference: allocations of dict-backed vs. slotted records,
+    and of slotted records built once per page and shared by the references"""
+    page = make_curve_dense_page(curves)
+    index = module.PageSpatialIndex(page)
+    model = module.PageVisualModel(page)
+    model.index  # Built outside the traced region, like index above
+
+    legacy, legacy_bytes = traced_bytes(lambda: [reference_visual_elements(page) for _ in range(references)])
+    compact, compact_bytes = traced_bytes(lambda: [index.visual_elements() for _ in range(references)])
+    shared, shared_bytes = traced_bytes(lambda: [model.visual_elements() for _ in range(references)])
+
+    identical = all(
+        (a.element_type, a.bbox, a.confidence) == (b.element_type, b.bbox, b.confidence) and a.attributes is b.attributes
+        for legacy_run, compact_run in zip(legacy, compact) for a, b in zip(legacy_run, compact_run)
+    ) and [len(run) for run in legacy] == [len(run) for run in compact] and shared[0] == compact[0]
+
+    return {
+        "elements": sum(len(run) for run in compact),
+        "legacy_bytes": legacy_bytes,
+        "compact_bytes": compact_bytes,
+        "shared_bytes": shared_bytes,
+        "reduction": legacy_bytes / compact_bytes if compact_bytes > 0 else float('inf'),
+        "identical": identical,
+    }
+
+
+def make_figure_page(figures: int, curves: int = 600, seed: int = 41) -> Tuple[SyntheticPage, List[Tuple]]:
+    """Blobs of curves laid out on a grid, each with a caption box below; return the page and (blob, caption) boxes"""
+    rng = random.Random(seed)
+    page = SyntheticPage(width=1224, height=1584)  # Room for figures above MIN_WIDTH x MIN_HEIGHT
+    cols = 3
+    rows = (figures + cols - 1) // cols
+    cell_w, cell_h = (page.width - 72) / cols, (page.height - 72) / rows
+    figure_boxes = []
+    for fig in range(figures):
+        left = 36 + (fig % cols) * cell_w + 20
+        top = 36 + (fig // cols) * cell_h + 10
+        width, height = cell_w - 40, cell_h - 40
+        blob = []
+        for _ in range(curves):
+            x0, y0 = rng.uniform(left, left + width - 8), rng.uniform(top, top + height - 8)
+            blob.append({"x0": x0, "top": y0, "x1": x0 + rng.uniform(2, 8), "bottom": y0 + rng.uniform(2, 8)})
+        page.curves.extend(blob)
+        bbox = (min(c["x0"] for c in blob), min(c["top"] for c in blob),
+                max(c["x1"] for c in blob), max(c["bottom"] for c in blob))
+        caption = (bbox[0], bbox[3] + 6, bbox[0] + 60, bbox[3] + 16)
+        figure_boxes.append((bbox, caption))
+    return page, figure_boxes
+
+
+def reference_visual_cluster(visual_elements, text_bbox, radius: float, min_elements: int):
+    """Elements whose centers lie within radius of the text center (pre-clustering behaviour)"""
+    center_x = (text_bbox[0] + text_bbox[2]) / 2
+    center_y = (text_bbox[1] + text_bbox[3]) / 2
+    nearby = [ve for ve in visual_elements
+              if math.sqrt(((ve.bbox[0] + ve.bbox[2]) / 2 - center_x) ** 2
+                           + ((ve.bbox[1] + ve.bbox[3]) / 2 - center_y) ** 2) <= radius]
+    if len(nearby) < min_elements:
+        return None
+    return (min(ve.bbox[0] for ve in nearby), min(ve.bbox[1] for ve in nearby),
+            max(ve.bbox[2] for ve in nearby), max(ve.bbox[3] for ve in nearby))
+
+
+def bench_figure_clusters(module, figures: int, mentions: int) -> Dict[str, Any]:
+    """Figure regions for many "Figure N" mentions: radius scan per reference vs. one clustering pass per page"""
+    page, figure_boxes = make_figure_page(figures)
+    captions = [figure_boxes[i % len(figure_boxes)][1] for i in range(mentions)]
+    expected = [figure_boxes[i % len(figure_boxes)][0] for i in range(mentions)]
+
+    detector = module.PreciseVisualDetector()
+    model = detector.page_model(page)
+    model.index  # Shared by both paths; built outside the timed regions
+
+    radius = module.CLUSTER_SEARCH_RADIUS
+    start = time.perf_counter()
+    legacy = []
+    for caption in captions:
+        center_x, center_y = (caption[0] + caption[2]) / 2, (caption[1] + caption[3]) / 2
+        area = (center_x - radius, center_y - radius, center_x + radius, center_y + radius)
+        legacy.append(reference_visual_cluster(model.visual_elements(model.index.query(area)), caption,
+                                               radius, module.MIN_VISUAL_ELEMENTS))
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.clusters
+    cluster_time = time.perf_counter() - start
+    clustered = [detector._find_visual_cluster_near_text(model, caption) for caption in captions]
+    clustered_time = time.perf_counter() - start
+
+    found = [(bbox.x0, bbox.y0, bbox.x1, bbox.y1) if bbox else None for bbox in clustered]
+    return {
+        "primitives": len(page.curves),
+        "figures": figures,
+        "references": mentions,
+        "clusters": len(model.clusters),
+        "legacy_s": legacy_time,
+        "cluster_s": cluster_time,
+        "clustered_s": clustered_time,
+        "speedup": legacy_time / clustered_time if clustered_time > 0 else float('inf'),
+        "legacy_correct": sum(a == b for a, b in zip(legacy, expected)),
+        "clustered_correct": sum(a == b for a, b in zip(found, expected)),
+        "identical": found == expected,
+    }
+
+
+def reference_text_position(page, text: str) -> Optional[Tuple[float, float, float, float]]:
+    """Per-call string concatenation over every char (pre-index behaviour)"""
+    chars = getattr(page, 'chars', [])
+    text_words = text.lower().split()
+    if not chars or not text_words:
+        return None
+    page_text = ""
+    char_positions = []
+    for char in chars:
+        char_text = char.get('text', '').strip()
+        if char_text:
+            page_text += char_text.lower() + " "
+            char_positions.append(char)
+    match_pos = page_text.find(' '.join(text_words))
+    if match_pos >= 0:
+        word_count = len(page_text[:match_pos].split())
+        if word_count < len(char_positions):
+            start_char = char_positions[word_count]
+            end_char = char_positions[min(word_count + len(text_words), len(char_positions) - 1)]
+            return (start_char['x0'], start_char['top'], end_char['x1'], end_char['bottom'])
+    return None
+
+
+def make_prose_page(lines: int, references: int, seed: int = 23) -> Tuple[SyntheticPage, List[Tuple[str, Tuple]]]:
+    """Lay out reference-bearing prose as chars; return the page and (mention, true bbox) pairs"""
+    rng = random.Random(seed)
+    page = SyntheticPage()
+    text = make_reference_text(lines, seed)
+    boxes = []
+    for line_no, line in enumerate(text.split("\n")):
+        top = 36 + (line_no % 60) * 12
+        for col, ch in enumerate(line):
+            x0 = 36 + col * 5.0
+            box = (x0, top, x0 + 4.5, top + 10.0)
+            boxes.append(box)
+            if not ch.isspace():
+                page.chars.append({"text": ch, "x0": box[0], "top": box[1], "x1": box[2], "bottom": box[3]})
+        boxes.append(None)  # line break
+
+    # Only mentions whose whitespace-free text first occurs at that mention
+    # have a single true box
+    squeezed = ''.join(text.split()).lower()
+    candidates = []
+    for match in re.finditer(r"(?:Table|Figure|Chart|Diagram) \d+(?:\.\d+)?:[^\n]{0,30}", text):
+        offset = len(''.join(text[:match.start()].split()))
+        if squeezed.find(''.join(match.group(0).split()).lower()) == offset:
+            candidates.append(match)
+
+    lookups = []
+    for match in rng.sample(candidates, min(references, len(candidates))):
+        span = [b for b, ch in zip(boxes[match.start():match.end()], match.group(0)) if b and not ch.isspace()]
+        lookups.append((match.group(0), (min(b[0] for b in span), min(b[1] for b in span),
+                                         max(b[2] for b in span), max(b[3] for b in span))))
+    return page, lookups
+
+
+def bench_text_position(module, lines: int, references: int) -> Dict[str, Any]:
+    """Text positions: per-call concatenation vs. per-page char-offset index"""
+    page, lookups = make_prose_page(lines, references)
+
+    start = time.perf_counter()
+    legacy = [reference_text_position(page, text) for text, _ in lookups]
+    legacy_time = time.perf_counter() - start
+
+    detector = module.PreciseVisualDetector()
+    start = time.perf_counter()
+    model = detector.page_model(page)
+    indexed = [detector._find_text_position(model, text) for text, _ in lookups]
+    indexed_time = time.perf_counter() - start
+
+    expected = [bbox for _, bbox in lookups]
+    return {
+        "chars": len(page.chars),
+        "references": len(lookups),
+        "legacy_s": legacy_time,
+        "indexed_s": indexed_time,
+        "speedup": legacy_time / indexed_time if indexed_time > 0 else float('inf'),
+        "legacy_correct": sum(a == b for a, b in zip(legacy, expected)),
+        "indexed_correct": sum(a == b for a, b in zip(indexed, expected)),
+        "identical": indexed == expected,
+    }
+
+
+def make_drawing_pdf(pages: int, seed: int = 29):
+    """In-memory PyMuPDF document with dense vector drawings on every page"""
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        for _ in range(400):
+            x, y = rng.uniform(40, 520), rng.uniform(40, 700)
+            page.draw_rect(fitz.Rect(x, y, x + rng.uniform(5, 60), y + rng.uniform(5, 60)),
+                           color=(rng.random(), rng.random(), rng.random()), fill=(rng.random(), 0.5, 0.5))
+        page.insert_text((72, 760), "Figure 1: synthetic drawing", fontsize=11)
+    return doc
+
+
+def bench_png_writer(module, pages: int, threads: int) -> Dict[str, Any]:
+    """Screenshot PNGs: inline Pixmap.save vs. the background encode/write stage"""
+    import fitz
+    import tempfile
+    doc = make_drawing_pdf(pages)
+    scale = fitz.Matrix(module.HIGH_QUALITY_SCALE, module.HIGH_QUALITY_SCALE)
+    clips = [fitz.Rect(36, 36, 576, 400), fitz.Rect(36, 400, 576, 756)]
+
+    with tempfile.TemporaryDirectory() as inline_dir, tempfile.TemporaryDirectory() as staged_dir:
+        start = time.perf_counter()
+        for page in doc:
+            for i, clip in enumerate(clips):
+                page.get_pixmap(matrix=scale, clip=clip).save(os.path.join(inline_dir, f"{page.number}_{i}.png"))
+        inline_time = time.perf_counter() - start
+
+        writer = module.ScreenshotWriter(threads)
+        start = time.perf_counter()
+        for page in doc:
+            for i, clip in enumerate(clips):
+                writer.submit(page.get_pixmap(matrix=scale, clip=clip), os.path.join(staged_dir, f"{page.number}_{i}.png"))
+        writer.close()
+        staged_time = time.perf_counter() - start
+
+        names = sorted(os.listdir(inline_dir))
+        identical = names == sorted(os.listdir(staged_dir)) and all(
+            open(os.path.join(inline_dir, name), 'rb').read() == open(os.path.join(staged_dir, name), 'rb').read()
+            for name in names)
+
+    return {
+        "images": len(names),
+        "threads": threads,
+        "inline_s": inline_time,
+        "staged_s": staged_time,
+        "speedup": inline_time / staged_time if staged_time > 0 else float('inf'),
+        "identical": identical,
+    }
+
+
+def bench_image_codecs(module, pages: int) -> Dict[str, Any]:
+    """Bytes and encode time of each screenshot codec on the same rendered crops"""
+    import fitz
+    import tempfile
+    doc = make_drawing_pdf(pages)
+    scale = fitz.Matrix(module.HIGH_QUALITY_SCALE, module.HIGH_QUALITY_SCALE)
+    pixmaps = [page.get_pixmap(matrix=scale, clip=fitz.Rect(36, 36, 576, 400)) for page in doc]
+
+    codecs = {}
+    identical = True
+    with tempfile.TemporaryDirectory() as out_dir:
+        for image_format in module.ScreenshotWriter.FORMATS:
+            if not module.ScreenshotWriter.available(image_format):
+                continue
+            writer = module.ScreenshotWriter(threads=0)
+            sizes = encode_seconds = 0
+            for i, pix in enumerate(pixmaps):
+                path = os.path.join(out_dir, f"{i}{module.ScreenshotWriter.EXTENSIONS[image_format]}")
+                _, size, seconds = writer.submit(pix, path, image_format).result()
+                sizes += size
+                encode_seconds += seconds
+                if image_format == "png":
+                    identical &= open(path, 'rb').read() == pix.tobytes("png")
+            codecs[image_format] = {"bytes": sizes, "encode_s": encode_seconds}
+
+    return {"images": len(pixmaps), "codecs": codecs, "identical": identical}
+
+
+def bench_render_scale(module, pages: int) -> Dict[str, Any]:
+    """Full-page vector crops: fixed HIGH_QUALITY_SCALE vs. the adaptive scale policy"""
+    import fitz
+    doc = make_drawing_pdf(pages)
+    bbox = module.BoundingBox(x0=36, y0=36, x1=576, y1=756, confidence=1.0, visual_elements_count=400,
+                              text_density=0.0, has_visual_content=True)
+    element = module.DocumentElement(element_type=module.ElementType.FIGURE, number=1, title="Figure 1",
+                                     bbox=bbox, page_number=1, text_references=[],
+                                     detection_method="benchmark", visual_elements=[], quality_metrics={})
+    clip = fitz.Rect(bbox.x0, bbox.y0, bbox.x1, bbox.y1)
+    writer = module.ScreenshotWriter(threads=0)
+
+    runs = {}
+    for adaptive in (False, True):
+        processor = module.PreciseScreenshotProcessorV3(adaptive_scale=adaptive, encoder_threads=0)
+        scale = processor._choose_render_scale(element)
+        pixels = size = 0
+        start = time.perf_counter()
+        for page in doc:
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip)
+            pixels += pix.width * pix.height
+            size += len(writer.encode_png(pix.samples, pix.width, pix.height, pix.n, pix.stride, pix.xres, pix.yres))
+        runs["adaptive" if adaptive else "fixed"] = {"scale": scale, "pixels": pixels, "bytes": size,
+                                                     "seconds": time.perf_counter() - start}
+
+    return {
+        "crops": len(doc),
+        **runs,
+        "identical": runs["adaptive"]["pixels"] <= runs["fixed"]["pixels"],
+    }
+
+
+def make_scanned_pdf(pages: int, seed: int = 31):
+    """In-memory PyMuPDF document where every page is one full-page JPEG scan"""
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        scan = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 1650, 2130), False)
+        scan.clear_with(235)
+        for _ in range(300):
+            x, y = rng.randrange(100, 1500), rng.randrange(100, 2000)
+            scan.set_rect(fitz.IRect(x, y, x + rng.randrange(10, 120), y + rng.randrange(4, 40)),
+                          (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(page.rect, stream=scan.tobytes("jpeg", jpg_quality=85))
+    return doc
+
+
+def bench_embedded_images(module, pages: int) -> Dict[str, Any]:
+    """Scanned pages to JPEG: adaptive rasterization vs. the embedded image stream"""
+    import fitz
+    doc = make_scanned_pdf(pages)
+    processor = module.PreciseScreenshotProcessorV3(encoder_threads=0)
+    fixed_scale = module.PreciseScreenshotProcessorV3(encoder_threads=0, adaptive_scale=False)
+    writer = module.ScreenshotWriter(threads=0)
+
+    runs = {}
+    fixed_passthrough = 0
+    for method in ("rendered", "embedded"):
+        size = passthrough = 0
+        start = time.perf_counter()
+        for page in doc:
+            rect = page.rect
+            bbox = module.BoundingBox(x0=rect.x0, y0=rect.y0, x1=rect.x1, y1=rect.y1, confidence=1.0,
+                                      visual_elements_count=1, text_density=0.0, has_visual_content=True,
+                                      raster_image=True)
+            element = module.DocumentElement(element_type=module.ElementType.FIGURE, number=1, title="Figure 1",
+                                             bbox=bbox, page_number=page.number + 1, text_references=[],
+                                             detection_method="benchmark", visual_elements=[], quality_metrics={})
+            placements = module.PageImagePlacements(page)
+            embedded = processor._embedded_image_source(placements, element, "jpeg") if method == "embedded" else None
+            if method == "embedded":
+                # The passthrough does not depend on the scale mode
+                fixed = fixed_scale._embedded_image_source(placements, element, "jpeg")
+                fixed_passthrough += bool(fixed and isinstance(fixed[0], bytes))
+            if embedded and isinstance(embedded[0], bytes):
+                data = embedded[0]
+                passthrough += 1
+            else:
+                scale = processor._choose_render_scale(element)
+                pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=rect)
+                data = writer._encode_pil(*writer._prepare(pix, "jpeg"))
+            size += len(data)
+        runs[method] = {"bytes": size, "seconds": time.perf_counter() - start}
+
+    return {
+        "pages": len(doc),
+        "passthrough": passthrough,
+        "fixed_scale_passthrough": fixed_passthrough,
+        **runs,
+        "speedup": runs["rendered"]["seconds"] / runs["embedded"]["seconds"],
+        "identical": passthrough == fixed_passthrough == len(doc),
+    }
+
+
+def make_report_pdf(path: str, pages: int, seed: int = 37):
+    """Write a report-like PDF: a referenced vector figure, a ruled table and a photo per page"""
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    photo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 300), False)
+    photo.clear_with(200)
+    for page_num in range(pages):
+        page = doc.new_page(width=612, height=792)
+        for _ in range(400):
+            x, y = rng.uniform(100, 340), rng.uniform(95, 215)
+            page.draw_bezier((x, y), (x + 5, y + 10), (x + 10, y - 5), (x + 15, y + 3))
+        page.insert_text((150, 80), f"Figure {page_num + 1}: synthetic measurements", fontsize=11)
+        page.insert_text((72, 300), f"Table {page_num + 1}: synthetic ledger", fontsize=11)
+        for row in range(7):
+            page.draw_rect(fitz.Rect(72, 320 + row * 25, 540, 320.6 + row * 25), color=None, fill=(0, 0, 0))
+        for col in range(5):
+            page.draw_rect(fitz.Rect(72 + col * 117, 320, 72.6 + col * 117, 470), color=None, fill=(0, 0, 0))
+        for row in range(6):
+            for col in range(4):
+                page.insert_text((78 + col * 117, 338 + row * 25), f"r{row}c{col} {rng.randint(0, 999)}", fontsize=9)
+        page.insert_image(fitz.Rect(72, 500, 372, 725), pixmap=photo)
+        page.insert_text((72, 760), "Body text " * 8, fontsize=10)
+    doc.save(path)
+
+
+def make_paper_pdf(path: str, pages: int, mentions: int, seed: int = 43):
+    """Write a paper-like PDF: a captioned vector figure per page, cited from the prose in varied wordings"""
+    import fitz
+    rng = random.Random(seed)
+    wordings = ["see Fig. {n}", "as Figure {n} - {w} shows", "in Figure {n}. The {w} panel", "Fig. {n}: {w} detail",
+                "cf. Figure {n}: {w} trend"]
+    words = ["left", "right", "upper", "lower", "inset", "shaded", "dashed", "solid"]
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=612, height=792)
+        for _ in range(400):
+            x, y = rng.uniform(100, 340), rng.uniform(95, 215)
+            page.draw_bezier((x, y), (x + 5, y + 10), (x + 10, y - 5), (x + 15, y + 3))
+        page.insert_text((150, 240), f"Figure {page_num + 1}: synthetic measurements", fontsize=11)
+        for line in range(mentions):
+            mention = rng.choice(wordings).format(n=page_num + 1, w=f"{rng.choice(words)} {line}")
+            page.insert_text((72, 300 + line * 14), f"The results {mention} for this sample", fontsize=10)
+    doc.save(path)
+
+
+def make_book_pdf(path: str, pages: int, figure_every: int = 20, seed: int = 47):
+    """Write a prose-heavy book: text-only pages citing tables and figures, with a drawn figure every few pages"""
+    import fitz
+    rng = random.Random(seed)
+    words = ["the", "pigment", "binder", "layer", "results", "sample", "shown", "drying", "surface", "analysis"]
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=612, height=792)
+        for line in range(48):
+            text = " ".join(rng.choice(words) for _ in range(9))
+            if line % 12 == 5:
+                text += f" (see Table {rng.randint(1, 9)} and Figure {rng.randint(1, 9)})"
+            page.insert_text((72, 72 + line * 14), text, fontsize=10)
+        if page_num % figure_every == 0:
+            for _ in range(300):
+                x, y = rng.uniform(100, 340), rng.uniform(420, 560)
+                page.draw_bezier((x, y), (x + 5, y + 10), (x + 10, y - 5), (x + 15, y + 3))
+            page.insert_text((150, 590), f"Figure {page_num // figure_every + 1}: drying curves", fontsize=11)
+    doc.save(path)
+
+
+def make_catalogue_pdf(path: str, pages: int, seed: int = 53, dpi: int = 150):
+    """Write a scanned catalogue: per page one JPEG scan of a photo, text and a ruled table, with OCR captions
+
+    Returns the true (kind, bbox) of each page's photo and table.
+    """
+    import io
+    import fitz
+    from PIL import Image, ImageDraw, ImageFilter
+    rng = random.Random(seed)
+    scale = dpi / 72
+    px = lambda box: tuple(round(v * scale) for v in box)
+    truth = []
+    doc = fitz.open()
+    for page_num in range(pages):
+        scan = Image.new("L", px((612, 792)), 240)
+        draw = ImageDraw.Draw(scan)
+
+        def text_block(x0, y0, x1, y1):
+            for y in range(y0, y1 - 7, 12):
+                x = x0
+                while x < x1 - 20:
+                    w = rng.uniform(10, 40)
+                    draw.rectangle(px((x, y + 2, min(x + w, x1), y + 7)), fill=rng.randint(20, 60))
+                    x += w + 4
+
+        photo = (72, 100, 72 + rng.uniform(260, 300), 100 + rng.uniform(180, 220))
+        noise = Image.effect_noise((64, 48), 60).resize(px((photo[2] - photo[0], photo[3] - photo[1])))
+        scan.paste(noise.point(lambda v: int(v * 0.6)), px(photo)[:2])
+        text_block(round(photo[2]) + 20, 100, 540, 300)
+        text_block(72, 40, 540, 80)
+
+        table = (72, 370, 540, 370 + rng.choice([120, 150, 180]))
+        rows, cols = rng.randint(4, 7), rng.randint(3, 5)
+        for r in range(rows + 1):
+            y = table[1] + r * (table[3] - table[1]) / rows
+            draw.line(px((table[0], y, table[2], y)), fill=0, width=2)
+        for c in range(cols + 1):
+            x = table[0] + c * (table[2] - table[0]) / cols
+            draw.line(px((x, table[1], x, table[3])), fill=0, width=2)
+        for r in range(rows):
+            for c in range(cols):
+                x = table[0] + c * (table[2] - table[0]) / cols + 6
+                y = table[1] + r * (table[3] - table[1]) / rows + 4
+                draw.rectangle(px((x, y + 2, x + rng.uniform(20, 60), y + 7)), fill=40)
+        text_block(72, table[3] + 30, 540, 740)
+
+        buffer = io.BytesIO()
+        scan.filter(ImageFilter.GaussianBlur(0.8)).save(buffer, "JPEG", quality=80)
+        page = doc.new_page(width=612, height=792)
+        page.insert_image(page.rect, stream=buffer.getvalue())
+        # Invisible text layer, as OCR leaves it
+        page.insert_text((72, photo[3] + 14), f"Figure {page_num + 1}: product photograph", fontsize=10, render_mode=3)
+        page.insert_text((72, table[1] - 8), f"Table {page_num + 1}: price list", fontsize=10, render_mode=3)
+        truth.append([("figure", photo), ("table", table)])
+    doc.save(path)
+    return truth
+
+
+def run_processor(module, pdf_path: str, output_dir: str, **kwargs) -> Tuple[float, Dict[str, Any], List[str]]:
+    """Process pdf_path serially; return elapsed seconds, the stats and the screenshot filenames"""
+    processor = module.PreciseScreenshotProcessorV3(encoder_threads=0, **kwargs)
+    start = time.perf_counter()
+    processor.process_pdf(pdf_path, output_dir)
+    elapsed = time.perf_counter() - start
+    images_dir = os.path.join(output_dir, Path(pdf_path).stem, "images")
+    return elapsed, processor.stats, sorted(os.listdir(images_dir)) if os.path.isdir(images_dir) else []
+
+
+def bench_cross_references(module, pages: int, mentions: int) -> Dict[str, Any]:
+    """Cross-reference-heavy pages end to end: one detection and screenshot per mention vs. per element"""
+    import tempfile
+    detector_class = module.PreciseVisualDetector
+    find_references = detector_class._find_text_references
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "paper.pdf")
+        make_paper_pdf(pdf_path, pages, mentions)
+
+        # One reference per mention, as before mentions were merged by element
+        detector_class._find_text_references = lambda self, page_text: [
+            dict(mention, mentions=[mention]) for ref in find_references(self, page_text) for mention in ref['mentions']]
+        try:
+            legacy_s, legacy_stats, legacy_files = run_processor(module, pdf_path, os.path.join(tmp, "legacy"))
+        finally:
+            detector_class._find_text_references = find_references
+        grouped_s, grouped_stats, grouped_files = run_processor(module, pdf_path, os.path.join(tmp, "grouped"))
+
+    return {
+        "pages": pages,
+        "mentions": mentions,
+        "legacy_s": legacy_s,
+        "legacy_screenshots": legacy_stats["screenshots_created"],
+        "grouped_s": grouped_s,
+        "grouped_screenshots": grouped_stats["screenshots_created"],
+        "speedup": legacy_s / grouped_s if grouped_s > 0 else float('inf'),
+        # One screenshot per figure, each one the per-mention run also wrote
+        "identical": len(grouped_files) == pages and set(grouped_files) <= set(legacy_files),
+    }
+
+
+def bench_triage(module, pages: int) -> Dict[str, Any]:
+    """Prose-heavy book end to end: detection on every page vs. --triage (text-only pages take PyMuPDF text)"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "book.pdf")
+        make_book_pdf(pdf_path, pages)
+
+        runs = {}
+        for name, settings in (("full", {}), ("triaged", {"triage": True})):
+            output_dir = os.path.join(tmp, name)
+            elapsed, stats, files = run_processor(module, pdf_path, output_dir, **settings)
+            with open(os.path.join(output_dir, "book", "document.md"), encoding="utf-8") as f:
+                markdown = f.read()
+            runs[name] = {"seconds": elapsed, "stats": stats, "files": files, "markdown": markdown}
+
+    full, triaged = runs["full"], runs["triaged"]
+    triage_stats = triaged["stats"]["triage"]
+    return {
+        "pages": pages,
+        "full_s": full["seconds"],
+        "triaged_s": triaged["seconds"],
+        "pages_skipped": triage_stats["pages_skipped"],
+        "scan_s": triage_stats["scan_seconds"],
+        "skipped_text_s": triage_stats["text_seconds"],
+        "full_detect_s": full["stats"]["triage"]["parse_seconds"] + full["stats"]["triage"]["detect_seconds"],
+        "triaged_detect_s": triage_stats["parse_seconds"] + triage_stats["detect_seconds"],
+        "speedup": full["seconds"] / triaged["seconds"] if triaged["seconds"] > 0 else float('inf'),
+        # Skipped pages' text comes from PyMuPDF: same words, not necessarily the same line breaks
+        "identical": full["markdown"].split() == triaged["markdown"].split() and full["files"] == triaged["files"],
+    }
+
+
+def bench_raster_regions(module, pages: int) -> Dict[str, Any]:
+    """Scanned catalogue end to end: vector detection only vs. OpenCV raster regions on scanned pages"""
+    import tempfile
+    if not module.RasterRegionDetector.available():
+        return {"pages": pages, "available": False, "identical": True}
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "catalogue.pdf")
+        truth = make_catalogue_pdf(pdf_path, pages)
+
+        runs = {}
+        for raster in (False, True):
+            output_dir = os.path.join(tmp, f"raster_{raster}")
+            elapsed, stats, files = run_processor(module, pdf_path, output_dir, raster=raster)
+            with open(os.path.join(output_dir, "catalogue", "processing_metadata_v3.json"), encoding="utf-8") as f:
+                elements = json.load(f)["detected_elements"]
+            runs[raster] = {"seconds": elapsed, "stats": stats, "elements": elements}
+
+        # Thumbnail analysis alone, inline and on the thread pool
+        import fitz
+        doc = fitz.open(pdf_path)
+        analysis = {}
+        for threads in (0, module.RASTER_THREADS):
+            detector = module.RasterRegionDetector(threads=threads)
+            start = time.perf_counter()
+            found = [detector.regions(doc, page_num, iter(range(page_num + 1, len(doc))))
+                     for page_num in range(len(doc))]
+            analysis[threads] = time.perf_counter() - start
+            detector.close()
+        doc.close()
+
+    matched = 0
+    for page_truth, page_regions in zip(truth, found):
+        for kind, box in page_truth:
+            matched += any(region.element_type.value == kind
+                           and max(abs(a - b) for a, b in zip(region.bbox, box)) <= RASTER_BBOX_TOLERANCE
+                           for region in page_regions)
+
+    vector, raster = runs[False], runs[True]
+    return {
+        "pages": pages,
+        "available": True,
+        "vector_s": vector["seconds"],
+        "vector_elements": len(vector["elements"]),
+        "raster_s": raster["seconds"],
+        "raster_elements": len(raster["elements"]),
+        "pages_raster": raster["stats"]["triage"]["pages_raster"],
+        "pages_per_s": pages / raster["seconds"] if raster["seconds"] > 0 else float('inf'),
+        "inline_s": analysis[0],
+        "threads": module.RASTER_THREADS,
+        "threaded_s": analysis[module.RASTER_THREADS],
+        "truth": 2 * pages,
+        "matched": matched,
+        "identical": matched == 2 * pages and len(raster["elements"]) == 2 * pages,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process in MB; VmHWM restarts at exec, unlike ru_maxrss in a spawned child"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import psutil
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def parse_with_backend(backend_name: str, pdf_path: str) -> Dict[str, Any]:
+    """Parse and detect every page with one backend; runs in a fresh process so peak RSS is its own"""
+    module = load_processor()
+    backend = module.PDF_BACKENDS[backend_name]()
+    detector = module.PreciseVisualDetector()
+    parse_s = detect_s = 0.0
+    elements = []
+
+    with backend.open(pdf_path) as (pages, _):
+        for page in pages:
+            start = time.perf_counter()
+            page_text = page.extract_text() or ""
+            for attr in ("chars", "images", "rects", "curves"):
+                getattr(page, attr)
+            parse_s += time.perf_counter() - start
+
+            start = time.perf_counter()
+            for element in detector.detect_elements(page, page_text):
+                bbox = element.bbox
+                elements.append(((element.page_number, element.element_type.value, element.number,
+                                  element.detection_method), (bbox.x0, bbox.y0, bbox.x1, bbox.y1)))
+            detect_s += time.perf_counter() - start
+            detector.release_page()
+
+    return {"parse_s": parse_s, "detect_s": detect_s, "elements": elements,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_backends(module, pages: int) -> Dict[str, Any]:
+    """Dual-parser (pdfplumber + PyMuPDF) vs. PyMuPDF-only backend: parse time, peak RSS, same elements"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        make_report_pdf(pdf_path, pages)
+
+        runs = {}
+        context = multiprocessing.get_context("spawn")
+        for name in module.PDF_BACKENDS:
+            with context.Pool(1) as pool:
+                runs[name] = pool.apply(parse_with_backend, (name, pdf_path))
+
+    reference, candidate = runs["pdfplumber"]["elements"], runs["pymupdf"]["elements"]
+    same_elements = [key for key, _ in reference] == [key for key, _ in candidate]
+    bbox_delta = max((abs(a - b) for (_, box_a), (_, box_b) in zip(reference, candidate)
+                      for a, b in zip(box_a, box_b)), default=0.0)
+
+    return {
+        "pages": pages,
+        **{name: {key: run[key] for key in ("parse_s", "detect_s", "peak_rss_mb")} for name, run in runs.items()},
+        "elements": len(reference),
+        "pymupdf_elements": len(candidate),
+        "bbox_delta": bbox_delta,
+        "speedup": runs["pdfplumber"]["parse_s"] / runs["pymupdf"]["parse_s"],
+        "identical": same_elements and bbox_delta <= BACKEND_BBOX_TOLERANCE,
+    }
+
+
+@dataclass
+class DocumentSpec:
+    """Shape of a synthetic PDF for the end-to-end suite; counts are per page"""
+    name: str
+    pages: int = 20
+    chars: int = 2500      # Prose characters
+    figures: int = 1       # Captioned vector figures
+    curves: int = 300      # Bezier curves per figure
+    tables: int = 1        # Captioned ruled tables
+    mentions: int = 2      # Prose mentions of each figure and table
+    seed: int = 59
+
+
+SUITE_SCENARIOS = [
+    DocumentSpec("prose", chars=5000, figures=0, tables=0, mentions=0),
+    DocumentSpec("figures", chars=1500, figures=2, curves=400, tables=0, mentions=3),
+    DocumentSpec("tables", chars=1500, figures=0, tables=2, mentions=2),
+    DocumentSpec("mixed"),
+]
+
+
+def parse_spec(text: str) -> DocumentSpec:
+    """DocumentSpec from "name:pages=50,chars=3000,figures=2,curves=400,tables=1,mentions=3" """
+    name, _, fields = text.partition(":")
+    spec = DocumentSpec(name)
+    for field in filter(None, fields.split(",")):
+        key, _, value = field.partition("=")
+        if key not in DocumentSpec.__dataclass_fields__ or key == "name":
+            raise argparse.ArgumentTypeError(f"unknown scenario field: {key}")
+        setattr(spec, key, int(value))
+    return spec
+
+
+def make_synthetic_pdf(path: str, spec: DocumentSpec) -> int:
+    """Write a PDF shaped by spec; returns the number of figures and tables it holds
+
+    Each page stacks its figures (a cluster of curves over a caption), then
+    its ruled tables (caption above), then prose lines until spec.chars
+    characters or the bottom margin. Prose lines cite each element on the
+    page spec.mentions times. Content that does not fit the page is dropped.
+    """
+    import fitz
+    rng = random.Random(spec.seed)
+    words = ["the", "pigment", "binder", "layer", "results", "sample", "shown", "drying", "surface", "analysis"]
+    doc = fitz.open()
+    numbers = {"Figure": 0, "Table": 0}
+    elements = 0
+    for _ in range(spec.pages):
+        page = doc.new_page(width=612, height=792)
+        y = 60.0
+        cited = []
+        for _ in range(spec.figures):
+            if y + 170 > 740:
+                break
+            for _ in range(spec.curves):
+                x, cy = rng.uniform(100, 360), rng.uniform(y + 5, y + 130)
+                page.draw_bezier((x, cy), (x + 5, cy + 10), (x + 10, cy - 5), (x + 15, cy + 3))
+            numbers["Figure"] += 1
+            page.insert_text((150, y + 155), f"Figure {numbers['Figure']}: synthetic measurements", fontsize=11)
+            cited.append(f"Figure {numbers['Figure']}")
+            y += 175
+        for _ in range(spec.tables):
+            rows, cols = rng.randint(6, 8), rng.randint(3, 5)  # At least MIN_HEIGHT tall
+            if y + 30 + rows * 22 > 740:
+                break
+            numbers["Table"] += 1
+            page.insert_text((72, y + 12), f"Table {numbers['Table']}: synthetic ledger", fontsize=11)
+            top, width = y + 24, 468 / cols
+            for row in range(rows + 1):
+                page.draw_rect(fitz.Rect(72, top + row * 22, 540, top + row * 22 + 0.6), color=None, fill=(0, 0, 0))
+            for col in range(cols + 1):
+                page.draw_rect(fitz.Rect(72 + col * width, top, 72.6 + col * width, top + rows * 22),
+                               color=None, fill=(0, 0, 0))
+            for row in range(rows):
+                for col in range(cols):
+                    page.insert_text((78 + col * width, top + 15 + row * 22), f"r{row}c{col} {rng.randint(0, 999)}",
+                                     fontsize=9)
+            cited.append(f"Table {numbers['Table']}")
+            y += 40 + rows * 22
+        elements += len(cited)
+
+        mentions = [label for label in cited for _ in range(spec.mentions)]
+        rng.shuffle(mentions)
+        chars = 0
+        y += 14
+        while y <= 750 and (chars < spec.chars or mentions):
+            text = " ".join(rng.choice(words) for _ in range(9))
+            if mentions:
+                text += f" (see {mentions.pop()})"
+            page.insert_text((72, y), text, fontsize=10)
+            chars += len(text)
+            y += 14
+    doc.save(path)
+    return elements
+
+
+def process_with_processor(pdf_path: str, output_dir: str) -> Dict[str, Any]:
+    """Run a profiling PreciseScreenshotProcessorV3 over pdf_path in a fresh process; wall time, stages, peak RSS"""
+    module = load_processor()
+    processor = module.PreciseScreenshotProcessorV3(profile=True)
+    start = time.perf_counter()
+    processor.process_pdf(pdf_path, output_dir)
+    seconds = time.perf_counter() - start
+    stats = processor.stats
+    triage = stats["triage"]
+    # Top-level stages of the page loop; encoding runs on the writer threads alongside them
+    stages = {name: stage["seconds"] for name, stage in stats["profile"]["stages"].items() if "." not in name}
+    stages["other"] = max(0.0, seconds - sum(value for name, value in stages.items() if name != "encode"))
+    return {"seconds": seconds, "stages": stages, "elements": stats["elements_detected"],
+            "screenshots": stats["screenshots_created"], "pages_skipped": triage["pages_skipped"],
+            "errors": len(stats["errors"]), "peak_rss_mb": peak_rss_mb()}
+
+
+def bench_suite_scenario(module, spec: DocumentSpec) -> Dict[str, Any]:
+    """One synthetic document through PreciseVisualDetector alone and the full processor, each in its own process"""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, f"{spec.name}.pdf")
+        start = time.perf_counter()
+        expected = make_synthetic_pdf(pdf_path, spec)
+        generate_s = time.perf_counter() - start
+
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            detector = pool.apply(parse_with_backend, (module.DEFAULT_PDF_BACKEND, pdf_path))
+        with context.Pool(1) as pool:
+            processor = pool.apply(process_with_processor, (pdf_path, os.path.join(tmp, "output")))
+
+    detector_s = detector["parse_s"] + detector["detect_s"]
+    return {
+        "spec": {key: getattr(spec, key) for key in DocumentSpec.__dataclass_fields__},
+        "generate_s": generate_s,
+        "expected_elements": expected,
+        "detector": {
+            "parse_s": detector["parse_s"],
+            "detect_s": detector["detect_s"],
+            "elements": len(detector["elements"]),
+            "pages_per_s": spec.pages / detector_s if detector_s > 0 else float('inf'),
+            "peak_rss_mb": detector["peak_rss_mb"],
+        },
+        "processor": {
+            **processor,
+            "pages_per_s": spec.pages / processor["seconds"] if processor["seconds"] > 0 else float('inf'),
+        },
+        # The processor must find what the bare detector finds, and error-free
+        "identical": processor["elements"] == len(detector["elements"]) and not processor["errors"],
+    }
+
+
+def bench_instrumentation(module, pages: int, calls: int = 200_000) -> Dict[str, Any]:
+    """StageProfiler cost: per stage() call disabled and enabled, and a synthetic document with profiling off/on"""
+    import tempfile
+    overhead = {}
+    for enabled in (False, True):
+        profiler = module.StageProfiler(enabled)
+        start = time.perf_counter()
+        for _ in range(calls):
+            with profiler.stage("bench"):
+                pass
+        overhead[enabled] = (time.perf_counter() - start) / calls
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "mixed.pdf")
+        make_synthetic_pdf(pdf_path, DocumentSpec("mixed", pages=pages))
+        runs = {}
+        for profile in (False, True):
+            output_dir = os.path.join(tmp, f"profile_{profile}")
+            elapsed, stats, files = run_processor(module, pdf_path, output_dir, profile=profile)
+            with open(os.path.join(output_dir, "mixed", "processing_metadata_v3.json"), encoding="utf-8") as f:
+                metadata = json.load(f)
+            elements = [(element["title"], element["bbox"]) for element in metadata["detected_elements"]]
+            runs[profile] = {"seconds": elapsed, "files": files, "elements": elements,
+                             "profile": metadata["processing_stats"].get("profile")}
+
+    off, on = runs[False], runs[True]
+    profile = on["profile"] or {}
+    return {
+        "pages": pages,
+        "disabled_ns": overhead[False] * 1e9,
+        "enabled_ns": overhead[True] * 1e9,
+        "off_s": off["seconds"],
+        "on_s": on["seconds"],
+        "stages": len(profile.get("stages", {})),
+        "top_stages": [name for name in profile.get("stages", {}) if "." not in name][:3],
+        "histogram_pages": sum(profile.get("page_histograms", {}).get("page", {}).values()),
+        # Profiling must not change the output, and must see every page
+        "identical": (off["files"] == on["files"] and off["elements"] == on["elements"]
+                      and off["profile"] is None and sum(profile["page_histograms"]["page"].values()) == pages),
+    }
+
+
+HEAVY_MODULES = ("fitz", "pymupdf", "pdfplumber", "pdfminer", "cv2", "numpy", "PIL.Image", "psutil")
+STARTUP_PROBE = """
+import json, runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+sys.stdout.flush()
+print("HEAVY_MODULES " + json.dumps([name for name in %r if name in sys.modules]), file=sys.stderr)
+""" % (HEAVY_MODULES,)
+
+
+def startup_run(args: List[str], cwd: str, repeat: int = 3) -> Dict[str, Any]:
+    """Run the processor CLI in fresh interpreters: best wall time, total import time, heavy modules loaded"""
+    import subprocess
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(PROCESSOR_PATH)] + args, cwd=cwd, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+
+    probe = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_PROBE, str(PROCESSOR_PATH)] + args,
+                           cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    loaded = None
+    import_us = sum(int(line.split("|")[0].split(":")[1]) for line in probe.stderr.splitlines()
+                    if line.startswith("import time:") and line.split("|")[0].split(":")[1].strip().isdigit())
+    for line in probe.stderr.splitlines():
+        if line.startswith("HEAVY_MODULES "):
+            loaded = json.loads(line[len("HEAVY_MODULES "):])
+    return {"seconds": best, "import_s": import_us / 1e6, "heavy_modules": loaded}
+
+
+def bench_startup(module, repeat: int = 3) -> Dict[str, Any]:
+    """CLI startup: --help, a rejected input and a result-cache hit vs. importing every backend up front"""
+    import subprocess
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        make_report_pdf(pdf_path, 2)
+        cache_args = [pdf_path, os.path.join(tmp, "output"), "--cache-dir", os.path.join(tmp, "cache")]
+        subprocess.run([sys.executable, str(PROCESSOR_PATH)] + cache_args, cwd=tmp,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        runs = {
+            "help": startup_run(["--help"], tmp, repeat),
+            "invalid_input": startup_run([os.path.join(tmp, "missing.pdf"), os.path.join(tmp, "output")], tmp, repeat),
+            "cache_hit": startup_run(cache_args, tmp, repeat),
+        }
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import fitz, pdfplumber, numpy, cv2, PIL.Image, psutil"], cwd=tmp,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        eager_s = time.perf_counter() - start
+
+    parsers = {"fitz", "pymupdf", "pdfplumber", "pdfminer", "cv2", "numpy"}
+    return {
+        **runs,
+        "eager_imports_s": eager_s,
+        # Nothing heavy for --help or a bad path; a cache hit never touches the detection stack
+        "identical": (runs["help"]["heavy_modules"] == [] and runs["invalid_input"]["heavy_modules"] == []
+                      and runs["cache_hit"]["heavy_modules"] is not None
+                      and not parsers & set(runs["cache_hit"]["heavy_modules"])),
+    }
+
+
+def daemon_request(socket_path: str, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                   connection=None) -> Tuple[int, Dict[str, Any]]:
+    """One HTTP request to the serve-mode daemon over its Unix socket: (status, JSON body)"""
+    import http.client
+    import socket
+
+    class UnixHTTPConnection(http.client.HTTPConnection):
+        def connect(self):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(socket_path)
+
+    conn = connection or UnixHTTPConnection("localhost")
+    body = json.dumps(payload).encode() if payload is not None else None
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"} if body else {})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def bench_daemon(module, jobs: int = 10, cli_runs: int = 3) -> Dict[str, Any]:
+    """Small-PDF job latency through the serve-mode daemon vs. one CLI process per PDF, plus the queue bound"""
+    import subprocess
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "report.pdf")
+        make_report_pdf(pdf_path, 2)
+
+        cli_times = []
+        for run in range(cli_runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(PROCESSOR_PATH), pdf_path, os.path.join(tmp, f"cli{run}")],
+                           cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            cli_times.append(time.perf_counter() - start)
+        with open(os.path.join(tmp, "cli0", "report", "document.md"), encoding="utf-8") as f:
+            cli_markdown = f.read()
+
+        socket_path = os.path.join(tmp, "daemon.sock")
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, str(PROCESSOR_PATH), "serve", "--socket", socket_path,
+                                   "--workers", "1", "--queue-size", "2", "-o", os.path.join(tmp, "daemon"),
+                                   "--root", tmp],
+                                  cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(socket_path):
+                if server.poll() is not None or time.perf_counter() - start > 60:
+                    raise RuntimeError("serve mode did not start")
+                time.sleep(0.01)
+            startup_s = time.perf_counter() - start
+
+            latencies, overheads, markdown_same = [], [], True
+            for job in range(jobs):
+                start = time.perf_counter()
+                status, record = daemon_request(socket_path, "POST", "/jobs",
+                                                {"pdf_path": pdf_path,
+                                                 "output_dir": os.path.join(tmp, "daemon", str(job))})
+                latency = time.perf_counter() - start
+                latencies.append(latency)
+                overheads.append(latency - record["seconds"])
+                with open(record["document"], encoding="utf-8") as f:
+                    markdown_same = markdown_same and status == 200 and f.read() == cli_markdown
+
+            # One worker and two queue slots: the 3rd and 4th concurrent jobs are refused
+            statuses, admitted = [], []
+            for job in range(4):
+                status, record = daemon_request(socket_path, "POST", "/jobs",
+                                                {"pdf_path": pdf_path, "wait": False,
+                                                 "output_dir": os.path.join(tmp, "burst", str(job))})
+                statuses.append(status)
+                if status == 202:
+                    admitted.append(record["id"])
+            for job_id in admitted:
+                while daemon_request(socket_path, "GET", f"/jobs/{job_id}")[1]["status"] in ("queued", "running"):
+                    time.sleep(0.05)
+
+            # Two jobs for the same output folder run one after the other; both must succeed
+            same_dir = [daemon_request(socket_path, "POST", "/jobs",
+                                       {"pdf_path": pdf_path, "output_dir": os.path.join(tmp, "same"),
+                                        "wait": False})[1]["id"] for _ in range(2)]
+            same_dir_ok = True
+            for job_id in same_dir:
+                record = daemon_request(socket_path, "GET", f"/jobs/{job_id}")[1]
+                while record["status"] in ("queued", "running"):
+                    time.sleep(0.05)
+                    record = daemon_request(socket_path, "GET", f"/jobs/{job_id}")[1]
+                same_dir_ok = same_dir_ok and record["status"] == "ok"
+            outside_status, _ = daemon_request(socket_path, "POST", "/jobs", {"pdf_path": os.path.abspath(__file__)})
+            _, health = daemon_request(socket_path, "GET", "/health")
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    latencies.sort()
+    overheads.sort()
+    return {
+        "jobs": jobs,
+        "cli_s": sorted(cli_times)[len(cli_times) // 2],
+        "daemon_startup_s": startup_s,
+        "daemon_latency_s": latencies[len(latencies) // 2],
+        "daemon_overhead_ms": overheads[len(overheads) // 2] * 1000,
+        "burst_statuses": statuses,
+        "outside_root_status": outside_status,
+        "health": health,
+        # Same document.md as the CLI, the bounded queue refuses instead of buffering and --root is enforced
+        "identical": (markdown_same and statuses == [202, 202, 503, 503] and same_dir_ok and outside_status == 403
+                      and server.returncode == 0),
+    }
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of the suite scenarios, CLI startup and daemon latency against a saved results file, as printable lines"""
+    regressions = []
+    for name, result in results.get("suite", {}).items():
+        before = baseline.get("results", {}).get("suite", {}).get(name)
+        if before is None or before["spec"] != result["spec"]:
+            continue
+        for stage, metric in (("detector", "pages_per_s"), ("processor", "pages_per_s")):
+            old, new = before[stage][metric], result[stage][metric]
+            if new < old / (1 + tolerance):
+                regressions.append(f"{name} {stage}: {old:.1f} -> {new:.1f} pages/s")
+        old, new = before["processor"]["peak_rss_mb"], result["processor"]["peak_rss_mb"]
+        if new > old * (1 + tolerance):
+            regressions.append(f"{name} processor: peak RSS {old:.0f} -> {new:.0f}MB")
+    startup, before = results.get("startup"), baseline.get("results", {}).get("startup")
+    if startup and before:
+        for name in ("help", "invalid_input", "cache_hit"):
+            old, new = before[name]["seconds"], startup[name]["seconds"]
+            if new > old * (1 + tolerance):
+                regressions.append(f"startup {name}: {old * 1000:.0f} -> {new * 1000:.0f}ms")
+    daemon, before = results.get("daemon"), baseline.get("results", {}).get("daemon")
+    if daemon and before:
+        old, new = before["daemon_latency_s"], daemon["daemon_latency_s"]
+        if new > old * (1 + tolerance):
+            regressions.append(f"daemon job latency: {old * 1000:.0f} -> {new * 1000:.0f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for Art Materials Processor v3.0")
+    parser.add_argument("--curves", type=int, default=20000, help="Curves on the synthetic page")
+    parser.add_argument("--element-curves", type=int, default=10000, help="Curves on the VisualElement memory page")
+    parser.add_argument("--chars", type=int, default=5000, help="Chars on the synthetic text page")
+    parser.add_argument("--tables", type=int, default=4, help="Tables on the synthetic table page")
+    parser.add_argument("--mentions", type=int, default=12, help="\"Table N\" mentions on the table page")
+    parser.add_argument("--text-lines", type=int, default=2000, help="Lines of text for the reference finder")
+    parser.add_argument("--figures", type=int, default=12, help="Figures on the synthetic clustering page")
+    parser.add_argument("--figure-mentions", type=int, default=240, help="\"Figure N\" mentions on the clustering page")
+    parser.add_argument("--paper-pages", type=int, default=10, help="Pages of the cross-reference-heavy paper")
+    parser.add_argument("--paper-mentions", type=int, default=20, help="Figure mentions per paper page")
+    parser.add_argument("--book-pages", type=int, default=100, help="Pages of the prose-heavy book for triage")
+    parser.add_argument("--scan-pages", type=int, default=40, help="Pages of the scanned catalogue for raster regions")
+    parser.add_argument("--prose-lines", type=int, default=600, help="Lines of laid-out prose for text positions")
+    parser.add_argument("--positions", type=int, default=60, help="Reference positions looked up on the prose page")
+    parser.add_argument("--png-pages", type=int, default=10, help="Drawing pages rendered for the PNG stage")
+    parser.add_argument("--png-threads", type=int, default=4, help="Encoder threads for the PNG stage")
+    parser.add_argument("--backend-pages", type=int, default=20, help="Pages of the synthetic report for backends")
+    parser.add_argument("--queries", type=int, default=200, help="Area queries per benchmark")
+    parser.add_argument("--profile-pages", type=int, default=20, help="Pages of the document profiled on and off")
+    parser.add_argument("--daemon-jobs", type=int, default=10, help="Jobs sent to the serve-mode daemon")
+    parser.add_argument("--suite-pages", type=int, default=20, help="Pages of each built-in end-to-end scenario")
+    parser.add_argument("--scenario", type=parse_spec, action="append",
+                        help="End-to-end scenario instead of the built-in ones, e.g. "
+                             "\"big:pages=200,chars=4000,figures=2,curves=500,tables=1,mentions=3\" (repeatable)")
+    parser.add_argument("--suite-only", action="store_true", help="Run only the end-to-end scenarios")
+    parser.add_argument("--json", help="Write all results, with run metadata, to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to check the scenarios against")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Slowdown or memory growth against --baseline reported as a regression")
+    args = parser.parse_args()
+
+    module = load_processor()
+
+    results = {}
+
+    if not args.suite_only:
+        result = results["spatial_index"] = bench_spatial_index(module, args.curves, args.queries)
+        print(f"[spatial index] {result['primitives']} primitives, {result['queries']} queries: "
+              f"linear {result['linear_s']:.3f}s, indexed {result['indexed_s']:.3f}s "
+              f"({result['speedup']:.1f}x), identical={result['identical']}")
+
+        result = results["visual_elements"] = bench_visual_elements(module, args.element_curves)
+        print(f"[visual elements] {result['elements']} elements: dict-backed {result['legacy_bytes'] / 1e6:.1f}MB, "
+              f"slotted {result['compact_bytes'] / 1e6:.1f}MB ({result['reduction']:.1f}x less), "
+              f"shared per page {result['shared_bytes'] / 1e6:.1f}MB, "
+              f"same elements={result['identical']}")
+
+        result = results["figure_clusters"] = bench_figure_clusters(module, args.figures, args.figure_mentions)
+        print(f"[figure clusters] {result['primitives']} primitives, {result['figures']} figures, "
+              f"{result['references']} references: radius scan {result['legacy_s']:.3f}s "
+              f"({result['legacy_correct']} correct regions), clustered {result['clustered_s']:.3f}s "
+              f"incl. {result['cluster_s'] * 1000:.1f}ms clustering ({result['clusters']} clusters, "
+              f"{result['clustered_correct']} correct regions, {result['speedup']:.1f}x), exact={result['identical']}")
+
+        result = results["text_density"] = bench_text_density(module, args.chars, args.queries)
+        print(f"[text density] {result['chars']} chars, {result['queries']} areas (numpy={result['numpy']}): "
+              f"loop {result['loop_s']:.3f}s, batch {result['batch_s']:.3f}s "
+              f"({result['speedup']:.1f}x), bit-identical={result['identical']}")
+
+        result = results["table_finder"] = bench_table_finder(module, args.tables, args.mentions)
+        print(f"[table finder] {result['tables']} tables, {result['references']} references: "
+              f"find_tables calls {result['finder_calls']} (legacy {result['legacy_finder_calls']}), "
+              f"{result['elements']} elements in {result['detect_s']:.3f}s, once-per-page={result['identical']}")
+
+        result = results["reference_finder"] = bench_reference_finder(module, args.text_lines)
+        print(f"[reference finder] {result['chars']} chars, {result['references']} referenced elements from "
+              f"{result['mentions']} distinct mentions ({result['legacy_references']} before dedupe): legacy "
+              f"{result['legacy_s'] * 1000:.2f}ms, single pass {result['single_pass_s'] * 1000:.2f}ms "
+              f"({result['speedup']:.1f}x), same mentions and one reference per element={result['identical']}")
+
+        result = results["text_position"] = bench_text_position(module, args.prose_lines, args.positions)
+        print(f"[text position] {result['chars']} chars, {result['references']} lookups: "
+              f"legacy {result['legacy_s']:.3f}s ({result['legacy_correct']} correct boxes), "
+              f"indexed {result['indexed_s']:.3f}s ({result['indexed_correct']} correct boxes, "
+              f"{result['speedup']:.1f}x), exact={result['identical']}")
+
+        result = results["png_writer"] = bench_png_writer(module, args.png_pages, args.png_threads)
+        print(f"[png writer] {result['images']} screenshots: inline save {result['inline_s']:.3f}s, "
+              f"{result['threads']} encoder threads {result['staged_s']:.3f}s ({result['speedup']:.1f}x), "
+              f"byte-identical={result['identical']}")
+
+        result = results["image_codecs"] = bench_image_codecs(module, args.png_pages)
+        print(f"[image codecs] {result['images']} crops: " + ", ".join(
+            f"{name} {codec['bytes'] / 1024:.0f}KB/{codec['encode_s']:.2f}s" for name, codec in result["codecs"].items())
+            + f", default PNG matches PyMuPDF={result['identical']}")
+
+        result = results["render_scale"] = bench_render_scale(module, args.png_pages)
+        fixed, adaptive = result["fixed"], result["adaptive"]
+        print(f"[render scale] {result['crops']} full-page crops: fixed {fixed['scale']}x "
+              f"{fixed['pixels'] / result['crops'] / 1e6:.1f}MP {fixed['bytes'] / 1024:.0f}KB {fixed['seconds']:.2f}s, "
+              f"adaptive {adaptive['scale']}x {adaptive['pixels'] / result['crops'] / 1e6:.1f}MP "
+              f"{adaptive['bytes'] / 1024:.0f}KB {adaptive['seconds']:.2f}s, within budget={result['identical']}")
+
+        result = results["embedded_images"] = bench_embedded_images(module, args.png_pages)
+        print(f"[embedded images] {result['pages']} scanned pages to JPEG: rendered "
+              f"{result['rendered']['bytes'] / 1024:.0f}KB {result['rendered']['seconds']:.2f}s, embedded stream "
+              f"{result['embedded']['bytes'] / 1024:.0f}KB {result['embedded']['seconds']:.2f}s "
+              f"({result['speedup']:.1f}x), passthrough={result['passthrough']}/{result['pages']} "
+              f"(--fixed-scale {result['fixed_scale_passthrough']}/{result['pages']})")
+
+        result = results["cross_references"] = bench_cross_references(module, args.paper_pages, args.paper_mentions)
+        print(f"[cross references] {result['pages']} pages x {result['mentions']} figure mentions: per mention "
+              f"{result['legacy_screenshots']} screenshots {result['legacy_s']:.2f}s, per element "
+              f"{result['grouped_screenshots']} screenshots {result['grouped_s']:.2f}s ({result['speedup']:.1f}x), "
+              f"one per figure={result['identical']}")
+
+        result = results["triage"] = bench_triage(module, args.book_pages)
+        print(f"[triage] {result['pages']} book pages: detect every page {result['full_s']:.2f}s "
+              f"(parse + detection {result['full_detect_s']:.2f}s), triaged {result['triaged_s']:.2f}s "
+              f"(parse + detection {result['triaged_detect_s']:.2f}s, {result['pages_skipped']} pages skipped "
+              f"with {result['skipped_text_s']:.2f}s of text extraction, scan {result['scan_s'] * 1000:.1f}ms, "
+              f"{result['speedup']:.1f}x), same words and screenshots={result['identical']}")
+
+        result = results["raster_regions"] = bench_raster_regions(module, args.scan_pages)
+        if not result["available"]:
+            print("[raster regions] skipped: OpenCV or PyMuPDF not installed")
+        else:
+            print(f"[raster regions] {result['pages']} scanned catalogue pages: vector only {result['vector_s']:.2f}s "
+                  f"({result['vector_elements']} elements), raster {result['raster_s']:.2f}s "
+                  f"({result['raster_elements']} elements, {result['pages_raster']} raster pages, "
+                  f"{result['pages_per_s']:.1f} pages/s), thumbnails inline {result['inline_s']:.2f}s, "
+                  f"{result['threads']} threads {result['threaded_s']:.2f}s, "
+                  f"{result['matched']}/{result['truth']} true regions found={result['identical']}")
+
+        result = results["backends"] = bench_backends(module, args.backend_pages)
+        dual, single = result["pdfplumber"], result["pymupdf"]
+        print(f"[backends] {result['pages']} report pages: pdfplumber+PyMuPDF parse {dual['parse_s']:.2f}s "
+              f"detect {dual['detect_s']:.2f}s peak {dual['peak_rss_mb']:.0f}MB, PyMuPDF only parse "
+              f"{single['parse_s']:.2f}s detect {single['detect_s']:.2f}s peak {single['peak_rss_mb']:.0f}MB "
+              f"({result['speedup']:.1f}x parse), elements {result['elements']}/{result['pymupdf_elements']}, "
+              f"max bbox delta {result['bbox_delta']:.2f}pt, conformant={result['identical']}")
+
+        result = results["instrumentation"] = bench_instrumentation(module, args.profile_pages)
+        print(f"[instrumentation] stage() {result['disabled_ns']:.0f}ns disabled, {result['enabled_ns']:.0f}ns enabled; "
+              f"{result['pages']} pages profiling off {result['off_s']:.2f}s, on {result['on_s']:.2f}s "
+              f"({result['stages']} stages, top {', '.join(result['top_stages'])}), "
+              f"same output and every page profiled={result['identical']}")
+
+    result = results["startup"] = bench_startup(module)
+    print(f"[startup] --help {result['help']['seconds'] * 1000:.0f}ms (imports "
+          f"{result['help']['import_s'] * 1000:.0f}ms), invalid input {result['invalid_input']['seconds'] * 1000:.0f}ms, "
+          f"cache hit {result['cache_hit']['seconds'] * 1000:.0f}ms "
+          f"(loads {', '.join(result['cache_hit']['heavy_modules'] or []) or 'nothing heavy'}), "
+          f"eager backend imports alone {result['eager_imports_s'] * 1000:.0f}ms, "
+          f"no parser or OpenCV import={result['identical']}")
+
+    result = results["daemon"] = bench_daemon(module, args.daemon_jobs)
+    print(f"[daemon] 2-page PDF: CLI process per job {result['cli_s'] * 1000:.0f}ms, serve mode "
+          f"{result['daemon_latency_s'] * 1000:.0f}ms per job ({result['daemon_overhead_ms']:.1f}ms over processing, "
+          f"{result['jobs']} jobs, warm-up {result['daemon_startup_s']:.2f}s), burst of 4 on 2 slots "
+          f"{result['burst_statuses']}, same output and bounded queue={result['identical']}")
+
+    scenarios = args.scenario or [DocumentSpec(**{**spec.__dict__, "pages": args.suite_pages})
+                                  for spec in SUITE_SCENARIOS]
+    suite = results["suite"] = {}
+    for spec in scenarios:
+        result = suite[spec.name] = bench_suite_scenario(module, spec)
+        detector, processor = result["detector"], result["processor"]
+        stages = processor["stages"]
+        print(f"[suite {spec.name}] {spec.pages} pages x ({spec.chars} chars, {spec.figures} figures of "
+              f"{spec.curves} curves, {spec.tables} tables, {spec.mentions} mentions): detector "
+              f"{detector['pages_per_s']:.1f} pages/s peak {detector['peak_rss_mb']:.0f}MB, processor "
+              f"{processor['pages_per_s']:.1f} pages/s peak {processor['peak_rss_mb']:.0f}MB ("
+              + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stages.items())
+              + f"), elements {processor['elements']}/{result['expected_elements']}, "
+              f"consistent={result['identical']}")
+
+    status = 0 if all(r["identical"] for r in list(results.values()) + list(suite.values())
+                      if "identical" in r) else 1
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[regression] {line}")
+        print(f"[baseline] {args.baseline}: {len(regressions)} regressions beyond {args.tolerance:.0%}")
+        status = status or (1 if regressions else 0)
+
+    if args.json:
+        document = {
+            "metadata": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "version": module.METADATA_VERSION,
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+                "cpus": os.cpu_count(),
+                "args": {key: value for key, value in vars(args).items() if key != "scenario"},
+            },
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, default=lambda value: value.__dict__)
+        print(f"[json] results written to {args.json}")
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())